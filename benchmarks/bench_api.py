@@ -0,0 +1,80 @@
+# bench_api.py
+# Payload size and latency of the JSON API (api.py) on a seeded SQLite
+# database: a full page against a page with a few fields, each as plain
+# JSON, gzip and brotli, plus a revalidation that ends in a
+# 304 and a delta sync with nothing new:
+#
+#   python -m benchmarks.bench_api --sales 200000
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from web_project.app import create_app
+from web_project.models import db
+from web_project import seed
+
+app = create_app()
+
+CASES = (
+    ('sales, all fields', '/api/v1/sales?per_page=500'),
+    ('sales, 3 fields', '/api/v1/sales?per_page=500&fields=id,quantity,total_price'),
+    ('products, all fields', '/api/v1/products?per_page=500'),
+    ('products, id+stock', '/api/v1/products?per_page=500&fields=id,stock'),
+)
+
+
+def measure(client, path, headers, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path, headers=headers)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, response
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON API payload size and latency.')
+    parser.add_argument('--sales', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    encodings = ['identity', 'gzip', 'br']
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}', SLOW_REQUEST_THRESHOLD=None,
+                      WTF_CSRF_ENABLED=False)
+    try:
+        with app.app_context():
+            db.create_all()
+            seed.generate(args.sales, seed=args.seed)
+            db.session.remove()
+
+        client = app.test_client()
+        response = client.post('/login/manager', data={'email': seed.MANAGER_EMAIL, 'password': seed.PASSWORD})
+        if response.status_code != 302:
+            raise RuntimeError(f"login failed with status {response.status_code}")
+        print(f"{'request':<22} {'encoding':<9} {'bytes':>8} {'median':>10}")
+        for label, url in CASES:
+            for encoding in encodings:
+                median, response = measure(client, url, {'Accept-Encoding': encoding}, args.repeat)
+                print(f"{label:<22} {encoding:<9} {len(response.data):>8} {median:>7.2f} ms")
+            etag = response.headers['ETag']
+            median, response = measure(client, url, {'Accept-Encoding': encodings[-1], 'If-None-Match': etag},
+                                       args.repeat)
+            print(f"{label:<22} {'304':<9} {len(response.data):>8} {median:>7.2f} ms")
+
+        since = datetime.utcnow().isoformat()
+        median, response = measure(client, f'/api/v1/sales?updated_since={since}', {}, args.repeat)
+        print(f"{'sales, nothing new':<22} {'identity':<9} {len(response.data):>8} {median:>7.2f} ms")
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
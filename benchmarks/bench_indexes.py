@@ -0,0 +1,173 @@
+# bench_indexes.py
+# Seeds a throwaway SQLite database and runs the queries behind the hot
+# routes twice: once with only the primary keys, once with the indexes
+# declared on the models (see the "add indexes for hot filter columns"
+# migration). Prints EXPLAIN QUERY PLAN and median timings for each.
+#
+#   python -m benchmarks.bench_indexes --sales 500000
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from web_project.app import create_app
+from web_project.models import db, User, Product, Supplier, Sale, Order
+from web_project import queries
+
+app = create_app()
+
+PAGE = 51  # PAGE_SIZE + 1, as fetched by pagination.paginate()
+
+
+# ---------- Seeding ----------
+def seed(args):
+    rng = random.Random(args.seed)
+    start = datetime(2024, 1, 1)
+
+    db.session.execute(User.__table__.insert(), [
+        dict(id=i, username=f'user{i}', email=f'user{i}@example.com', password='x',
+             role='manager' if i == 1 else 'user', is_active=i % 3 != 0)
+        for i in range(1, args.users + 1)
+    ])
+    db.session.execute(Product.__table__.insert(), [
+        dict(id=i, name=f'product {i}', price=round(rng.uniform(1, 500), 2),
+             stock=rng.randint(0, 1000), user_id=rng.randint(2, args.users))
+        for i in range(1, args.products + 1)
+    ])
+    db.session.execute(Supplier.__table__.insert(), [
+        dict(id=i, name=f'supplier {i}', product_id=rng.randint(1, args.products),
+             quantity=rng.randint(1, 500), price=round(rng.uniform(1, 400), 2),
+             delivery_time=rng.randint(1, 30))
+        for i in range(1, args.products + 1)
+    ])
+    db.session.execute(Order.__table__.insert(), [
+        dict(id=i, user_id=rng.randint(2, args.users), product_id=rng.randint(1, args.products),
+             supplier_id=rng.randint(1, args.products), quantity=rng.randint(1, 50),
+             status=rng.choice(('pending', 'approved', 'approved', 'rejected')))
+        for i in range(1, args.products + 1)
+    ])
+
+    batch = []
+    for i in range(1, args.sales + 1):
+        quantity = rng.randint(1, 5)
+        batch.append(dict(
+            id=i, product_id=rng.randint(1, args.products), quantity=quantity,
+            total_price=quantity * 10.0, user_id=rng.randint(2, args.users),
+            sale_date=start + timedelta(seconds=rng.randint(0, 365 * 24 * 3600)),
+        ))
+        if len(batch) == 10000:
+            db.session.execute(Sale.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Sale.__table__.insert(), batch)
+    db.session.commit()
+
+
+# ---------- Cases ----------
+def cases(args):
+    newest = (Sale.sale_date.desc(), Sale.id.desc())
+    range_start = datetime(2024, 3, 1)
+    range_end = datetime(2024, 3, 7)
+    return {
+        'manager_dashboard: sales page': lambda: queries.dashboard_sales().order_by(*newest).limit(PAGE),
+        'user_dashboard: own sales page': lambda: queries.user_sales(7).order_by(*newest).limit(PAGE),
+        'analytics: one-week range page': lambda: queries.sales_between(range_start, range_end)
+            .order_by(*newest).limit(PAGE),
+        'inventory: own products page': lambda: queries.products(owner_id=7).order_by(Product.id).limit(PAGE),
+        'analytics: low stock': lambda: Product.query.filter(Product.stock < 10),
+        'confirm_orders: pending page': lambda: queries.pending_orders().order_by(Order.id).limit(PAGE),
+        'manage_users: active page': lambda: queries.users_with_role('user', is_active=True)
+            .order_by(User.id).limit(PAGE),
+        'suppliers: by product': lambda: queries.suppliers(product_id=args.products // 2),
+    }
+
+
+def capture_statement(build):
+    captured = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        build().all()
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    db.session.expunge_all()
+    return captured[-1]
+
+
+def run_case(build, repeat):
+    statement, parameters = capture_statement(build)
+    plan = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        build().all()
+        timings.append(time.perf_counter() - started)
+        db.session.expunge_all()
+    return [row[-1] for row in plan], statistics.median(timings)
+
+
+def set_indexes(enabled):
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            if enabled:
+                index.create(db.engine, checkfirst=True)
+            else:
+                index.drop(db.engine, checkfirst=True)
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EXPLAIN QUERY PLAN and timings for the hot routes, with and without indexes.')
+    parser.add_argument('--sales', type=int, default=200000)
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+
+    try:
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            seed(args)
+            print(f"Seeded {args.sales} sales, {args.products} products in {time.perf_counter() - started:.1f}s")
+
+            results = {}
+            for phase, enabled in (('before', False), ('after', True)):
+                set_indexes(enabled)
+                for name, build in cases(args).items():
+                    results.setdefault(name, {})[phase] = run_case(build, args.repeat)
+
+            full_scans = 0
+            for name, phases in results.items():
+                print(f"\n== {name}")
+                for phase in ('before', 'after'):
+                    plan, seconds = phases[phase]
+                    print(f"  {phase:6} {seconds * 1000:9.2f} ms")
+                    for line in plan:
+                        print(f"           {line}")
+                # A bare "SCAN <table>" after indexing means the route still reads the whole table
+                full_scans += sum(1 for line in phases['after'][0]
+                                  if line.startswith('SCAN') and 'USING' not in line)
+            print(f"\nFull table scans remaining with indexes: {full_scans}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# bench_ingest.py
+# Throughput of the batch sales import (web_project/ingest.py) into a
+# throwaway SQLite file:
+#
+#   python -m benchmarks.bench_ingest --sales 100000 --chunk-size 5000
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from web_project.app import create_app
+from web_project.models import db, User, Product, Sale
+from web_project import ingest
+from web_project.stock import open_balances
+
+app = create_app()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch sales import throughput.')
+    parser.add_argument('--sales', type=int, default=100000)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    try:
+        with app.app_context():
+            db.create_all()
+            seller = User(username='pos', email='pos@example.com', password='x', role='user', is_active=True)
+            db.session.add(seller)
+            db.session.flush()
+            db.session.execute(Product.__table__.insert(), [
+                dict(name=f'product {i}', price=round(rng.uniform(1, 100), 2), stock=10 ** 9, user_id=seller.id)
+                for i in range(args.products)
+            ])
+            db.session.commit()
+            open_balances()
+
+            records = [
+                {'product_id': rng.randint(1, args.products), 'quantity': rng.randint(1, 5),
+                 'sale_date': f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00'}
+                for _ in range(args.sales)
+            ]
+
+            started = time.perf_counter()
+            report = ingest.ingest(records, seller.id, chunk_size=args.chunk_size)
+            elapsed = time.perf_counter() - started
+
+            assert db.session.query(db.func.count(Sale.id)).scalar() == report['inserted']
+            print(f"Imported {report['inserted']} sales in {elapsed:.2f}s "
+                  f"({report['inserted'] / elapsed:,.0f} sales/s, {len(report['errors'])} errors)")
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
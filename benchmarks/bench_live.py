@@ -0,0 +1,173 @@
+# bench_live.py
+# Database load of managers keeping manager_dashboard and confirm_orders
+# open while sellers keep selling, on a freshly seeded SQLite database:
+#
+#   refresh  every manager reloads both pages every --refresh seconds (one
+#            run per value given)
+#   live     every manager loads both pages once and follows their live
+#            update streams (live.py) instead; pages beyond --max-streams
+#            are refused a stream and poll /live?once=1, as the browser does
+#
+# Reports the SQL statements and SQL time the managers cost per minute, and
+# for live, how many updates reached them and how many checks were polls.
+#
+#   python -m benchmarks.bench_live --managers 4 --sales-per-second 5 --seconds 30
+import argparse
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from html import unescape
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from web_project.app import create_app
+from web_project.models import db
+from web_project import seed
+from web_project.stock import compact, default_location, record
+
+PAGES = ('/manager_dashboard', '/confirm_orders')
+PRODUCTS = 50  # the ones sold
+UNLIMITED = {'ip': (10 ** 9, 1), 'account': (10 ** 9, 1)}
+
+statements = Counter()
+sql_seconds = defaultdict(float)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('bench_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _finish(conn, cursor, statement, parameters, context, executemany):
+    thread = threading.current_thread().name
+    statements[thread] += 1
+    sql_seconds[thread] += time.perf_counter() - conn.info['bench_started'].pop()
+
+
+def logged_in(app, email):
+    client = app.test_client()
+    response = client.post(f"/login/{'manager' if email == seed.MANAGER_EMAIL else 'user'}",
+                           data={'email': email, 'password': seed.PASSWORD})
+    assert response.status_code == 302, response.status_code
+    return client
+
+
+def seller(client, products, rate, stop):
+    number = 0
+    while not stop.is_set():
+        number += 1
+        client.post('/add_sale', data={'product_id': products[number % len(products)], 'quantity': 1})
+        stop.wait(1 / rate)
+
+
+def refreshing(client, interval, stop):
+    while not stop.is_set():
+        for page in PAGES:
+            assert client.get(page).status_code == 200
+        stop.wait(interval)
+
+
+def following(client, page, updates, poll, stop):
+    body = client.get(page).get_data(as_text=True)
+    url = unescape(re.search(r'data-live="([^"]+)"', body).group(1))
+    cursor = re.search(r'after=([^&]+)', url).group(1)
+    while not stop.is_set():
+        current = re.sub(r'after=[^&]+', 'after=' + cursor, url)
+        response = client.get(current, buffered=False)
+        if response.status_code == 503:
+            response.close()
+            chunks = [client.get(current + '&once=1').get_data()]
+            updates['poll'] += 1
+        else:
+            # Ends by itself after LIVE_STREAM_SECONDS
+            chunks = response.response
+        for chunk in chunks:
+            text = chunk.decode()
+            updates.update(kind for kind in re.findall(r'^event: (\w+)', text, re.MULTILINE) if kind != 'cursor')
+            cursor = (re.findall(r'^id: (\S+)', text, re.MULTILINE) or [cursor])[-1]
+        if response.status_code == 503:
+            stop.wait(poll)
+        else:
+            response.close()
+
+
+def run(app, scenario, args, refresh=None):
+    products = list(range(1, PRODUCTS + 1))
+    stop = threading.Event()
+    updates = Counter()
+    managers = []
+    for number in range(args.managers):
+        client = logged_in(app, seed.MANAGER_EMAIL)
+        if refresh is not None:
+            managers.append(threading.Thread(target=refreshing, args=(client, refresh, stop),
+                                             name=f'manager-{number}'))
+        else:
+            managers += [threading.Thread(target=following, name=f'manager-{number}-{page}',
+                                          args=(client, page, updates, app.config['LIVE_FALLBACK_POLL'], stop))
+                         for page in PAGES]
+    writer = threading.Thread(target=seller, args=(logged_in(app, seed.seller_email(1)), products,
+                                                   args.sales_per_second, stop), name='seller')
+    statements.clear()
+    sql_seconds.clear()
+    writer.start()
+    for thread in managers:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in managers + [writer]:
+        thread.join()
+
+    minutes = args.seconds / 60
+    manager_statements = sum(count for name, count in statements.items() if name.startswith('manager'))
+    manager_seconds = sum(seconds for name, seconds in sql_seconds.items() if name.startswith('manager'))
+    print(f"{scenario:<14}{manager_statements / minutes:>16.0f}{manager_seconds * 1000 / minutes:>20.1f}"
+          f"{statements['seller'] / minutes:>16.0f}  {dict(updates) if updates else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manager page refreshes against live update streams.')
+    parser.add_argument('--sales', type=int, default=100000)
+    parser.add_argument('--managers', type=int, default=4)
+    parser.add_argument('--refresh', type=float, nargs='+', default=[1, 10, 60],
+                        help="Seconds between a manager's reloads; one run per value.")
+    parser.add_argument('--sales-per-second', type=float, default=5)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--max-streams', type=int, default=None, help="Per process; default: every page streams.")
+    args = parser.parse_args()
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    settings = dict(SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}', WTF_CSRF_ENABLED=False, SLOW_REQUEST_THRESHOLD=None,
+                    JOB_WORKER_THREADS=0, LIVE_STREAM_SECONDS=args.seconds, LOGIN_LIMITS=UNLIMITED,
+                    LIVE_MAX_STREAMS=args.max_streams if args.max_streams is not None else args.managers * len(PAGES))
+    try:
+        app = create_app(settings)
+        with app.app_context():
+            db.create_all()
+            seed.generate(args.sales)
+            # Enough stock that no sale is refused
+            record([dict(product_id=product_id, location_id=default_location(), quantity=10 ** 6, kind='adjustment')
+                    for product_id in range(1, PRODUCTS + 1)])
+            db.session.commit()
+            compact()
+            db.session.remove()
+
+        print(f"{args.managers} managers, {args.sales_per_second:g} sales/s, {args.seconds:g} s, "
+              f"{settings['LIVE_MAX_STREAMS']} streams")
+        print(f"{'scenario':<14}{'manager SQL/min':>16}{'manager SQL ms/min':>20}{'seller SQL/min':>16}  updates")
+        for refresh in args.refresh:
+            run(app, f'refresh {refresh:g}s', args, refresh)
+        run(app, 'live', args)
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
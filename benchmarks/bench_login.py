@@ -0,0 +1,123 @@
+# bench_login.py
+# What logins cost and what they can take from the rest of the app, on a
+# freshly seeded SQLite database:
+#
+#   1. verifications per CPU second for a few hashing schemes and costs
+#      (PASSWORD_HASHER), i.e. the login throughput of one core;
+#   2. full successful logins through the test client, per CPU second;
+#   3. a seller's dashboard latency while threads flood the login form with
+#      wrong passwords: unguarded, with the hashing slots of passwords.py
+#      only, and with the rate limits of ratelimit.py as well.
+#
+#   python -m benchmarks.bench_login --attackers 8 --seconds 5
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from web_project.app import create_app
+from web_project.models import db
+from web_project import seed
+from web_project.passwords import WerkzeugHasher
+
+METHODS = ('pbkdf2:sha256:600000', 'pbkdf2:sha256:260000', 'pbkdf2:sha256:100000', 'scrypt:32768:8:1')
+UNLIMITED = {'ip': (10 ** 9, 1), 'account': (10 ** 9, 1)}
+
+
+def per_cpu_second(function, count):
+    started = time.process_time()
+    for _ in range(count):
+        function()
+    return count / (time.process_time() - started)
+
+
+def login(client, email):
+    response = client.post('/login/user', data={'email': email, 'password': seed.PASSWORD})
+    assert response.status_code == 302, response.status_code
+
+
+def flood(app, attackers, seconds):
+    # Dashboard latencies and login responses by status while attackers run
+    reader = app.test_client()
+    login(reader, seed.seller_email(1))
+    stop = threading.Event()
+    statuses = {}
+    lock = threading.Lock()
+
+    def attacker(number):
+        client = app.test_client()
+        while not stop.is_set():
+            status = client.post('/login/manager', data={'email': seed.MANAGER_EMAIL, 'password': f'guess {number}'},
+                                 environ_base={'REMOTE_ADDR': '192.0.2.1'}).status_code
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+
+    threads = [threading.Thread(target=attacker, args=(number,)) for number in range(attackers)]
+    for thread in threads:
+        thread.start()
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        assert reader.get('/user_dashboard').status_code == 200
+        latencies.append((time.perf_counter() - started) * 1000)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Login throughput per core and its effect on other requests.')
+    parser.add_argument('--sales', type=int, default=10000)
+    parser.add_argument('--hashes', type=int, default=10, help="Verifications timed per scheme.")
+    parser.add_argument('--logins', type=int, default=20)
+    parser.add_argument('--attackers', type=int, default=8, help="Threads posting wrong passwords.")
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"{'scheme':<24}{'ms/hash':>10}{'hashes/s/core':>16}")
+    for method in METHODS:
+        hasher = WerkzeugHasher(method)
+        stored = hasher.hash(seed.PASSWORD)
+        rate = per_cpu_second(lambda: hasher.verify(stored, seed.PASSWORD), args.hashes)
+        print(f"{method:<24}{1000 / rate:>10.1f}{rate:>16.1f}")
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    settings = dict(SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}', WTF_CSRF_ENABLED=False, SLOW_REQUEST_THRESHOLD=None,
+                    PAGE_CACHE_ENABLED=False)
+    try:
+        app = create_app(settings)
+        with app.app_context():
+            db.create_all()
+            seed.generate(args.sales)
+            db.session.remove()
+
+        client = create_app(dict(settings, LOGIN_LIMITS=UNLIMITED)).test_client()
+        rate = per_cpu_second(lambda: login(client, seed.seller_email(1)) or client.get('/logout'), args.logins)
+        print(f"\nfull login with {app.config['PASSWORD_HASHER']}: {rate:.1f} logins/s/core")
+
+        scenarios = (
+            ('no attack', 0, {}),
+            ('unguarded', args.attackers, dict(LOGIN_LIMITS=UNLIMITED, PASSWORD_HASH_CONCURRENCY=args.attackers)),
+            ('hashing slots', args.attackers, dict(LOGIN_LIMITS=UNLIMITED)),
+            ('slots + rate limit', args.attackers, {}),
+        )
+        print(f"\n{args.attackers} threads posting wrong passwords from one address to one account")
+        print(f"{'scenario':<20}{'dashboard p50':>15}{'p95 ms':>9}{'attempts/s':>12}  responses")
+        for name, attackers, overrides in scenarios:
+            latencies, statuses = flood(create_app(dict(settings, **overrides)), attackers, args.seconds)
+            p95 = statistics.quantiles(latencies, n=20)[-1]
+            print(f"{name:<20}{statistics.median(latencies):>15.1f}{p95:>9.1f}"
+                  f"{sum(statuses.values()) / args.seconds:>12.1f}  {dict(sorted(statuses.items()))}")
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# bench_reorder.py
+# Times a full reorder run (velocity, supplier choice, reorder points and
+# pending orders for every product) on a freshly seeded SQLite database:
+#
+#   python -m benchmarks.bench_reorder --products 100000 --sales 1000000
+import argparse
+import os
+import tempfile
+import time
+
+from web_project.app import create_app
+from web_project.models import db, Order
+from web_project import reorder, seed
+
+app = create_app()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reorder engine run time.')
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--sales', type=int, default=1000000)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}', SLOW_REQUEST_THRESHOLD=None)
+    try:
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            seed.generate(args.sales, products=args.products, orders=0, seed=args.seed)
+            print(f"seeded {args.products} products, {args.sales} sales in {time.perf_counter() - started:.1f} s")
+
+            for run in range(1, args.runs + 1):
+                # Clear the previous run's orders so every run does the same work
+                Order.query.delete()
+                db.session.commit()
+                started = time.perf_counter()
+                result = reorder.plan()
+                print(f"run {run}: {time.perf_counter() - started:.2f} s, "
+                      f"{result['products']} products planned, {result['orders']} orders")
+            db.session.remove()
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# bench_search.py
+# Typeahead latency over a large catalogue: search.search() for a set of
+# prefixes, with the FTS5 index and with the LIKE fallback it replaces when
+# FTS5 is missing, on a freshly seeded SQLite database:
+#
+#   python -m benchmarks.bench_search --products 1000000
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from web_project.app import create_app
+from web_project.models import db
+from web_project import search, seed
+
+app = create_app()
+
+QUERIES = ('p', 'pr', 'prod', 'product 1', 'product 12', 'product 123456', 'supplier 77', 'seller 4', 'zzz')
+
+
+def measure(function, query, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = function(query)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, max(timings) * 1000, len(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Search and typeahead latency.')
+    parser.add_argument('--products', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--like-repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}', SLOW_REQUEST_THRESHOLD=None)
+    try:
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            seed.generate(args.products // 10, products=args.products, suppliers_per_product=1, orders=0,
+                          seed=args.seed)
+            print(f"seeded {args.products} products in {time.perf_counter() - started:.1f} s")
+
+            fts = lambda query: search.search(query, limit=10)  # noqa: E731
+            like = lambda query: search._like_search(  # noqa: E731
+                search.TOKEN.findall(query), list(search.KINDS), None, 10)
+            print(f"{'query':<16} {'fts5 median':>12} {'max':>9} {'like median':>12} {'max':>9}  results")
+            for query in QUERIES:
+                fts_median, fts_max, count = measure(fts, query, args.repeat)
+                like_median, like_max, _ = measure(like, query, args.like_repeat)
+                print(f"{query!r:<16} {fts_median:>9.2f} ms {fts_max:>6.2f} ms "
+                      f"{like_median:>9.1f} ms {like_max:>6.1f} ms  {count}")
+            db.session.remove()
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
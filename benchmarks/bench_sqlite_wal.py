@@ -0,0 +1,134 @@
+# bench_sqlite_wal.py
+# Mixed read/write load on one SQLite file from several processes, the way
+# gunicorn workers share it: writers POST /add_sale while readers load the
+# manager dashboard (page cache off). Runs once with SQLite's defaults
+# (rollback journal, synchronous=FULL) and once with the app's
+# SQLITE_PRAGMAS (WAL, synchronous=NORMAL, busy_timeout, mmap, cache), each
+# on a freshly seeded database:
+#
+#   python -m benchmarks.bench_sqlite_wal --writers 4 --readers 4 --seconds 10
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from web_project.app import create_app
+from web_project.models import db, Product, User
+from web_project import seed
+from web_project.stock import compact, default_location, record
+
+app = create_app()
+
+MODES = {
+    'rollback journal': {},
+    'app pragmas': app.config['SQLITE_PRAGMAS'],
+}
+
+
+def client_for(email):
+    with app.app_context():
+        db.engine.dispose()  # never share a connection inherited across fork
+        user_id = db.session.query(User.id).filter(User.email == email).scalar()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    return client
+
+
+def writer(products, deadline, results):
+    client = client_for(seed.seller_email(1))
+    latencies, failures = [], 0
+    try:
+        index = os.getpid()
+        while time.time() < deadline:
+            index += 7
+            started = time.perf_counter()
+            client.post('/add_sale', data={'product_id': products[index % len(products)], 'quantity': 1})
+            latencies.append(time.perf_counter() - started)
+            with client.session_transaction() as session:
+                flashes = session.pop('_flashes', [])
+            failures += not flashes or flashes[0][0] != 'success'
+    finally:
+        results.put(('write', latencies, failures))
+
+
+def reader(deadline, results):
+    client = client_for(seed.MANAGER_EMAIL)
+    latencies, failures = [], 0
+    try:
+        while time.time() < deadline:
+            started = time.perf_counter()
+            try:
+                status = client.get('/manager_dashboard').status_code
+            except Exception:
+                status = None
+            latencies.append(time.perf_counter() - started)
+            failures += status != 200
+    finally:
+        results.put(('read', latencies, failures))
+
+
+def run(name, pragmas, args):
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}', SQLITE_PRAGMAS=pragmas,
+                      PAGE_CACHE_ENABLED=False, SLOW_REQUEST_THRESHOLD=None)
+    try:
+        with app.app_context():
+            db.create_all()
+            seed.generate(args.sales, seed=args.seed)
+            # Plenty of stock, so every refused sale is lock contention
+            products = [product_id for (product_id,) in db.session.query(Product.id)]
+            record([dict(product_id=product_id, location_id=default_location(), quantity=10 ** 9, kind='adjustment')
+                    for product_id in products])
+            db.session.commit()
+            compact()
+            journal = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+            db.session.remove()
+            db.engine.dispose()
+        app.test_client().get('/')  # per-app startup work runs once, before forking
+
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        deadline = time.time() + args.seconds
+        processes = [context.Process(target=writer, args=(products, deadline, results)) for _ in range(args.writers)]
+        processes += [context.Process(target=reader, args=(deadline, results)) for _ in range(args.readers)]
+        for process in processes:
+            process.start()
+        totals = {'write': ([], 0), 'read': ([], 0)}
+        for _ in processes:
+            kind, latencies, failures = results.get()
+            totals[kind] = (totals[kind][0] + latencies, totals[kind][1] + failures)
+        for process in processes:
+            process.join()
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    print(f"{name} (journal_mode={journal})")
+    for kind, (latencies, failures) in totals.items():
+        if not latencies:
+            continue
+        p95 = statistics.quantiles(latencies, n=20)[18] * 1000 if len(latencies) > 1 else latencies[0] * 1000
+        print(f"  {kind + 's':<7} {len(latencies) / args.seconds:>8.1f}/s  p95 {p95:>8.1f} ms  "
+              f"{failures} failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite journal mode and pragmas under concurrent writes.')
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--sales', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    for name, pragmas in MODES.items():
+        run(name, pragmas, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+# bench_startup.py
+# Startup cost of the app: importing web_project.app and building it with
+# create_app() in a fresh interpreter, then gunicorn (gunicorn.conf.py) from
+# launch to the first 200 on '/' with and without preload_app, and the memory
+# of its processes after serving some requests. PSS splits the pages shared
+# between the master and the workers among them, so it shows what preloading
+# saves where RSS does not:
+#
+#   python -m benchmarks.bench_startup --workers 4 --target-ms 1500
+#
+# Exits with status 1 if the preloaded cold start is slower than --target-ms.
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from web_project.app import create_app
+from web_project.models import db
+from benchmarks.harness import child_pids
+
+IMPORT_SCRIPT = '''
+import json, time
+started = time.perf_counter()
+from web_project.app import create_app
+imported = time.perf_counter()
+create_app()
+built = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'create_app_ms': (built - imported) * 1000}))
+'''
+
+
+def import_time(repeat):
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT], check=True, capture_output=True, text=True)
+        run = json.loads(output.stdout.splitlines()[-1])
+        run['process_ms'] = (time.perf_counter() - started) * 1000
+        runs.append(run)
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def memory_kb(pid):
+    # Pss and Private_* lines of /proc/<pid>/smaps_rollup, in KiB
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {'rss': fields['Rss'], 'pss': fields['Pss'],
+            'private': fields['Private_Clean'] + fields['Private_Dirty']}
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            response.read()
+            return response.status
+    except (urllib.error.URLError, ConnectionError):
+        return None
+
+
+def cold_start(preload, uri, args):
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    url = f'http://127.0.0.1:{port}/'
+    env = dict(os.environ, DATABASE_URL=uri, GUNICORN_PRELOAD='1' if preload else '0')
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--workers', str(args.workers),
+         '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'],
+        env=env,
+    )
+    try:
+        while get(url) != 200:
+            if server.poll() is not None or time.perf_counter() - started > 60:
+                sys.exit("gunicorn did not start")
+            time.sleep(0.005)
+        first_ms = (time.perf_counter() - started) * 1000
+
+        # Some traffic on every worker before measuring, as after a deploy
+        def client():
+            for _ in range(args.requests // 8):
+                get(url)
+        clients = [threading.Thread(target=client) for _ in range(8)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+
+        workers = [memory_kb(pid) for pid in child_pids(server.pid)]
+        master = memory_kb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        'first_response_ms': round(first_ms),
+        'master_pss_mb': round(master['pss'] / 1024, 1),
+        'worker_rss_mb': round(statistics.mean(worker['rss'] for worker in workers) / 1024, 1),
+        'worker_pss_mb': round(statistics.mean(worker['pss'] for worker in workers) / 1024, 1),
+        'worker_private_mb': round(statistics.mean(worker['private'] for worker in workers) / 1024, 1),
+        'total_pss_mb': round((master['pss'] + sum(worker['pss'] for worker in workers)) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import, factory and gunicorn cold start time and worker memory.')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=400, help="Requests served before measuring memory.")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--target-ms', type=float, help="Fail if the preloaded cold start takes longer.")
+    args = parser.parse_args()
+
+    times = import_time(args.repeat)
+    print(f"interpreter + import + create_app {times['process_ms']:.0f} ms "
+          f"(import {times['import_ms']:.0f} ms, create_app {times['create_app_ms']:.1f} ms)")
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    uri = f'sqlite:///{path}'
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri})
+    try:
+        with app.app_context():
+            db.create_all()
+            db.session.remove()
+
+        results = {}
+        for name, preload in (('no preload', False), ('preload', True)):
+            runs = [cold_start(preload, uri, args) for _ in range(args.repeat)]
+            results[name] = result = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            print(f"{name:<11} first response {result['first_response_ms']:.0f} ms; per worker "
+                  f"RSS {result['worker_rss_mb']} MB, PSS {result['worker_pss_mb']} MB, "
+                  f"private {result['worker_private_mb']} MB; master PSS {result['master_pss_mb']} MB; "
+                  f"total PSS {result['total_pss_mb']} MB")
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    if args.target_ms is not None and results['preload']['first_response_ms'] > args.target_ms:
+        print(f"cold start {results['preload']['first_response_ms']:.0f} ms is over the {args.target_ms:.0f} ms target")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# bench_trends.py
+# Time to compute the analytics trends (trends.py) for a year of sales across
+# the catalogue on a freshly seeded SQLite database: the extract of the daily
+# rollups, the whole computation, and a repeat request served from the cache:
+#
+#   python -m benchmarks.bench_trends --products 100000 --sales 1000000
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from web_project.app import create_app
+from web_project.models import db, DailyProductSales
+from web_project import seed, trends
+
+app = create_app()
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Trend analytics computation time.')
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--sales', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    # Results are only cached in the shared cache
+    app.config.update(SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}', SHARED_CACHE_PATH=path + '.cache',
+                      SLOW_REQUEST_THRESHOLD=None)
+    try:
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            seed.generate(args.sales, products=args.products, orders=0, days=366, seed=args.seed)
+            print(f"seeded {args.products} products, {args.sales} sales in {time.perf_counter() - started:.1f} s")
+
+            end = datetime.utcnow().date() - timedelta(days=1)
+            start = end - timedelta(days=app.config['TREND_DAYS'] - 1)
+            rows = DailyProductSales.query.filter(DailyProductSales.day.between(start, end)).count()
+            print(f"{rows} product-day rows from {start} to {end}")
+
+            extract, _ = timed(lambda: trends._extract(start, end), args.repeat)
+            compute, result = timed(lambda: trends.compute(start, end), args.repeat)
+            trends.trends(start, end)
+            cached, _ = timed(lambda: trends.trends(start, end), args.repeat)
+            print(f"extract {extract:.0f} ms, full computation {compute:.0f} ms, cached {cached:.2f} ms")
+            print(f"{len(result['days'])} days, {len(result['weeks'])} weeks, "
+                  f"{sum(day['quantity'] for day in result['forecast']):.0f} units forecast "
+                  f"over the next {len(result['forecast'])} days")
+            db.session.remove()
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal', '.cache', '.cache-wal', '.cache-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,345 @@
+# harness.py
+# End-to-end benchmark of the routes in web_project/views.py against a
+# database seeded by web_project/seed.py. Each scenario sends a fixed number
+# of requests from a pool of logged-in client threads and reports p50/p95/p99
+# latency, throughput and errors; the run also reports peak RSS. Requests go
+# either through the Flask test client, in process, or over HTTP to a local
+# gunicorn started with benchmarks/wsgi.py.
+#
+#   python -m benchmarks.harness --sales 100000 --save-baseline
+#   python -m benchmarks.harness --sales 100000
+#   python -m benchmarks.harness --target gunicorn --workers 4 --concurrency 8
+#
+# A run is compared against the saved baseline (benchmarks/baseline.json by
+# default) and exits with status 1 if any scenario's p95 latency or
+# throughput, or the peak RSS, is more than --tolerance worse. Form posts
+# follow their redirect like a browser does, so add_sale is timed up to the
+# rendered dashboard.
+import argparse
+import http.cookiejar
+import json
+import multiprocessing
+import os
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, timedelta
+
+from web_project.app import create_app
+from web_project.models import db, Product, Order
+from web_project import seed
+
+# Every client session logs in, more often than the login limits allow
+app = create_app({'LOGIN_LIMITS': {'ip': (10 ** 9, 1), 'account': (10 ** 9, 1)}})
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+CREDENTIALS = {
+    'manager': {'email': seed.MANAGER_EMAIL, 'password': seed.PASSWORD},
+    'user': {'email': seed.seller_email(1), 'password': seed.PASSWORD},
+}
+
+
+# ---------- Scenarios ----------
+def scenarios(products, pending_orders):
+    # name -> (role of the logged-in client, whether every request starts
+    # from a fresh anonymous session, request builder)
+    today = date.today()
+    period = f'start_date={today - timedelta(days=30)}&end_date={today}'
+    pending = iter(pending_orders)
+    return {
+        'login': (None, True, lambda rng: ('POST', '/login/user', CREDENTIALS['user'])),
+        'manager_dashboard': ('manager', False, lambda rng: ('GET', '/manager_dashboard', None)),
+        'user_dashboard': ('user', False, lambda rng: ('GET', '/user_dashboard', None)),
+        'inventory': ('manager', False, lambda rng: ('GET', '/inventory', None)),
+        'suppliers': ('manager', False, lambda rng: ('GET', '/suppliers', None)),
+        'analytics': ('manager', False, lambda rng: ('GET', f'/analytics?{period}', None)),
+        'confirm_orders': ('manager', False, lambda rng: ('GET', '/confirm_orders', None)),
+        'add_sale': ('user', False, lambda rng: (
+            'POST', '/add_sale', {'product_id': rng.choice(products), 'quantity': 1})),
+        'approve_order': ('manager', False, lambda rng: (
+            'POST', '/confirm_orders', {'order_id': next(pending, 0), 'action': 'approve'})),
+    }
+
+
+# ---------- Clients ----------
+class TestClientSession:
+    def __init__(self, base_url=None):
+        self.client = app.test_client()
+
+    def reset(self):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        return self.client.open(path, method=method, data=data, follow_redirects=True).status_code
+
+
+class HTTPSession:
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def reset(self):
+        self.cookies.clear()
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        try:
+            with self.opener.open(urllib.request.Request(self.base_url + path, data=body, method=method)) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            error.read()
+            return error.code
+
+
+def open_session(session_class, base_url, role):
+    session = session_class(base_url)
+    if role is not None:
+        status = session.request('POST', f'/login/{role}', CREDENTIALS[role])
+        if status != 200:
+            raise RuntimeError(f"login as {role} failed with status {status}")
+    return session
+
+
+# ---------- Measurement ----------
+def run_scenario(sessions, build, fresh, requests, seed_value):
+    per_session = [requests // len(sessions) + (index < requests % len(sessions)) for index in range(len(sessions))]
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def worker(index):
+        rng = random.Random(seed_value * 1000 + index)
+        session, mine, failed = sessions[index], [], 0
+        for _ in range(per_session[index]):
+            method, path, data = build(rng)
+            if fresh:
+                session.reset()
+            started = time.perf_counter()
+            status = session.request(method, path, data)
+            mine.append(time.perf_counter() - started)
+            failed += status >= 400
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(len(sessions))]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'p50_ms': round(cuts[49] * 1000, 2),
+        'p95_ms': round(cuts[94] * 1000, 2),
+        'p99_ms': round(cuts[98] * 1000, 2),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+    }
+
+
+def peak_rss_mb(pids):
+    # Largest high-water mark among the given processes, from /proc
+    peak = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/status') as status:
+                for line in status:
+                    if line.startswith('VmHWM:'):
+                        peak = max(peak, int(line.split()[1]))
+        except FileNotFoundError:
+            pass
+    return round(peak / 1024, 1)
+
+
+def child_pids(parent):
+    children = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as stat:
+                    if int(stat.read().rsplit(')', 1)[1].split()[1]) == parent:
+                        children.append(int(entry))
+            except (FileNotFoundError, IndexError, ValueError):
+                pass
+    return children
+
+
+# ---------- Setup ----------
+def seed_database(uri, args):
+    # Seeded in a child process so generating rows does not count towards
+    # this process's peak RSS
+    def target():
+        app.config['SQLALCHEMY_DATABASE_URI'] = uri
+        with app.app_context():
+            db.create_all()
+            seed.generate(args.sales, seed=args.seed, echo=lambda message: print(f"  seeded {message}"))
+
+    process = multiprocessing.get_context('fork').Process(target=target)
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        sys.exit("seeding failed")
+
+
+def start_gunicorn(uri, cache_path, args):
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    env = dict(os.environ, BENCH_DATABASE_URI=uri, BENCH_PAGE_CACHE='0' if args.no_page_cache else '1')
+    if cache_path:
+        env['SHARED_CACHE_PATH'] = cache_path
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--workers', str(args.workers), '--worker-class', 'gthread',
+         '--threads', str(args.threads), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+         'benchmarks.wsgi:app'],
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            break
+        except OSError:
+            if server.poll() is not None or time.monotonic() > deadline:
+                server.kill()
+                sys.exit("gunicorn did not start")
+            time.sleep(0.1)
+    return server, f'http://127.0.0.1:{port}'
+
+
+# ---------- Baseline ----------
+def compare(report, baseline, tolerance):
+    if baseline['settings'] != report['settings']:
+        print(f"warning: baseline was recorded with different settings: {baseline['settings']}")
+
+    regressions = []
+    print(f"\n{'scenario':<20}{'p95 ms':>22}{'req/s':>24}")
+    for name, result in report['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if before is None:
+            continue
+        p95_change = result['p95_ms'] / before['p95_ms'] - 1 if before['p95_ms'] else 0.0
+        rps_change = result['throughput_rps'] / before['throughput_rps'] - 1 if before['throughput_rps'] else 0.0
+        flag = ''
+        if p95_change > tolerance or rps_change < -tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<20}{before['p95_ms']:>9.2f} -> {result['p95_ms']:>7.2f} {p95_change:+6.0%}"
+              f"{before['throughput_rps']:>9.1f} -> {result['throughput_rps']:>7.1f} {rps_change:+6.0%}{flag}")
+
+    rss_change = report['peak_rss_mb'] / baseline['peak_rss_mb'] - 1 if baseline['peak_rss_mb'] else 0.0
+    print(f"peak RSS {baseline['peak_rss_mb']} -> {report['peak_rss_mb']} MB ({rss_change:+.0%})")
+    if rss_change > tolerance:
+        regressions.append('peak RSS')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Route latency, throughput and memory benchmark.')
+    parser.add_argument('--target', choices=('test-client', 'gunicorn'), default='test-client')
+    parser.add_argument('--sales', type=int, default=100000, help="Sales to seed (other tables scale with it).")
+    parser.add_argument('--database', help="Seeded SQLite file to reuse; created and seeded if missing. "
+                                           "Runs modify it (sales, approvals).")
+    parser.add_argument('--requests', type=int, default=500, help="Requests per scenario.")
+    parser.add_argument('--concurrency', type=int, default=4, help="Client threads.")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn workers.")
+    parser.add_argument('--threads', type=int, default=4, help="Threads per gunicorn worker.")
+    parser.add_argument('--scenario', action='append', help="Run only these scenarios (repeatable).")
+    parser.add_argument('--no-page-cache', action='store_true')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline.")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed relative slowdown.")
+    args = parser.parse_args()
+
+    if args.database:
+        path, temporary = os.path.abspath(args.database), False
+    else:
+        handle, path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        os.remove(path)
+        temporary = True
+    uri = f'sqlite:///{path}'
+    # The page cache needs data versions shared by the gunicorn workers
+    cache_path = None if args.no_page_cache else path + '.cache'
+
+    server = None
+    try:
+        if not os.path.exists(path):
+            print(f"Seeding {args.sales} sales into {path}")
+            seed_database(uri, args)
+
+        app.config.update(SQLALCHEMY_DATABASE_URI=uri, WTF_CSRF_ENABLED=False, SLOW_REQUEST_THRESHOLD=None,
+                          PAGE_CACHE_ENABLED=not args.no_page_cache, SHARED_CACHE_PATH=cache_path)
+        with app.app_context():
+            products = [product_id for (product_id,) in db.session.query(Product.id).filter(Product.stock > 0)]
+            pending = [order_id for (order_id,) in db.session.query(Order.id).filter(Order.status == 'pending')]
+            db.session.remove()
+        plan = scenarios(products, pending)
+        names = args.scenario or list(plan)
+
+        if args.target == 'gunicorn':
+            server, base_url = start_gunicorn(uri, cache_path, args)
+            session_class = HTTPSession
+        else:
+            base_url, session_class = None, TestClientSession
+
+        results = {}
+        for name in names:
+            role, fresh, build = plan[name]
+            sessions = [open_session(session_class, base_url, role) for _ in range(args.concurrency)]
+            sessions[0].request('GET', '/')  # warm up
+            results[name] = result = run_scenario(sessions, build, fresh, args.requests, args.seed)
+            print(f"{name:<20} p50 {result['p50_ms']:>8.2f} ms  p95 {result['p95_ms']:>8.2f} ms  "
+                  f"p99 {result['p99_ms']:>8.2f} ms  {result['throughput_rps']:>8.1f} req/s  "
+                  f"{result['errors']} errors")
+
+        if server is not None:
+            rss = peak_rss_mb([server.pid] + child_pids(server.pid))
+        else:
+            rss = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        print(f"peak RSS {rss} MB")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if temporary and os.path.exists(path):
+            os.remove(path)
+        for suffix in ('', '-wal', '-shm'):
+            if cache_path and os.path.exists(cache_path + suffix):
+                os.remove(cache_path + suffix)
+
+    report = {
+        'settings': {key: getattr(args, key) for key in
+                     ('target', 'sales', 'requests', 'concurrency', 'workers', 'threads', 'no_page_cache')},
+        'scenarios': results,
+        'peak_rss_mb': rss,
+    }
+    if args.save_baseline:
+        with open(args.baseline, 'w') as handle:
+            json.dump(report, handle, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as handle:
+            regressions = compare(report, json.load(handle), args.tolerance)
+        if regressions:
+            sys.exit(f"Regressed: {', '.join(regressions)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# load_add_sale.py
+# Fires concurrent POST /add_sale requests at a single product from several
+# processes sharing one SQLite file, the way gunicorn workers do, and checks
+# that stock never oversells. Run with increasing worker counts to see how
+# throughput scales:
+#
+#   python -m benchmarks.load_add_sale --workers 1 2 4 8 --sales 2000
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from web_project.app import create_app
+from web_project.models import db, User, Product, Sale
+from web_project.stock import open_balances
+
+app = create_app()
+
+INITIAL_STOCK_RATIO = 0.8  # less stock than requested, so some sales must be refused
+
+
+def setup_database(path, sales):
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seller = User(username='seller', email='seller@example.com', password='x', role='user', is_active=True)
+        db.session.add(seller)
+        db.session.flush()
+        product = Product(name='hot product', price=9.99, stock=int(sales * INITIAL_STOCK_RATIO), user_id=seller.id)
+        db.session.add(product)
+        db.session.commit()
+        open_balances()
+        seller_id, product_id, stock = seller.id, product.id, product.stock
+
+    # Serve one request before forking so per-app startup work runs once
+    app.test_client().get('/')
+    return seller_id, product_id, stock
+
+
+def worker(path, user_id, product_id, count, results):
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    with app.app_context():
+        db.engine.dispose()  # never share a connection inherited across fork
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+
+    statuses = {}
+    try:
+        for _ in range(count):
+            response = client.post('/add_sale', data={'product_id': product_id, 'quantity': 1})
+            with client.session_transaction() as session:
+                flashes = session.pop('_flashes', [])
+            category = flashes[0][0] if flashes else str(response.status_code)
+            statuses[category] = statuses.get(category, 0) + 1
+    except Exception as error:
+        statuses[type(error).__name__] = statuses.get(type(error).__name__, 0) + 1
+    finally:
+        results.put(statuses)
+
+
+def run(path, workers, sales):
+    user_id, product_id, initial_stock = setup_database(path, sales)
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    per_worker = sales // workers
+    processes = [
+        context.Process(target=worker, args=(path, user_id, product_id, per_worker, results))
+        for _ in range(workers)
+    ]
+
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    totals = {}
+    for _ in processes:
+        for category, count in results.get().items():
+            totals[category] = totals.get(category, 0) + count
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        stock = db.session.query(Product.on_hand).filter(Product.id == product_id).scalar()
+        sold = db.session.query(db.func.coalesce(db.func.sum(Sale.quantity), 0)).scalar()
+
+    consistent = stock >= 0 and stock + sold == initial_stock
+    print(f"{workers:>7} {per_worker * workers:>9} {elapsed:>8.2f}s {per_worker * workers / elapsed:>10.0f} "
+          f"{sold:>6} {stock:>6}  {'ok' if consistent else 'OVERSOLD'}  {totals}")
+    return consistent
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent add_sale load test against one product.')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--sales', type=int, default=2000)
+    args = parser.parse_args()
+
+    app.config['TESTING'] = True
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    try:
+        print(f"{'workers':>7} {'requests':>9} {'elapsed':>9} {'req/s':>10} {'sold':>6} {'stock':>6}  result")
+        ok = all([run(path, workers, args.sales) for workers in args.workers])
+    finally:
+        os.remove(path)
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,16 @@
+# wsgi.py
+# Entry point for the gunicorn runs of benchmarks/harness.py. Points the app
+# at the benchmark database, turns off CSRF so the harness can post forms,
+# lifts the login rate limits so its sessions can all log in, and turns off
+# the slow-request log so it does not skew timings.
+import os
+
+from web_project.app import create_app
+
+app = create_app({
+    'SQLALCHEMY_DATABASE_URI': os.environ['BENCH_DATABASE_URI'],
+    'WTF_CSRF_ENABLED': False,
+    'SLOW_REQUEST_THRESHOLD': None,
+    'LOGIN_LIMITS': {'ip': (10 ** 9, 1), 'account': (10 ** 9, 1)},
+    'PAGE_CACHE_ENABLED': os.environ.get('BENCH_PAGE_CACHE', '1') == '1',
+})
@@ -0,0 +1,34 @@
+# gunicorn.conf.py
+# Production server settings, used by the Procfile. With preload_app the
+# master imports and builds the app once, warms it up, and forks it into the
+# workers: a worker starts serving in milliseconds instead of repeating the
+# imports and setup, and the memory pages holding all that stay shared
+# between the processes copy-on-write.
+import gc
+import os
+
+wsgi_app = 'web_project.app:create_app()'
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# Each open live-update stream (web_project/live.py) holds one of these threads;
+# LIVE_MAX_STREAMS caps them per worker and must stay below this
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+
+def when_ready(server):
+    # In the master, after the app is loaded and before the first fork
+    if not server.cfg.preload_app:
+        return
+    from web_project.app import warm_up
+    warm_up(server.app.wsgi())
+    # A collection in a worker writes to the GC header of every object it
+    # visits, which would copy the shared pages they live on; frozen objects
+    # are never visited
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from web_project.models import db
+        db.dispose_engines(server.app.wsgi())
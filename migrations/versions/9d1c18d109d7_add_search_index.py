@@ -0,0 +1,64 @@
+"""add search_index: the FTS5 table behind search.py, filled from the tables
+
+Revision ID: 9d1c18d109d7
+Revises: f6b50db6a1d6
+Create Date: 2026-10-18 15:02:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d1c18d109d7'
+down_revision = 'f6b50db6a1d6'
+branch_labels = None
+depends_on = None
+
+# As in search.py at this revision; later changes come with their own migration
+CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE search_index USING fts5("
+    "text, kind, owner, label UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3 4 5 6 7 8')"
+)
+
+
+def _fold(column):
+    return f"replace(replace({column}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def upgrade():
+    connection = op.get_bind()
+    # Other databases search with LIKE queries and need nothing here
+    if connection.dialect.name != 'sqlite':
+        return
+    # Created by db.create_all() or `flask rebuild-search` already
+    if connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'"
+    ).first() is not None:
+        return
+    try:
+        connection.exec_driver_sql(CREATE_INDEX)
+    except sa.exc.OperationalError:  # SQLite built without FTS5
+        return
+
+    # rowid = id * 4 + kind code, see search.py
+    op.execute(
+        "INSERT INTO search_index (rowid, text, kind, owner, label) "
+        f"SELECT id * 4 + 1, {_fold('name')}, 'product', CAST(user_id AS TEXT), name FROM product"
+    )
+    op.execute(
+        "INSERT INTO search_index (rowid, text, kind, owner, label) "
+        f"SELECT id * 4 + 2, {_fold('name')}, 'supplier', '', name FROM supplier"
+    )
+    user_text = _fold("username || ' ' || email")
+    op.execute(
+        "INSERT INTO search_index (rowid, text, kind, owner, label) "
+        f"SELECT id * 4 + 3, {user_text}, 'user', '', username FROM \"user\""
+    )
+    op.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS search_index")
@@ -0,0 +1,49 @@
+# conftest.py
+# A small seeded SQLite database per test, apps on it, and a client logged
+# in as the manager.
+import os
+import tempfile
+
+import pytest
+
+from web_project import seed
+from web_project.app import create_app
+from web_project.models import db
+
+
+def make_app(path, **config):
+    settings = dict(TESTING=True, SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}', WTF_CSRF_ENABLED=False,
+                    PASSWORD_HASHER='pbkdf2:sha256:1000', PAGE_CACHE_ENABLED=False, JOB_WORKER_THREADS=0)
+    return create_app(dict(settings, **config))
+
+
+def login(app, email=seed.MANAGER_EMAIL, role='manager'):
+    client = app.test_client()
+    response = client.post(f'/login/{role}', data={'email': email, 'password': seed.PASSWORD})
+    assert response.status_code == 302
+    client.get(response.headers['Location'])  # shows the login's flash message, as a browser would
+    return client
+
+
+@pytest.fixture
+def database():
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    with make_app(path).app_context():
+        db.create_all()
+        seed.generate(500, products=20, sellers=5, orders=10)
+        db.session.remove()
+    yield path
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+@pytest.fixture
+def app(database):
+    return make_app(database)
+
+
+@pytest.fixture
+def manager(app):
+    return login(app)
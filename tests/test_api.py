@@ -0,0 +1,64 @@
+# test_api.py
+import gzip
+import json
+from datetime import datetime
+
+import brotli
+import pytest
+
+from web_project.models import db, Product, Sale
+
+
+def test_delta_sync(app, manager):
+    with app.app_context():
+        db.session.execute(Sale.__table__.update().values(updated_at=datetime(2020, 1, 1)))
+        changed = [sale.id for sale in Sale.query.order_by(Sale.id.desc()).limit(3)]
+        for sale_id in changed:
+            db.session.get(Sale, sale_id).quantity += 1
+        db.session.commit()
+        db.session.remove()
+
+    page = manager.get('/api/v1/sales?updated_since=2025-01-01T00:00:00Z&per_page=2&fields=id').get_json()
+    received = [row['id'] for row in page['data']]
+    assert page['synced_at'] and page['next']
+    page = manager.get(page['next']).get_json()
+    received += [row['id'] for row in page['data']]
+    assert page['next'] is None
+    assert sorted(received) == sorted(changed)
+
+    assert manager.get('/api/v1/sales?updated_since=yesterday').status_code == 400
+
+
+def test_etag_revalidation(app, manager):
+    url = '/api/v1/products?fields=id,name'
+    first = manager.get(url)
+    etag = first.headers['ETag']
+    unchanged = manager.get(url, headers={'If-None-Match': etag})
+    assert unchanged.status_code == 304
+    assert unchanged.data == b''
+
+    with app.app_context():
+        Product.query.order_by(Product.id).first().name = 'Renamed'
+        db.session.commit()
+        db.session.remove()
+    changed = manager.get(url, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.get_json()['data'][0]['name'] == 'Renamed'
+
+
+@pytest.mark.parametrize('encoding, decompress', [('gzip', gzip.decompress), ('br', brotli.decompress)])
+def test_compression(manager, encoding, decompress):
+    url = '/api/v1/sales?per_page=200'
+    plain = manager.get(url, headers={'Accept-Encoding': 'identity'})
+    compressed = manager.get(url, headers={'Accept-Encoding': encoding})
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == encoding
+    assert len(compressed.data) < len(plain.data)
+    assert json.loads(decompress(compressed.data))['data'] == plain.get_json()['data']
+
+    # One ETag per representation, each revalidating on its own
+    etag = compressed.headers['ETag']
+    assert etag != plain.headers['ETag']
+    assert manager.get(url, headers={'Accept-Encoding': encoding, 'If-None-Match': etag}).status_code == 304
+    assert manager.get(url, headers={'Accept-Encoding': 'identity', 'If-None-Match': etag}).status_code == 200
@@ -0,0 +1,66 @@
+# test_bulk.py
+import json
+
+from conftest import make_app, login
+from web_project.models import db, Job, Order, User
+
+JSON = {'Accept': 'application/json'}
+
+
+def test_orders(app, manager):
+    with app.app_context():
+        orders = Order.query.order_by(Order.id).limit(4).all()
+        for order, status in zip(orders, ('pending', 'pending', 'pending', 'approved')):
+            order.status = status
+        db.session.commit()
+        first, *rest, decided = (order.id for order in orders)
+        db.session.remove()
+
+    summary = manager.post('/confirm_orders', headers=JSON, data={
+        'action': 'approve', 'order_ids': [first, decided, 999999, 'abc', first],
+    }).get_json()
+    assert summary['results'] == {str(first): 'approved', str(decided): 'not_pending', '999999': 'not_found',
+                                  'abc': 'invalid'}
+    assert summary['counts'] == {'approved': 1, 'not_pending': 1, 'not_found': 1, 'invalid': 1}
+
+    summary = manager.post('/confirm_orders', headers=JSON, data={
+        'action': 'reject', 'order_ids': rest + [first],
+    }).get_json()
+    assert summary['results'] == {str(rest[0]): 'rejected', str(rest[1]): 'rejected', str(first): 'not_pending'}
+
+    with app.app_context():
+        statuses = dict(db.session.query(Order.id, Order.status).filter(Order.id.in_([first] + rest)))
+        assert statuses == {first: 'approved', rest[0]: 'rejected', rest[1]: 'rejected'}
+        # Only the approved order is received into stock, by a job
+        [job] = Job.query.filter_by(kind='receive_orders').all()
+        assert json.loads(job.payload) == {'order_ids': [first]}
+        db.session.remove()
+
+
+def test_users(app, manager):
+    with app.app_context():
+        inactive, active = (user.id for user in User.query.filter_by(role='user').order_by(User.id).limit(2))
+        db.session.get(User, inactive).is_active = False
+        db.session.commit()
+        manager_id = User.query.filter_by(role='manager').first().id
+        db.session.remove()
+
+    summary = manager.post('/manage_users', headers=JSON, data={
+        'action': 'approve', 'user_ids': [inactive, active, manager_id],
+    }).get_json()
+    assert summary['results'] == {str(inactive): 'approved', str(active): 'already_active',
+                                  str(manager_id): 'not_found'}
+
+    summary = manager.post('/manage_users', headers=JSON, data={'action': 'delete', 'user_ids': [active]}).get_json()
+    assert summary['results'] == {str(active): 'deletion_queued'}
+    with app.app_context():
+        assert db.session.get(User, inactive).is_active
+        assert not db.session.get(User, active).is_active
+        assert [json.loads(job.payload) for job in Job.query.filter_by(kind='delete_user')] == [{'user_id': active}]
+        db.session.remove()
+
+
+def test_too_many_items(database):
+    manager = login(make_app(database, BULK_MAX_ITEMS=2))
+    response = manager.post('/confirm_orders', headers=JSON, data={'action': 'reject', 'order_ids': [1, 2, 3]})
+    assert response.status_code == 400
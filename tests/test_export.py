@@ -0,0 +1,14 @@
+# test_export.py
+import csv
+import io
+
+from web_project import export
+
+
+def test_sales_exports_share_a_header(manager):
+    for url in ('/manager_dashboard/export/csv', '/analytics/export/csv'):
+        response = manager.get(url)
+        assert response.status_code == 200
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        assert rows[0] == export.SALES_HEADER
+        assert len(rows) > 1
@@ -0,0 +1,79 @@
+# test_ingest.py
+from conftest import login, make_app
+from web_project import stock
+from web_project.models import db, Product, Sale, User
+
+
+def stocked_products(app, *units):
+    # (product_id, owner email) for products with exactly `units` each at the default location
+    with app.app_context():
+        products = db.session.query(Product).filter(Product.on_hand > 0).order_by(Product.id).limit(len(units)).all()
+        result = []
+        for product, count in zip(products, units):
+            stock.adjust(product.id, count - product.on_hand)
+            result.append((product.id, product.owner.email))
+        db.session.commit()
+        db.session.remove()
+    return result
+
+
+def test_rows_are_reported_and_skipped(database):
+    app = make_app(database, INGEST_CHUNK_SIZE=2)  # so good and bad rows share and span chunks
+    (first, _), (second, _) = stocked_products(app, 5, 1)
+    with app.app_context():
+        seller_id = User.query.filter_by(role='user').order_by(User.id).first().id
+        sales_before = Sale.query.count()
+        db.session.remove()
+
+    records = [
+        {'product_id': first, 'quantity': 2, 'user_id': seller_id},
+        {'product_id': 'x', 'quantity': 1, 'user_id': seller_id},
+        {'product_id': first, 'quantity': 0, 'user_id': seller_id},
+        {'product_id': 999999, 'quantity': 1, 'user_id': seller_id},
+        {'product_id': second, 'quantity': 2, 'user_id': seller_id},
+        {'product_id': first, 'quantity': 1, 'user_id': 999999},
+        {'product_id': first, 'quantity': 1, 'user_id': seller_id, 'sale_date': 'yesterday'},
+        {'product_id': first, 'quantity': 1, 'user_id': seller_id, 'location_id': 999999},
+        {'product_id': first, 'quantity': 3, 'user_id': seller_id, 'sale_date': '2026-01-02T10:00:00'},
+        {'product_id': first, 'quantity': 1, 'user_id': seller_id},
+        'not a sale',
+    ]
+    report = login(app).post('/api/sales/batch', json={'sales': records}).get_json()
+
+    assert report['received'] == 11
+    assert report['inserted'] == 2
+    assert report['errors'] == [
+        {'row': 2, 'error': 'invalid product_id'},
+        {'row': 3, 'error': 'quantity must be a positive integer'},
+        {'row': 4, 'error': 'unknown product'},
+        {'row': 5, 'error': 'insufficient stock'},
+        {'row': 6, 'error': 'unknown user'},
+        {'row': 7, 'error': 'invalid sale_date'},
+        {'row': 8, 'error': 'unknown location'},
+        {'row': 10, 'error': 'insufficient stock'},  # rows 1 and 9 took all 5
+        {'row': 11, 'error': 'not an object'},
+    ]
+    with app.app_context():
+        assert Sale.query.count() == sales_before + 2
+        assert stock.on_hand(first, stock.default_location()) == 0
+        assert stock.on_hand(second, stock.default_location()) == 1
+        db.session.remove()
+
+
+def test_sellers_upload_their_own_sales(app):
+    [(product_id, owner)] = stocked_products(app, 3)
+    csv = f'product_id,quantity,user_id\n{product_id},2,1\n{product_id},x,1\n'
+    report = login(app, owner, 'user').post('/api/sales/batch', data=csv, content_type='text/csv').get_json()
+
+    assert report == {'received': 2, 'inserted': 1,
+                      'errors': [{'row': 2, 'error': 'quantity must be a positive integer'}]}
+    with app.app_context():
+        seller_id = User.query.filter_by(email=owner).one().id
+        sale = Sale.query.filter_by(product_id=product_id).order_by(Sale.id.desc()).first()
+        assert (sale.user_id, sale.quantity) == (seller_id, 2)
+        db.session.remove()
+
+
+def test_unparsable_upload(manager):
+    response = manager.post('/api/sales/batch', data='{"sales": ', content_type='application/json')
+    assert response.status_code == 400
@@ -0,0 +1,19 @@
+# test_instrumentation.py
+from flask import g
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from web_project.models import db
+
+
+def test_failed_statement_leaves_no_timing_behind(app):
+    with app.test_request_context():
+        try:
+            db.session.execute(text('SELECT * FROM no_such_table'))
+        except OperationalError:
+            db.session.rollback()
+        assert not db.session.connection().info.get('statement_started')
+
+        db.session.execute(text('SELECT 1'))
+        assert g.sql_seconds < 1
+        db.session.remove()
@@ -0,0 +1,51 @@
+# test_live.py
+import re
+from html import unescape
+
+from conftest import login, make_app
+from web_project.models import db, Product
+
+
+def live_url(manager):
+    page = manager.get('/manager_dashboard').get_data(as_text=True)
+    return unescape(re.search(r'data-live="([^"]+)"', page).group(1))
+
+
+def test_streams_per_process_are_capped(database):
+    manager = login(make_app(database, LIVE_MAX_STREAMS=1, LIVE_FALLBACK_POLL=7))
+    url = live_url(manager)
+
+    first = manager.get(url, buffered=False)
+    assert first.status_code == 200
+    refused = manager.get(url, buffered=False)
+    assert refused.status_code == 503
+    assert refused.headers['Retry-After'] == '7'
+
+    first.close()
+    again = manager.get(url, buffered=False)
+    assert again.status_code == 200
+    again.close()
+
+
+def test_single_check_for_polling_pages(database):
+    app = make_app(database, LIVE_MAX_STREAMS=0)
+    manager = login(app)
+    url = live_url(manager)
+    assert manager.get(url, buffered=False).status_code == 503
+
+    with app.app_context():
+        product = db.session.query(Product).filter(Product.on_hand > 0).order_by(Product.id).first()
+        product_id, owner = product.id, product.owner.email
+        db.session.remove()
+    login(app, owner, 'user').post('/add_sale', data={'product_id': product_id, 'quantity': 1})
+
+    response = manager.get(url + '&once=1')
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert body.startswith('retry: 15000\n\n')
+    assert 'event: sale\n' in body and 'event: stock\n' in body
+    cursor = re.findall(r'^id: (\S+)', body, re.MULTILINE)[-1]
+
+    # Nothing new after the cursor it returned
+    response = manager.get(re.sub(r'after=[^&]+', 'after=' + cursor, url) + '&once=1')
+    assert 'event:' not in response.get_data(as_text=True)
@@ -0,0 +1,44 @@
+# test_pagecache.py
+# Two apps on one database stand in for two gunicorn workers.
+import os
+
+import pytest
+
+from conftest import login, make_app
+from web_project.models import db, Product
+
+
+@pytest.fixture
+def workers(database):
+    path = database + '.cache'
+    yield [make_app(database, PAGE_CACHE_ENABLED=True, SHARED_CACHE_PATH=path) for _ in range(2)]
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def test_commit_in_another_worker_invalidates(workers):
+    first, second = workers
+    manager = login(first)
+    etag = manager.get('/manager_dashboard').headers['ETag']
+    assert manager.get('/manager_dashboard', headers={'If-None-Match': etag}).status_code == 304
+
+    with second.app_context():
+        db.session.get(Product, 1).name = 'renamed in the other worker'
+        db.session.commit()
+
+    response = manager.get('/manager_dashboard', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert 'renamed in the other worker' in response.get_data(as_text=True)
+
+
+def test_no_304_without_the_cached_page(workers):
+    first, second = workers
+    etag = login(first).get('/manager_dashboard').headers['ETag']
+    response = login(second).get('/manager_dashboard', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+
+
+def test_disabled_without_shared_versions(database):
+    manager = login(make_app(database, PAGE_CACHE_ENABLED=True))
+    assert 'ETag' not in manager.get('/manager_dashboard').headers
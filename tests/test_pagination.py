@@ -0,0 +1,47 @@
+# test_pagination.py
+import base64
+import json
+
+import pytest
+
+from web_project.pagination import encode_cursor
+
+
+def cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def test_next_page(manager):
+    first = manager.get('/api/v1/products?per_page=5').get_json()
+    assert first['next']
+    second = manager.get(first['next']).get_json()
+    assert second['data'][0]['id'] == first['data'][-1]['id'] + 1
+
+
+@pytest.mark.parametrize('after', [
+    cursor([{'a': 1}]),
+    cursor([[1]]),
+    cursor(['1']),
+    cursor([True]),
+    cursor([2 ** 70]),
+    cursor([1, 2]),
+    'not a cursor',
+])
+def test_malformed_cursor(manager, after):
+    assert manager.get('/api/v1/products', query_string={'after': after}).status_code == 400
+
+
+def test_cursor_types_per_sort_column(manager):
+    url = '/manager_dashboard?sales_after='
+    assert manager.get(url + encode_cursor(['2024-01-01T00:00:00', 1])).status_code == 200
+    assert manager.get(url + encode_cursor([20240101, 1])).status_code == 400
+    assert manager.get('/manager_dashboard?sales_sort=total&sales_after=' + encode_cursor([9.5, 1])).status_code == 200
+    assert manager.get('/manager_dashboard?sales_sort=total&sales_after=' + encode_cursor([None, 1])).status_code == 400
+
+
+def test_end_date_on_the_last_day(manager):
+    everything = manager.get('/manager_dashboard?sales_per_page=50').get_data(as_text=True).count('data-sale-id')
+    response = manager.get('/manager_dashboard?sales_per_page=50&sales_end=9999-12-31')
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).count('data-sale-id') == everything
+    assert manager.get('/analytics/export/csv?end_date=9999-12-31').status_code == 200
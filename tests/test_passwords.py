@@ -0,0 +1,17 @@
+# test_passwords.py
+import pytest
+from werkzeug.security import generate_password_hash
+
+from web_project.passwords import WerkzeugHasher
+
+
+@pytest.mark.parametrize('method', ['pbkdf2:sha256', 'pbkdf2', 'scrypt', 'pbkdf2:sha256:600000'])
+def test_short_method_names_do_not_rehash_every_login(method):
+    hasher = WerkzeugHasher(method)
+    assert not hasher.needs_rehash(hasher.hash('secret'))
+
+
+def test_other_cost_rehashes():
+    hasher = WerkzeugHasher('pbkdf2:sha256')
+    assert hasher.needs_rehash(generate_password_hash('secret', method='pbkdf2:sha256:1000'))
+    assert hasher.needs_rehash(generate_password_hash('secret', method='scrypt'))
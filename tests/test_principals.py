@@ -0,0 +1,17 @@
+# test_principals.py
+# Two apps on one database stand in for two gunicorn workers.
+from conftest import login, make_app
+from web_project import seed
+
+
+def test_revocation_reaches_other_workers_without_shared_cache(database):
+    # Stamps expire at once, so every request revalidates
+    first, second = [make_app(database, SESSION_PRINCIPAL_TTL=0) for _ in range(2)]
+    seller = login(first, seed.seller_email(1), 'user')
+    assert seller.get('/user_dashboard').status_code == 200
+
+    manager = login(second)
+    response = manager.post('/manage_users', data={'user_id': 2, 'action': 'delete'})
+    assert response.status_code == 302
+
+    assert seller.get('/user_dashboard').status_code == 302
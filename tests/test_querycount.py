@@ -0,0 +1,26 @@
+# test_querycount.py
+# The per-view SQL budgets (querycount.py) are enforced while testing, so a
+# view that goes back to loading relationships row by row fails here.
+import pytest
+
+from web_project import queries
+from web_project.models import Sale
+from web_project.querycount import QueryBudgetExceeded
+
+
+# One user and one product on their own lists, so the sales rows cannot
+# find theirs already loaded
+DASHBOARD = '/manager_dashboard?sales_per_page=50&users_per_page=1&inventory_per_page=1'
+
+
+def test_list_view_within_budget(manager):
+    response = manager.get(DASHBOARD)
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).count('data-sale-id') == 50
+
+
+def test_list_view_over_budget(manager, monkeypatch):
+    # Without the eager loads every row's product and buyer are queries of their own
+    monkeypatch.setattr(queries, 'dashboard_sales', lambda **filters: Sale.query)
+    with pytest.raises(QueryBudgetExceeded, match='manager_dashboard issued'):
+        manager.get(DASHBOARD)
@@ -0,0 +1,20 @@
+# test_ratelimit.py
+import pytest
+
+from conftest import make_app
+from web_project import seed
+
+LIMITS = {'ip': (2, 600), 'account': (100, 600)}
+
+
+def attempt(client, address):
+    return client.post('/login/manager', data={'email': seed.MANAGER_EMAIL, 'password': 'wrong'},
+                       headers={'X-Forwarded-For': address}).status_code
+
+
+@pytest.mark.parametrize('hops, other_client', [(1, 200), (0, 429)])
+def test_ip_limit_per_forwarded_client(database, hops, other_client):
+    # Behind a proxy every request comes from its address; the client is in X-Forwarded-For
+    client = make_app(database, LOGIN_LIMITS=LIMITS, PROXY_FIX_HOPS=hops).test_client()
+    assert [attempt(client, '203.0.113.7') for _ in range(3)] == [200, 200, 429]
+    assert attempt(client, '198.51.100.2') == other_client
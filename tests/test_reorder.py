@@ -0,0 +1,59 @@
+# test_reorder.py
+from web_project import reorder, stock
+from web_project.models import db, Order, Product, ReorderPoint, Sale, Supplier
+
+
+def sold_out_product():
+    # A product with a supplier that sold 60 units today, with no stock
+    # left and nothing on order
+    product = Product.query.filter(Product.suppliers.any(Supplier.quantity > 0)).order_by(Product.id).first()
+    db.session.add(Sale(product_id=product.id, user_id=product.user_id, quantity=60, total_price=60 * product.price))
+    stock.adjust(product.id, -product.on_hand)
+    Order.query.filter_by(product_id=product.id, status='pending').update({Order.status: 'rejected'})
+    db.session.commit()
+    return product.id
+
+
+def pending(product_id):
+    return Order.query.filter_by(product_id=product_id, status='pending').all()
+
+
+def test_plan_orders_once(app):
+    with app.app_context():
+        product_id = sold_out_product()
+        first = reorder.plan('cheapest')
+        assert first['orders'] >= 1
+
+        [order] = pending(product_id)
+        point = db.session.get(ReorderPoint, product_id)
+        cheapest = (Supplier.query.filter(Supplier.product_id == product_id, Supplier.quantity > 0)
+                    .order_by(Supplier.price, Supplier.delivery_time, Supplier.id).first())
+        assert point.supplier_id == order.supplier_id == cheapest.id
+        assert point.reorder_point > 0
+        assert order.quantity == min(point.target_stock, cheapest.quantity)
+
+        # Nothing new while the orders are pending; the same points again
+        second = reorder.plan('cheapest')
+        assert second == dict(first, orders=0)
+        assert [o.id for o in pending(product_id)] == [order.id]
+        assert db.session.get(ReorderPoint, product_id).on_order == order.quantity
+
+        # Once it is decided, the product can be ordered again
+        order.status = 'rejected'
+        db.session.commit()
+        reorder.plan('cheapest')
+        assert len(pending(product_id)) == 1
+        db.session.remove()
+
+
+def test_plan_without_orders(app):
+    with app.app_context():
+        product_id = sold_out_product()
+        orders = Order.query.count()
+        result = reorder.plan('fastest', place_orders=False)
+        assert result['orders'] == 0 and result['strategy'] == 'fastest'
+        assert Order.query.count() == orders
+        fastest = (Supplier.query.filter(Supplier.product_id == product_id, Supplier.quantity > 0)
+                   .order_by(Supplier.delivery_time, Supplier.price, Supplier.id).first())
+        assert db.session.get(ReorderPoint, product_id).supplier_id == fastest.id
+        db.session.remove()
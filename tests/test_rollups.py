@@ -0,0 +1,64 @@
+# test_rollups.py
+from datetime import datetime
+
+import pytest
+
+from web_project import rollups
+from web_project.models import db, Sale, ProductDemand
+
+
+def snapshot():
+    # Rows whose sales were all deleted stay behind as zeros; a backfill has no such rows
+    tables = {}
+    for model, column in rollups.ROLLUPS:
+        keys = [model.day] + ([getattr(model, column)] if column else [])
+        tables[model.__name__] = {
+            tuple(row[:len(keys)]): (row.quantity, pytest.approx(row.total_price), row.sale_count)
+            for row in db.session.query(*keys, model.quantity, model.total_price, model.sale_count)
+            if row.sale_count
+        }
+    tables['ProductDemand'] = {
+        row.product_id: pytest.approx(row.weighted_quantity)
+        for row in ProductDemand.query if round(row.weighted_quantity, 6)
+    }
+    return tables
+
+
+def test_incremental_updates_match_a_backfill(app):
+    with app.app_context():
+        first, second = Sale.query.order_by(Sale.id).limit(2).all()
+        db.session.add(Sale(product_id=first.product_id, user_id=first.user_id, quantity=3, total_price=30.0,
+                            sale_date=datetime(2026, 3, 1, 12)))
+        db.session.commit()
+
+        # Moved to another day, product and seller, through a partly loaded row
+        edited = Sale.query.options(db.load_only(Sale.quantity)).get(first.id)
+        edited.quantity += 4
+        edited.total_price = 99.5
+        edited.sale_date = datetime(2026, 3, 2, 9)
+        edited.product_id = second.product_id
+        edited.user_id = second.user_id
+        db.session.commit()
+
+        db.session.delete(Sale.query.get(second.id))
+        db.session.commit()
+
+        incremental = snapshot()
+        rollups.rebuild()
+        assert incremental == snapshot()
+
+
+def test_totals_match_the_sales(app, manager):
+    with app.app_context():
+        total_price, quantity = db.session.query(db.func.sum(Sale.total_price), db.func.sum(Sale.quantity)).one()
+        assert rollups.totals() == (pytest.approx(total_price), quantity)
+
+        day = Sale.query.order_by(Sale.id).first().sale_date.date()
+        day_price, day_quantity = (db.session.query(db.func.sum(Sale.total_price), db.func.sum(Sale.quantity))
+                                   .filter(db.func.date(Sale.sale_date) == day.isoformat()).one())
+        assert rollups.totals(day, day) == (pytest.approx(day_price), day_quantity)
+        assert [(row.day, row.quantity) for row in rollups.by_day(day, day)] == [(day, day_quantity)]
+
+    page = manager.get('/analytics').get_data(as_text=True)
+    assert f'Total Sales: ${total_price:.2f}' in page
+    assert f'Total Products Sold: {quantity}' in page
@@ -0,0 +1,17 @@
+# test_search.py
+from conftest import make_app
+from web_project import search
+from web_project.models import db, Product
+
+
+def test_exact_and_leading_matches_survive_the_candidate_limit(database):
+    app = make_app(database, SEARCH_CANDIDATES=5)
+    with app.app_context():
+        # Inserted first, so they come first in the index
+        names = [f'blue widget {number}' for number in range(20)] + [f'widget {number}' for number in range(20)]
+        db.session.add_all(Product(name=name, price=1, stock=0, user_id=2) for name in names + ['widget'])
+        db.session.commit()
+
+        assert [result['label'] for result in search.search('widget', limit=3)] == ['widget', 'widget 0', 'widget 1']
+        assert all(result['label'].startswith('widget') for result in search.search('widg', limit=10))
+        db.session.remove()
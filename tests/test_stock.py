@@ -0,0 +1,133 @@
+# test_stock.py
+import threading
+import warnings
+
+import pytest
+from sqlalchemy.exc import SAWarning
+
+from conftest import login
+from web_project import stock
+from web_project.models import db, Product, Sale, StockMovement
+
+
+def test_sale_takes_stock_without_warnings(app):
+    with app.app_context():
+        product = db.session.query(Product).filter(Product.on_hand > 0).order_by(Product.id).first()
+        product_id, before = product.id, product.on_hand
+        owner = product.owner.email
+        db.session.remove()
+
+    seller = login(app, owner, 'user')
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', SAWarning)
+        response = seller.post('/add_sale', data={'product_id': product_id, 'quantity': 1})
+    assert response.status_code == 302
+
+    with app.app_context():
+        assert stock.on_hand(product_id, stock.default_location()) == before - 1
+        assert db.session.query(Sale).filter(Sale.product_id == product_id).count() > 0
+        db.session.remove()
+
+
+def stocked_product(app, units):
+    # A product with exactly `units` at the default location
+    with app.app_context():
+        product = db.session.query(Product).filter(Product.on_hand > 0).order_by(Product.id).first()
+        stock.adjust(product.id, units - product.on_hand)
+        db.session.commit()
+        product_id, user_id = product.id, product.user_id
+        db.session.remove()
+    return product_id, user_id
+
+
+def rows(product_id):
+    return (db.session.query(StockMovement).filter(StockMovement.product_id == product_id).count(),
+            db.session.query(Sale).filter(Sale.product_id == product_id).count())
+
+
+def test_oversell_is_rolled_back(app):
+    product_id, user_id = stocked_product(app, 2)
+    with app.app_context():
+        before = rows(product_id)
+        with pytest.raises(stock.OutOfStock):
+            stock.sell(product_id, 3, user_id)
+        assert stock.on_hand(product_id, stock.default_location()) == 2
+        assert rows(product_id) == before
+        db.session.remove()
+
+
+def test_concurrent_sales_never_oversell(app):
+    product_id, user_id = stocked_product(app, 3)
+    with app.app_context():
+        movements, sales = rows(product_id)
+        db.session.remove()
+    sellers = 8
+    barrier = threading.Barrier(sellers)
+    outcomes = []
+
+    def sell():
+        # Each thread has its own app context, so its own session and connection
+        with app.app_context():
+            barrier.wait()
+            try:
+                stock.sell(product_id, 1, user_id)
+                outcomes.append('sold')
+            except stock.OutOfStock:
+                outcomes.append('out of stock')
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=sell) for _ in range(sellers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(outcomes) == ['out of stock'] * (sellers - 3) + ['sold'] * 3
+    with app.app_context():
+        assert stock.on_hand(product_id, stock.default_location()) == 0
+        assert rows(product_id) == (movements + 3, sales + 3)
+        stock.compact()
+        assert stock.reconcile() == []
+        db.session.remove()
+
+
+def test_concurrent_compactions_sum_once(app, monkeypatch):
+    product_id, user_id = stocked_product(app, 10)
+    with app.app_context():
+        stock.compact()
+        stock.sell(product_id, 3, user_id)
+        db.session.remove()
+
+    # Each run waits before its upserts for the other to get there too, so
+    # without a claim both sum the same movements. With one, the second run
+    # waits on the first's write lock instead and the barrier times out.
+    barrier = threading.Barrier(2, timeout=1)
+    upsert = stock.upsert
+
+    def upsert_together(*args, **kwargs):
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+        return upsert(*args, **kwargs)
+
+    monkeypatch.setattr(stock, 'upsert', upsert_together)
+    summed = []
+
+    def compact():
+        with app.app_context():
+            summed.append(stock.compact())
+            db.session.remove()
+
+    threads = [threading.Thread(target=compact) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(summed) == [0, 1]
+    with app.app_context():
+        assert db.session.get(Product, product_id).stock == 7
+        assert stock.reconcile() == []
+        db.session.remove()
@@ -0,0 +1,55 @@
+# test_trends.py
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import login, make_app
+
+
+def test_trends_for_the_default_range(manager):
+    result = manager.get('/api/trends').get_json()
+    assert len(result['days']) == 365
+    assert len(result['forecast']) == 14
+
+
+@pytest.mark.parametrize('query', [
+    'start_date=2026-01-01&end_date=9999-12-31',
+    'start_date=1000-01-01&end_date=2026-01-01',
+    'end_date=2026-01-01&start_date=2026-02-01',
+])
+def test_ranges_refused(manager, query):
+    assert manager.get(f'/api/trends?{query}').status_code == 400
+
+
+def test_analytics_refuses_long_ranges(manager):
+    assert manager.get('/analytics?start_date=2026-01-01&end_date=9999-12-31').status_code == 400
+    assert manager.get('/analytics?start_date=2026-01-01&end_date=2026-03-31').status_code == 200
+
+
+def test_ranges_at_the_ends_of_the_calendar(database):
+    manager = login(make_app(database, TREND_DAYS=30))
+    result = manager.get('/api/trends?start_date=9999-12-01&end_date=9999-12-30').get_json()
+    assert [day['day'] for day in result['forecast']] == ['9999-12-31']
+    assert manager.get('/api/trends?start_date=9999-12-01&end_date=9999-12-31').get_json()['forecast'] == []
+    assert manager.get('/analytics?start_date=9999-12-01&end_date=9999-12-31').status_code == 200
+    result = manager.get('/api/trends?end_date=0001-01-05').get_json()
+    assert (result['start'], result['end']) == ('0001-01-01', '0001-01-05')
+
+
+
+def test_sales_from_another_process_show(manager, database):
+    today = date.today()
+    url = f'/api/trends?start_date={today - timedelta(days=7)}&end_date={today}'
+    before = manager.get(url).get_json()['days'][-1]['quantity']
+
+    # Written outside this process's sessions, as another worker or `flask run-jobs` would
+    with sqlite3.connect(database) as connection:
+        connection.execute(
+            "INSERT INTO daily_sales (day, quantity, total_price, sale_count) VALUES (?, 5, 50, 1) "
+            "ON CONFLICT (day) DO UPDATE SET quantity = quantity + 5",
+            (today.isoformat(),),
+        )
+    connection.close()
+
+    assert manager.get(url).get_json()['days'][-1]['quantity'] == before + 5
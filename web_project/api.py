@@ -0,0 +1,171 @@
+# api.py
+# Versioned JSON API (/api/v1/...) over products, sales, suppliers and
+# orders, for integrations that sync data instead of scraping pages.
+#
+# - fields=id,name,stock  returns only those fields
+# - per_page, after       keyset pagination (pagination.py); each page links
+#                         to the next one until `next` is null
+# - updated_since=<ISO>   only rows changed at or after that time, in
+#                         (updated_at, id) order. Pass the `synced_at` of the
+#                         last page as updated_since next time; it lags the
+#                         clock by API_SYNC_OVERLAP so rows written by
+#                         transactions still open at the time are not missed.
+#                         Deletions are not reported.
+# - ETag / If-None-Match  an unchanged page costs a 304 without a body
+# - Accept-Encoding       br or gzip
+#
+# Sellers only see their own rows; managers see everything.
+#
+# A product's `stock` is exact (Product.on_hand, see stock.py), but sales
+# only change its updated_at when the ledger is next compacted, so a delta
+# sync picks up new stock levels up to STOCK_COMPACT_INTERVAL late.
+import gzip
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+
+import brotli
+from flask import abort, current_app, make_response, request, url_for
+from flask_login import current_user
+
+from web_project.models import db, Product, Sale, Supplier, Order
+from web_project.pagination import paginate
+
+RESOURCES = {
+    'products': {
+        'model': Product,
+        'fields': ('id', 'name', 'price', 'stock', 'user_id', 'updated_at'),
+        'columns': {'stock': Product.on_hand},
+        'owner': lambda query, user_id: query.filter(Product.user_id == user_id),
+    },
+    'sales': {
+        'model': Sale,
+        'fields': ('id', 'product_id', 'quantity', 'total_price', 'sale_date', 'user_id', 'updated_at'),
+        'owner': lambda query, user_id: query.filter(Sale.user_id == user_id),
+    },
+    'suppliers': {
+        'model': Supplier,
+        'fields': ('id', 'name', 'product_id', 'quantity', 'price', 'delivery_time', 'updated_at'),
+        'owner': lambda query, user_id: (query.join(Product, Product.id == Supplier.product_id)
+                                         .filter(Product.user_id == user_id)),
+    },
+    'orders': {
+        'model': Order,
+        'fields': ('id', 'user_id', 'product_id', 'supplier_id', 'quantity', 'status', 'updated_at'),
+        'owner': lambda query, user_id: query.filter(Order.user_id == user_id),
+    },
+}
+
+
+def _error(status, message):
+    response = make_response(json.dumps({'error': message}), status)
+    response.mimetype = 'application/json'
+    abort(response)
+
+
+def _resource(name):
+    resource = RESOURCES.get(name)
+    if resource is None:
+        _error(404, f"unknown resource {name!r}")
+    return resource
+
+
+def _fields(resource):
+    requested = request.args.get('fields')
+    if not requested:
+        return list(resource['fields'])
+    fields = [field.strip() for field in requested.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in resource['fields']]
+    if unknown or not fields:
+        _error(400, f"unknown fields: {', '.join(unknown)}; available: {', '.join(resource['fields'])}")
+    return fields
+
+
+def _query(resource, fields):
+    model = resource['model']
+    # The sort key columns come along for the cursor even when not requested
+    columns = dict.fromkeys(fields + ['id', 'updated_at'])
+    overrides = resource.get('columns', {})
+    query = db.session.query(*[overrides[name].label(name) if name in overrides else getattr(model, name)
+                               for name in columns])
+    if current_user.role != 'manager':
+        query = resource['owner'](query, current_user.id)
+    return query
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _json_response(payload, **unversioned):
+    # The ETag covers `payload` only. `unversioned` keys (synced_at) change on
+    # every request; a client revalidating with a 304 keeps its older value,
+    # which is still safe to resume from.
+    etag = hashlib.sha1(json.dumps(payload, separators=(',', ':')).encode()).hexdigest()
+    body = json.dumps({**payload, **unversioned}, separators=(',', ':')).encode()
+    response = make_response(body)
+    response.mimetype = 'application/json'
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['Vary'] = 'Accept-Encoding, Cookie'
+
+    encoding = None
+    if len(body) >= current_app.config['API_COMPRESS_MIN_SIZE']:
+        accepted = request.accept_encodings
+        if accepted['br']:
+            encoding = 'br'
+        elif accepted['gzip']:
+            encoding = 'gzip'
+    # Each encoding of the same body is a different representation
+    if encoding:
+        etag = f'{etag}-{encoding}'
+    response.set_etag(etag)
+    if request.if_none_match.contains(etag):
+        response.status_code = 304
+        response.set_data(b'')
+        return response
+
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=current_app.config['API_BROTLI_QUALITY']))
+    elif encoding == 'gzip':
+        response.set_data(gzip.compress(body, compresslevel=current_app.config['API_GZIP_LEVEL']))
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+# ---------- Endpoints ----------
+def collection(name):
+    resource = _resource(name)
+    model = resource['model']
+    fields = _fields(resource)
+    # Taken before the query runs, so it is safe to resume from
+    synced_at = datetime.utcnow() - timedelta(seconds=current_app.config['API_SYNC_OVERLAP'])
+
+    query = _query(resource, fields)
+    sorts = {'id': (model.id,), 'updated': (model.updated_at, model.id)}
+    default_sort = 'id'
+    if 'updated_since' in request.args:
+        try:
+            since = datetime.fromisoformat(request.args['updated_since'])
+        except ValueError:
+            _error(400, "updated_since must be an ISO 8601 date or time")
+        if since.tzinfo is not None:
+            # updated_at is naive UTC
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        query = query.filter(model.updated_at >= since)
+        default_sort = 'updated'
+
+    page = paginate(query, sorts, default_sort, 'asc')
+    return _json_response({
+        'data': [{field: _value(getattr(row, field)) for field in fields} for row in page],
+        'next': url_for(request.endpoint, name=name, **page.next_args()) if page.has_next else None,
+    }, synced_at=synced_at.isoformat())
+
+
+def item(name, item_id):
+    resource = _resource(name)
+    fields = _fields(resource)
+    row = _query(resource, fields).filter(resource['model'].id == item_id).first()
+    if row is None:
+        _error(404, f"{name} {item_id} not found")
+    return _json_response({'data': {field: _value(getattr(row, field)) for field in fields}})
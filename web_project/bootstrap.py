@@ -0,0 +1,46 @@
+# bootstrap.py
+# One-time setup for a new deployment: the first manager account. This used
+# to be checked on the first request of every worker; run it once instead,
+# e.g. in the Procfile release phase after the migrations. It does nothing
+# when an account with that email already exists.
+#
+#   MANAGER_PASSWORD=... flask --app web_project.app create-manager
+import secrets
+
+import click
+from flask import current_app
+
+from web_project.models import db, User
+
+MANAGER_EMAIL = 'manager@example.com'
+MANAGER_USERNAME = 'TheManager'
+
+
+def create_manager(email, password, username=MANAGER_USERNAME):
+    # The new manager, or None if the email is taken
+    if User.query.filter_by(email=email).first() is not None:
+        return None
+    manager = User(username=username, email=email, password=current_app.extensions['passwords'].hash(password),
+                   role='manager', is_active=True)
+    db.session.add(manager)
+    db.session.commit()
+    return manager
+
+
+def init_app(app):
+    @app.cli.command('create-manager')
+    @click.option('--email', default=MANAGER_EMAIL, show_default=True)
+    @click.option('--username', default=MANAGER_USERNAME, show_default=True)
+    @click.option('--password', envvar='MANAGER_PASSWORD',
+                  help="Default: $MANAGER_PASSWORD, or a generated password that is printed once.")
+    def create_manager_command(email, username, password):
+        """Create the first manager account unless it already exists."""
+        generated = password is None
+        if generated:
+            password = secrets.token_urlsafe(12)
+        if create_manager(email, password, username) is None:
+            click.echo(f"{email} already exists; nothing to do.")
+        elif generated:
+            click.echo(f"Created manager {email} with password: {password}")
+        else:
+            click.echo(f"Created manager {email}.")
@@ -0,0 +1,127 @@
+# bulk.py
+# Batch decisions on the manager's pending lists. A batch is one
+# transaction: one SELECT of the requested rows, one set-based UPDATE guarded
+# by the state they were read in, and one INSERT of the follow-up jobs. If
+# the UPDATE matches fewer rows than were read, another manager decided some
+# of them in between; the batch is rolled back and read again, so the outcome
+# reported for each item is what was committed.
+#
+# Outcomes per item: approved, rejected, deletion_queued, not_found,
+# not_pending (order already decided), already_active, invalid (not an id)
+# and conflict (still contended after the retries).
+from flask import current_app
+
+from web_project.models import db, User, Order
+from web_project import jobs
+from web_project.stock import with_retry
+
+ORDER_ACTIONS = {'approve': 'approved', 'reject': 'rejected'}
+USER_ACTIONS = ('approve', 'delete')
+
+
+class BatchChanged(Exception):
+    pass
+
+
+class TooManyItems(ValueError):
+    pass
+
+
+def parse_ids(values):
+    ids, invalid = [], []
+    for value in values:
+        try:
+            item_id = int(value)
+        except (TypeError, ValueError):
+            invalid.append(str(value))
+            continue
+        if item_id not in ids:
+            ids.append(item_id)
+    if len(ids) > current_app.config['BULK_MAX_ITEMS']:
+        raise TooManyItems()
+    return ids, invalid
+
+
+def _run(operation, ids):
+    for _ in range(current_app.config['STOCK_RETRY_ATTEMPTS']):
+        try:
+            return with_retry(operation)
+        except BatchChanged:
+            db.session.rollback()
+    return {item_id: 'conflict' for item_id in ids}
+
+
+def _summary(outcomes, invalid):
+    results = {str(item_id): outcome for item_id, outcome in outcomes.items()}
+    results.update({value: 'invalid' for value in invalid})
+    counts = {}
+    for outcome in results.values():
+        counts[outcome] = counts.get(outcome, 0) + 1
+    return {'results': results, 'counts': counts}
+
+
+# ---------- Orders ----------
+def decide_orders(values, action, manager_id):
+    status = ORDER_ACTIONS[action]
+    ids, invalid = parse_ids(values)
+
+    def operation():
+        found = dict(db.session.query(Order.id, Order.status).filter(Order.id.in_(ids)))
+        pending = [order_id for order_id in ids if found.get(order_id) == 'pending']
+        if pending:
+            updated = (Order.query
+                       .filter(Order.id.in_(pending), Order.status == 'pending')
+                       .update({Order.status: status}, synchronize_session=False))
+            if updated != len(pending):
+                raise BatchChanged()
+            if action == 'approve':
+                jobs.enqueue('receive_orders', {'order_ids': pending}, user_id=manager_id)
+        db.session.commit()
+        decided = set(pending)
+        return {
+            order_id: status if order_id in decided else 'not_found' if order_id not in found else 'not_pending'
+            for order_id in ids
+        }
+
+    return _summary(_run(operation, ids) if ids else {}, invalid)
+
+
+# ---------- Users ----------
+def decide_users(values, action, manager_id):
+    ids, invalid = parse_ids(values)
+
+    def operation():
+        found = dict(db.session.query(User.id, User.is_active).filter(User.id.in_(ids), User.role == 'user'))
+        if action == 'approve':
+            targets = [user_id for user_id in ids if user_id in found and not found[user_id]]
+            guards = [User.is_active.isnot(True)]
+            changes = {User.is_active: True}
+        else:
+            targets = [user_id for user_id in ids if user_id in found]
+            guards = []
+            changes = {User.is_active: False}
+
+        if targets:
+            updated = (User.query
+                       .filter(User.id.in_(targets), User.role == 'user', *guards)
+                       .update(changes, synchronize_session=False))
+            if updated != len(targets):
+                raise BatchChanged()
+            if action == 'delete':
+                # Locked out now; their data goes in the background
+                jobs.enqueue_many('delete_user', [{'user_id': user_id} for user_id in targets], user_id=manager_id)
+        db.session.commit()
+
+        done = 'approved' if action == 'approve' else 'deletion_queued'
+        decided = set(targets)
+        return {
+            user_id: done if user_id in decided else 'not_found' if user_id not in found else 'already_active'
+            for user_id in ids
+        }
+
+    outcomes = _run(operation, ids) if ids else {}
+    principals = current_app.extensions['principals']
+    for user_id, outcome in outcomes.items():
+        if outcome in ('approved', 'deletion_queued'):
+            principals.invalidate(user_id)
+    return _summary(outcomes, invalid)
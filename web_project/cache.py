@@ -0,0 +1,94 @@
+# cache.py
+# Small key/value caches with per-entry TTLs. MemoryCache lives in one
+# process; SQLiteCache is a file every worker on the host opens, for data that
+# must agree across workers (revocations, data versions). Values must be
+# JSON-serializable to be stored in SQLiteCache.
+import json
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryCache:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (value, time.time() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+class SQLiteCache:
+    # Shared between processes on one host. Each thread keeps its own connection.
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        # Closed again so a gunicorn master that builds the app before
+        # forking does not hand an open SQLite connection to its workers
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entry '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)'
+            )
+        finally:
+            connection.close()
+
+    def _connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value FROM cache_entry WHERE key = ? AND expires >= ?', (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO cache_entry (key, value, expires) VALUES (?, ?, ?)',
+            (key, json.dumps(value), time.time() + ttl),
+        )
+        if random.random() < 0.01:
+            self._connection().execute('DELETE FROM cache_entry WHERE expires < ?', (time.time(),))
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM cache_entry WHERE key = ?', (key,))
+
+
+def shared_cache(app):
+    # The cross-worker cache, or None when SHARED_CACHE_PATH is not configured
+    path = app.config.get('SHARED_CACHE_PATH')
+    if not path:
+        return None
+    if 'shared_cache' not in app.extensions:
+        app.extensions['shared_cache'] = SQLiteCache(path)
+    return app.extensions['shared_cache']
@@ -0,0 +1,81 @@
+# config.py
+# Default settings. create_app() loads these and then applies its `config`
+# argument, so tests, benchmarks and the CLI can override any of them.
+# Settings that differ between deployments are read from the environment.
+import os
+
+from web_project.database import database_url
+
+
+class Config:
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'supersecretkey')
+    DEBUG = False
+    SQLALCHEMY_DATABASE_URI = database_url()
+    SQLALCHEMY_BINDS = {'replica': os.environ['DATABASE_REPLICA_URL']} if os.environ.get('DATABASE_REPLICA_URL') else None
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,  # ms
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64000,  # KiB
+    }
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))  # per worker process
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = 10  # seconds to wait for a pooled connection
+    DB_POOL_RECYCLE = 1800  # seconds, below typical server/proxy idle timeouts
+    REPLICA_PAGE_CACHE_TTL = 5  # seconds, roughly the tolerated replication lag
+    PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+    STOCK_RETRY_ATTEMPTS = 5
+    STOCK_RETRY_BACKOFF = 0.05  # seconds, doubled on each retry
+    STOCK_DEFAULT_LOCATION = 1  # where sales and receipts go unless given; created with the schema
+    STOCK_COMPACT_INTERVAL = 60  # seconds between stock compactions by the job workers
+    INGEST_CHUNK_SIZE = 5000
+    PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2:sha256:600000')  # method and cost, see passwords.py
+    PASSWORD_HASH_CONCURRENCY = 1  # hashes computed at once per process
+    PASSWORD_HASH_WAIT = 5  # seconds a login waits for its turn before giving up
+    LOGIN_LIMITS = {'ip': (20, 60), 'account': (10, 600)}  # attempts in a burst, refilled over seconds
+    PROXY_FIX_HOPS = int(os.environ.get('PROXY_FIX_HOPS', 0))  # proxies setting X-Forwarded-For; 1 in the Procfile
+    RATE_LIMIT_BUCKETS = 100000  # per process, without SHARED_CACHE_PATH
+    SESSION_PRINCIPAL_TTL = 60  # seconds a session stamp is trusted without a lookup
+    PRINCIPAL_CACHE_TTL = 300  # with SHARED_CACHE_PATH only, see principals.py
+    PRINCIPAL_CACHE_SIZE = 10000
+    PAGE_CACHE_ENABLED = True  # takes effect with SHARED_CACHE_PATH only, see pagecache.py
+    PAGE_CACHE_TTL = 300
+    PAGE_CACHE_SIZE = 500
+    SHARED_CACHE_PATH = os.environ.get('SHARED_CACHE_PATH')  # SQLite file shared by all workers
+    SLOW_REQUEST_THRESHOLD = float(os.environ.get('SLOW_REQUEST_THRESHOLD', 0.5))  # seconds
+    DEMAND_HALF_LIFE_DAYS = 14  # run `flask backfill-rollups` after changing
+    REORDER_SUPPLIER_STRATEGY = 'cheapest'  # or 'fastest'
+    REORDER_SAFETY_DAYS = 7  # days of demand held as safety stock
+    REORDER_COVER_DAYS = 30  # days of demand one order should cover
+    REORDER_MIN_VELOCITY = 0.05  # units/day below which no order is placed
+    TREND_DAYS = 365  # default analytics trend range, ending yesterday
+    TREND_MAX_DAYS = 3 * 366  # longest range analytics and /api/trends accept
+    TREND_MOVING_AVERAGES = (7, 28)  # trailing windows, days
+    TREND_FORECAST_DAYS = 14
+    TREND_TOP_PRODUCTS = 10
+    TREND_SEASONALITY_PRIOR = 28  # units before a product's own weekday profile counts as much as the overall one
+    TREND_CACHE_TTL = 3600  # with SHARED_CACHE_PATH only, see trends.py
+    SEARCH_CANDIDATES = 200  # full-text matches ranked per query
+    SEARCH_MAX_TERMS = 8
+    SEARCH_MAX_RESULTS = 50
+    API_SYNC_OVERLAP = 60  # seconds synced_at lags behind, for transactions still in flight
+    API_COMPRESS_MIN_SIZE = 1024  # bytes; smaller bodies are sent as they are
+    API_GZIP_LEVEL = 6
+    API_BROTLI_QUALITY = 5
+    LIVE_POLL_INTERVAL = 1.0  # seconds between a live stream's checks of the data versions
+    LIVE_RESYNC_INTERVAL = 15  # seconds; streams query even without a version change (see live.py)
+    LIVE_STREAM_SECONDS = 300  # then the browser reconnects; an open stream holds a server thread
+    LIVE_MAX_STREAMS = int(os.environ.get('LIVE_MAX_STREAMS', 2))  # per process, below its GUNICORN_THREADS
+    LIVE_FALLBACK_POLL = 15  # seconds between a page's checks while no stream is free
+    LIVE_BATCH_SIZE = 100  # changes per feed and check; with more the page reloads instead
+    LIVE_SYNC_OVERLAP = 5  # seconds orders are looked at again, for transactions still in flight
+    BULK_MAX_ITEMS = 1000  # per batch approve/reject/delete
+    JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', 1))  # per process; 0 with `flask run-jobs` workers
+    JOB_POLL_INTERVAL = 1.0  # seconds
+    JOB_TIMEOUT = 600  # seconds before a running job is assumed lost
+    JOB_MAX_ATTEMPTS = 3
+    REPORTS_DIR = os.environ.get('REPORTS_DIR')  # default: <instance folder>/reports
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # bearer token required by /metrics when set
@@ -0,0 +1,129 @@
+# database.py
+# Engine configuration for production. The database URL comes from
+# DATABASE_URL (default: SQLite file next to the app) and is tuned per
+# backend:
+#
+# - SQLite: every new connection runs SQLITE_PRAGMAS. WAL lets readers run
+#   alongside the single writer instead of blocking on the rollback journal,
+#   synchronous=NORMAL only fsyncs at checkpoints (safe in WAL mode),
+#   busy_timeout makes a writer wait for the lock instead of failing at once,
+#   and mmap_size/cache_size keep hot pages in memory. Connections are pooled
+#   so the per-connection page cache survives between requests.
+# - Postgres/MySQL: a bounded QueuePool with pre-ping and recycle, sized by
+#   DB_POOL_SIZE and DB_MAX_OVERFLOW per worker process.
+#
+# When DATABASE_REPLICA_URL is set, views decorated with @read_replica run
+# their queries on that engine; flushes and everything outside those views
+# stay on the primary. Replica pages may lag the primary by the replication
+# delay, so they are kept in the page cache for REPLICA_PAGE_CACHE_TTL only.
+import os
+import sqlite3
+from functools import partial, wraps
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import event, orm
+from sqlalchemy.pool import QueuePool
+
+REPLICA = 'replica'
+
+
+def database_url(default='sqlite:///database.db'):
+    url = os.environ.get('DATABASE_URL', default)
+    # Heroku-style URLs use the scheme SQLAlchemy 1.4 no longer accepts
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def _set_pragmas(pragmas, dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+    cursor.close()
+
+
+# ---------- Read Replica Routing ----------
+class RoutingSession(SignallingSession):
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        if (not self._flushing and has_request_context() and g.get('read_replica')
+                and REPLICA in (self.app.config['SQLALCHEMY_BINDS'] or {})):
+            g.read_from_replica = True
+            return self.db.get_engine(self.app, bind=REPLICA)
+        return super().get_bind(mapper, clause)
+
+
+def read_replica(view):
+    # Marks a view whose GET requests only read and may see slightly stale
+    # data. Its writes, if any, must go through session flushes.
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_replica = request.method == 'GET'
+        return view(*args, **kwargs)
+    return wrapper
+
+
+# ---------- Engines ----------
+class Database(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        if sa_url.drivername.startswith('sqlite') and sa_url.database not in (None, '', ':memory:'):
+            # SQLAlchemy defaults to NullPool for SQLite files
+            options.setdefault('poolclass', QueuePool)
+            options.setdefault('pool_size', app.config['DB_POOL_SIZE'])
+            options.setdefault('connect_args', {}).setdefault('check_same_thread', False)
+        elif not sa_url.drivername.startswith('sqlite'):
+            options.setdefault('pool_size', app.config['DB_POOL_SIZE'])
+            options.setdefault('max_overflow', app.config['DB_MAX_OVERFLOW'])
+            options.setdefault('pool_timeout', app.config['DB_POOL_TIMEOUT'])
+            options.setdefault('pool_recycle', app.config['DB_POOL_RECYCLE'])
+            options.setdefault('pool_pre_ping', True)
+        return super().apply_driver_hacks(app, sa_url, options)
+
+    def dispose_engines(self, app):
+        # For a forked worker: drop the pooled connections inherited from the
+        # parent without closing them, since the parent still owns them
+        with app.app_context():
+            for bind in [None] + list(app.config['SQLALCHEMY_BINDS'] or ()):
+                self.get_engine(app, bind=bind).dispose(close=False)
+
+    def create_engine(self, sa_url, engine_opts):
+        engine = super().create_engine(sa_url, engine_opts)
+        if engine.dialect.name == 'sqlite':
+            pragmas = self.get_app().config['SQLITE_PRAGMAS']
+            event.listen(engine, 'connect', partial(_set_pragmas, pragmas))
+        return engine
+
+
+# ---------- Upserts ----------
+def upsert(connection, table, keys, rows, add=(), replace=()):
+    # Inserts `rows`; where a row's `keys` already exist, adds its `add`
+    # columns to the stored values and overwrites its `replace` columns. One
+    # statement on SQLite and Postgres, an UPDATE then INSERT per row elsewhere.
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        changes = {name: table.c[name] + stmt.excluded[name] for name in add}
+        changes.update({name: stmt.excluded[name] for name in replace})
+        connection.execute(stmt.on_conflict_do_update(index_elements=keys, set_=changes), rows)
+        return
+
+    for row in rows:
+        changes = {name: table.c[name] + row[name] for name in add}
+        changes.update({name: row[name] for name in replace})
+        updated = connection.execute(table.update().where(*[table.c[name] == row[name] for name in keys])
+                                     .values(changes))
+        if updated.rowcount == 0:
+            connection.execute(table.insert(), row)
@@ -0,0 +1,175 @@
+# export.py
+# Streaming CSV and XLSX exports. Rows are pulled from the database in
+# batches (Query.yield_per, which uses a server-side cursor where the driver
+# has one) and written to the response as they arrive, so memory use does not
+# depend on the number of rows and the client starts receiving data at once.
+#
+# XLSX is a zip of XML parts. It is written here with zipfile onto a
+# non-seekable pipe, using inline strings and no shared string table, so the
+# worksheet can be streamed row by row like the CSV.
+import csv
+import zipfile
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+from flask import Response, stream_with_context
+
+BATCH_SIZE = 1000
+
+SALES_HEADER = ['ID', 'Date', 'Product', 'Seller', 'Quantity', 'Total Price']
+
+FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+class _Pipe:
+    # Write-only file object whose contents are handed to the response
+    def __init__(self, empty):
+        self.empty = empty
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = self.empty.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _text(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+# ---------- CSV ----------
+def stream_csv(header, rows):
+    pipe = _Pipe('')
+    writer = csv.writer(pipe)
+    writer.writerow(header)
+    for number, row in enumerate(rows, start=1):
+        writer.writerow([_text(value) for value in row])
+        if number % BATCH_SIZE == 0:
+            yield pipe.drain()
+    yield pipe.drain()
+
+
+# ---------- XLSX ----------
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_SHEET_HEAD = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_TAIL = b'</sheetData></worksheet>'
+
+
+def _xlsx_cell(value):
+    value = _text(value)
+    if value is None:
+        return '<c/>'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    return f'<c t="inlineStr"><is><t>{escape(str(value))}</t></is></c>'
+
+
+def _xlsx_row(row):
+    return ('<row>' + ''.join(_xlsx_cell(value) for value in row) + '</row>').encode()
+
+
+def stream_xlsx(header, rows, sheet_name='Sheet1'):
+    pipe = _Pipe(b'')
+    with zipfile.ZipFile(pipe, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        archive.writestr('xl/workbook.xml', _WORKBOOK.format(name=escape(sheet_name)))
+        yield pipe.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(_SHEET_HEAD)
+            sheet.write(_xlsx_row(header))
+            for number, row in enumerate(rows, start=1):
+                sheet.write(_xlsx_row(row))
+                if number % BATCH_SIZE == 0:
+                    yield pipe.drain()
+            sheet.write(_SHEET_TAIL)
+    yield pipe.drain()
+
+
+# ---------- Response ----------
+def _chunks(rows, header, fmt, sheet_name):
+    if fmt == 'csv':
+        return (chunk.encode('utf-8') for chunk in stream_csv(header, rows))
+    return stream_xlsx(header, rows, sheet_name=sheet_name)
+
+
+def response(query, header, fmt, filename):
+    # `query` must select plain columns (not ORM entities) in header order
+    body = _chunks(query.yield_per(BATCH_SIZE), header, fmt, filename)
+    return Response(
+        stream_with_context(body),
+        mimetype=FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{fmt}"'},
+    )
+
+
+def write(query, header, fmt, path, sheet_name='Sheet1'):
+    # Same output written to a file, for reports built by background jobs.
+    # Returns the number of rows written.
+    count = 0
+
+    def rows():
+        nonlocal count
+        for row in query.yield_per(BATCH_SIZE):
+            count += 1
+            yield row
+
+    with open(path, 'wb') as handle:
+        for chunk in _chunks(rows(), header, fmt, sheet_name):
+            handle.write(chunk)
+    return count
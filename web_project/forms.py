@@ -1,6 +1,7 @@
 # forms.py
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField, SelectField, IntegerField, FloatField
+from wtforms import StringField, PasswordField, SubmitField, IntegerField, FloatField
+from wtforms.widgets import HiddenInput
 from wtforms.validators import DataRequired, Email, EqualTo, Length, NumberRange
 
 class RegistrationForm(FlaskForm):
@@ -25,7 +26,7 @@ class AddProductForm(FlaskForm):
     submit = SubmitField('Add Product')
 
 class AddSupplierForm(FlaskForm):
-    product_id = SelectField('Product', coerce=int, validators=[DataRequired()])
+    product_id = IntegerField('Product', widget=HiddenInput(), validators=[DataRequired()])  # set by the typeahead
     name = StringField('Supplier Name', validators=[DataRequired(), Length(max=100)])
     quantity = IntegerField('Quantity', validators=[DataRequired(), NumberRange(min=1)])
     price = FloatField('Price ($)', validators=[DataRequired(), NumberRange(min=0.01)])
@@ -0,0 +1,202 @@
+# ingest.py
+# Batch sales ingestion for point-of-sale uploads. Rows are validated up
+# front, then written in chunks: one transaction per chunk, a few SELECTs for
+# the chunk's products, locations and stock levels, and one executemany
+# INSERT each for the sales and their stock movements (stock.py). Rows that
+# fail validation or run out of stock are reported by row number and
+# skipped; the rest are committed.
+import csv
+import io
+import json
+from collections import namedtuple
+from datetime import datetime
+
+import click
+from flask import current_app, request
+
+from web_project.models import db, User, Product, Sale, Location
+from web_project import rollups, stock
+
+SaleRow = namedtuple('SaleRow', 'row product_id quantity sale_date user_id location_id')
+InsertedSale = namedtuple('InsertedSale', 'product_id quantity total_price sale_date user_id')
+
+
+class StockChanged(Exception):
+    # Another writer took stock between our read and our INSERT
+    pass
+
+
+# ---------- Parsing ----------
+def parse_json(text):
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get('sales')
+    if not isinstance(data, list):
+        raise ValueError("expected a list of sales or {\"sales\": [...]}")
+    return data
+
+
+def parse_csv(text):
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def validate(records, default_user_id, allow_user_id=False):
+    rows, errors = [], []
+    for number, record in enumerate(records, start=1):
+        if not isinstance(record, dict):
+            errors.append({'row': number, 'error': 'not an object'})
+            continue
+        try:
+            product_id = int(record.get('product_id'))
+        except (TypeError, ValueError):
+            errors.append({'row': number, 'error': 'invalid product_id'})
+            continue
+        try:
+            quantity = int(record.get('quantity'))
+            if quantity < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            errors.append({'row': number, 'error': 'quantity must be a positive integer'})
+            continue
+
+        sale_date = record.get('sale_date')
+        try:
+            sale_date = datetime.fromisoformat(sale_date) if sale_date else datetime.utcnow()
+        except (TypeError, ValueError):
+            errors.append({'row': number, 'error': 'invalid sale_date'})
+            continue
+
+        user_id = default_user_id
+        if allow_user_id and record.get('user_id'):
+            try:
+                user_id = int(record['user_id'])
+            except (TypeError, ValueError):
+                errors.append({'row': number, 'error': 'invalid user_id'})
+                continue
+        if user_id is None:
+            errors.append({'row': number, 'error': 'user_id is required'})
+            continue
+
+        location_id = None
+        if record.get('location_id'):
+            try:
+                location_id = int(record['location_id'])
+            except (TypeError, ValueError):
+                errors.append({'row': number, 'error': 'invalid location_id'})
+                continue
+
+        rows.append(SaleRow(number, product_id, quantity, sale_date, user_id, location_id))
+    return rows, errors
+
+
+# ---------- Writing ----------
+def _write_chunk(rows):
+    default_location = stock.default_location()
+    keys = {(row.product_id, row.location_id or default_location) for row in rows}
+    stock.lock(keys)
+    product_ids = {product_id for product_id, _ in keys}
+    prices = dict(db.session.query(Product.id, Product.price).filter(Product.id.in_(product_ids)))
+    locations = {location_id for (location_id,) in
+                 db.session.query(Location.id).filter(Location.id.in_({key[1] for key in keys}))}
+    levels = stock.levels(product_ids)
+
+    taken, sales, movements, errors = set(), [], [], []
+    for row in rows:
+        location_id = row.location_id or default_location
+        if row.product_id not in prices:
+            errors.append({'row': row.row, 'error': 'unknown product'})
+            continue
+        if location_id not in locations:
+            errors.append({'row': row.row, 'error': 'unknown location'})
+            continue
+        remaining = levels.setdefault(row.product_id, {})
+        if remaining.get(location_id, 0) < row.quantity:
+            errors.append({'row': row.row, 'error': 'insufficient stock'})
+            continue
+        remaining[location_id] -= row.quantity
+        taken.add((row.product_id, location_id))
+        sales.append(InsertedSale(row.product_id, row.quantity, prices[row.product_id] * row.quantity,
+                                  row.sale_date, row.user_id))
+        movements.append(dict(product_id=row.product_id, location_id=location_id, quantity=-row.quantity,
+                              kind='sale', user_id=row.user_id))
+
+    if sales:
+        connection = db.session.connection()
+        connection.execute(Sale.__table__.insert(), [sale._asdict() for sale in sales])
+        rollups.apply_deltas(connection, sales)
+        stock.record(movements)
+        # Without row locks (SQLite) another writer may have sold the same
+        # units since we read the levels
+        levels = stock.levels({product_id for product_id, _ in taken})
+        if any(levels[product_id][location_id] < 0 for product_id, location_id in taken):
+            raise StockChanged()
+    db.session.commit()
+    return len(sales), errors
+
+
+def _write_chunk_with_retry(rows):
+    for _ in range(current_app.config['STOCK_RETRY_ATTEMPTS']):
+        try:
+            return stock.with_retry(lambda: _write_chunk(rows))
+        except StockChanged:
+            db.session.rollback()
+    return 0, [{'row': row.row, 'error': 'stock changed concurrently, retry'} for row in rows]
+
+
+def ingest(records, default_user_id, allow_user_id=False, chunk_size=None):
+    chunk_size = chunk_size or current_app.config['INGEST_CHUNK_SIZE']
+    rows, errors = validate(records, default_user_id, allow_user_id)
+
+    if allow_user_id:
+        # Rows may name any seller; make sure they exist before writing
+        user_ids = {row.user_id for row in rows}
+        known = {user_id for (user_id,) in db.session.query(User.id).filter(User.id.in_(user_ids))}
+        errors += [{'row': row.row, 'error': 'unknown user'} for row in rows if row.user_id not in known]
+        rows = [row for row in rows if row.user_id in known]
+
+    inserted = 0
+    for start in range(0, len(rows), chunk_size):
+        count, chunk_errors = _write_chunk_with_retry(rows[start:start + chunk_size])
+        inserted += count
+        errors += chunk_errors
+
+    errors.sort(key=lambda error: error['row'])
+    return {'received': len(records), 'inserted': inserted, 'errors': errors}
+
+
+# ---------- HTTP & CLI ----------
+def request_records():
+    upload = request.files.get('file')
+    if upload is not None:
+        text = upload.read().decode('utf-8-sig')
+        return parse_csv(text) if upload.filename.lower().endswith('.csv') else parse_json(text)
+    if request.mimetype == 'text/csv':
+        return parse_csv(request.get_data(as_text=True))
+    return parse_json(request.get_data(as_text=True))
+
+
+def init_app(app):
+    @app.cli.command('import-sales')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--user', 'email', help="Seller email for rows without a user_id column.")
+    @click.option('--chunk-size', type=int, default=None, help="Sales per transaction.")
+    def import_sales_command(path, email, chunk_size):
+        """Import sales from a CSV or JSON file."""
+        default_user_id = None
+        if email:
+            user = User.query.filter_by(email=email).first()
+            if user is None:
+                raise click.ClickException(f"No user with email {email}")
+            default_user_id = user.id
+
+        with open(path, encoding='utf-8-sig') as handle:
+            text = handle.read()
+        try:
+            records = parse_csv(text) if path.lower().endswith('.csv') else parse_json(text)
+        except ValueError as error:
+            raise click.ClickException(f"Could not parse {path}: {error}")
+
+        report = ingest(records, default_user_id, allow_user_id=True, chunk_size=chunk_size)
+        for error in report['errors']:
+            click.echo(f"row {error['row']}: {error['error']}", err=True)
+        click.echo(f"Imported {report['inserted']} of {report['received']} sales.")
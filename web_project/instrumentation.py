@@ -0,0 +1,221 @@
+# instrumentation.py
+# Per-request timing: wall time, SQL statement count, SQL time and template
+# render time, aggregated per endpoint. GET /metrics serves the aggregates in
+# the Prometheus text format and requests slower than SLOW_REQUEST_THRESHOLD
+# seconds are logged with their slowest statements.
+#
+# The cost per request is a few perf_counter() calls and one short lock, so
+# it is meant to stay on in production. Aggregates are per process, so with
+# several gunicorn workers a scrape reports whichever worker answered it.
+# Wall time of a streamed response only covers the work done before the body
+# starts streaming.
+import heapq
+import logging
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from jinja2 import Template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from web_project.querycount import statements_issued
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOWEST_KEPT = 3
+STATEMENT_PREVIEW = 300
+
+slow_log = logging.getLogger('web_project.slow_requests')
+
+
+# ---------- SQL Timing ----------
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        conn.info.setdefault('statement_started', []).append((context, time.perf_counter()))
+
+
+@event.listens_for(Engine, 'handle_error')
+def _fail_statement(exception_context):
+    # A statement that raises never reaches after_cursor_execute; its entry
+    # must not be taken for the start of the next one
+    started = exception_context.connection.info.get('statement_started') if exception_context.connection else None
+    if started and started[-1][0] is exception_context.execution_context:
+        started.pop()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _finish_statement(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('statement_started')
+    if not started or not has_request_context():
+        return
+    elapsed = time.perf_counter() - started.pop()[1]
+    g.sql_seconds = g.get('sql_seconds', 0.0) + elapsed
+
+    # Min-heap of the request's slowest statements
+    slowest = g.setdefault('sql_slowest', [])
+    entry = (elapsed, statement[:STATEMENT_PREVIEW])
+    if len(slowest) < SLOWEST_KEPT:
+        heapq.heappush(slowest, entry)
+    elif elapsed > slowest[0][0]:
+        heapq.heapreplace(slowest, entry)
+
+
+# ---------- Render Timing ----------
+class TimedTemplate(Template):
+    # Only top-level renders go through render(); extends and include run
+    # inside it, so nested templates are not counted twice.
+    def render(self, *args, **kwargs):
+        if not has_request_context():
+            return super().render(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            g.render_seconds = g.get('render_seconds', 0.0) + time.perf_counter() - started
+
+
+# ---------- Aggregation ----------
+class EndpointStats:
+    def __init__(self):
+        self.requests = {}  # status -> count
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.seconds = 0.0
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.render_seconds = 0.0
+        self.slowest_statement = 0.0
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, key, status, seconds, sql_statements, sql_seconds, render_seconds, slowest_statement):
+        with self.lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = EndpointStats()
+            stats.requests[status] = stats.requests.get(status, 0) + 1
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    stats.buckets[index] += 1
+                    break
+            stats.seconds += seconds
+            stats.sql_statements += sql_statements
+            stats.sql_seconds += sql_seconds
+            stats.render_seconds += render_seconds
+            stats.slowest_statement = max(stats.slowest_statement, slowest_statement)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                key: (dict(stats.requests), list(stats.buckets), stats.seconds, stats.sql_statements,
+                      stats.sql_seconds, stats.render_seconds, stats.slowest_statement)
+                for key, stats in self.endpoints.items()
+            }
+
+
+def _start_request():
+    g.request_started = time.perf_counter()
+
+
+def _finish_request(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    seconds = time.perf_counter() - started
+    endpoint = request.endpoint or 'unmatched'
+    sql_seconds = g.get('sql_seconds', 0.0)
+    render_seconds = g.get('render_seconds', 0.0)
+    slowest = sorted(g.get('sql_slowest', []), reverse=True)
+
+    current_app.extensions['instrumentation'].record(
+        (endpoint, request.method), response.status_code, seconds, statements_issued(),
+        sql_seconds, render_seconds, slowest[0][0] if slowest else 0.0,
+    )
+
+    threshold = current_app.config['SLOW_REQUEST_THRESHOLD']
+    if threshold is not None and seconds >= threshold:
+        slow_log.warning(
+            "%s %s -> %s took %.1f ms: %d SQL statements in %.1f ms, render %.1f ms; slowest: %s",
+            request.method, request.full_path.rstrip('?'), response.status_code, seconds * 1000,
+            statements_issued(), sql_seconds * 1000, render_seconds * 1000,
+            '; '.join(f"{elapsed * 1000:.1f} ms {statement!r}" for elapsed, statement in slowest) or 'none',
+        )
+    return response
+
+
+# ---------- Prometheus Export ----------
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{str(value)}"' for name, value in labels.items()) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metrics(registry, principal_stats=None, rate_limit_stats=None):
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(f'{sample_name}{labels} {_number(value)}' for sample_name, labels, value in samples)
+
+    snapshot = sorted(registry.snapshot().items())
+
+    metric('http_requests_total', 'counter', 'Requests handled, by endpoint, method and status.', [
+        ('http_requests_total', _labels(endpoint=endpoint, method=method, status=status), count)
+        for (endpoint, method), (requests, *_) in snapshot
+        for status, count in sorted(requests.items())
+    ])
+
+    histogram = []
+    for (endpoint, method), (requests, buckets, seconds, *_) in snapshot:
+        cumulative = 0
+        for bound, count in zip(DURATION_BUCKETS, buckets):
+            cumulative += count
+            histogram.append(('http_request_duration_seconds_bucket',
+                              _labels(endpoint=endpoint, method=method, le=bound), cumulative))
+        total = sum(requests.values())
+        histogram.append(('http_request_duration_seconds_bucket',
+                          _labels(endpoint=endpoint, method=method, le='+Inf'), total))
+        histogram.append(('http_request_duration_seconds_sum', _labels(endpoint=endpoint, method=method), seconds))
+        histogram.append(('http_request_duration_seconds_count', _labels(endpoint=endpoint, method=method), total))
+    metric('http_request_duration_seconds', 'histogram', 'Wall time spent handling a request.', histogram)
+
+    for name, kind, index, help_text in (
+        ('sql_statements_total', 'counter', 3, 'SQL statements issued while handling requests.'),
+        ('sql_duration_seconds_total', 'counter', 4, 'Time spent executing SQL while handling requests.'),
+        ('template_render_seconds_total', 'counter', 5, 'Time spent rendering Jinja templates.'),
+        ('sql_statement_max_seconds', 'gauge', 6, 'Slowest single SQL statement seen since start.'),
+    ):
+        metric(name, kind, help_text, [
+            (name, _labels(endpoint=endpoint, method=method), values[index])
+            for (endpoint, method), values in snapshot
+        ])
+
+    if principal_stats is not None:
+        metric('principal_lookups_total', 'counter', 'current_user lookups, by where they were answered.', [
+            ('principal_lookups_total', _labels(source=source), principal_stats[f'from_{source}'])
+            for source in ('session', 'cache', 'database')
+        ])
+
+    if rate_limit_stats is not None:
+        metric('login_attempts_total', 'counter', 'Login and registration attempts, by rate limit outcome.', [
+            ('login_attempts_total', _labels(outcome=outcome), rate_limit_stats[outcome])
+            for outcome in ('allowed', 'limited')
+        ])
+
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    registry = Registry()
+    app.extensions['instrumentation'] = registry
+    app.jinja_env.template_class = TimedTemplate
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    return registry
@@ -0,0 +1,261 @@
+# jobs.py
+# Background jobs backed by the job table, so no broker is needed. A request
+# enqueues a job and returns at once; a worker claims it with a conditional
+# UPDATE (queued -> running), so any number of workers can poll the same
+# table without running a job twice. The handler's changes and the job's
+# final status commit together.
+#
+# Workers run as threads inside the app processes (JOB_WORKER_THREADS per
+# process, started on the first request) and/or as separate processes:
+#
+#   flask --app web_project.app run-jobs
+#
+# A job still running after JOB_TIMEOUT seconds is assumed lost with its
+# worker and is queued again, up to JOB_MAX_ATTEMPTS runs. Handlers must
+# therefore be safe to run again after a partial run.
+#
+# Between jobs, workers also compact the stock ledger every
+# STOCK_COMPACT_INTERVAL seconds (stock.py).
+import json
+import os
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+
+from web_project.models import (db, User, Product, Supplier, Sale, Order, Job, DailyProductSales, DailyUserSales,
+                                ProductDemand, ReorderPoint, StockMovement, StockSnapshot)
+from web_project import export, queries, reorder, rollups, search, stock
+
+DELETE_CHUNK_SIZE = 1000
+
+HANDLERS = {}
+
+
+def handler(kind):
+    def decorator(function):
+        HANDLERS[kind] = function
+        return function
+    return decorator
+
+
+# ---------- Queue ----------
+def enqueue(kind, payload=None, user_id=None):
+    # Adds the job to the current transaction: it is only queued if the
+    # caller's own changes commit with it
+    if kind not in HANDLERS:
+        raise ValueError(f"unknown job kind {kind!r}")
+    job = Job(kind=kind, payload=json.dumps(payload or {}), user_id=user_id)
+    db.session.add(job)
+    return job
+
+
+def enqueue_many(kind, payloads, user_id=None):
+    # One executemany INSERT, in the current transaction like enqueue()
+    if kind not in HANDLERS:
+        raise ValueError(f"unknown job kind {kind!r}")
+    db.session.execute(Job.__table__.insert(), [
+        dict(kind=kind, payload=json.dumps(payload), user_id=user_id) for payload in payloads
+    ])
+
+
+def requeue_stale():
+    now = datetime.utcnow()
+    stale = db.and_(Job.status == 'running',
+                    Job.started_at < now - timedelta(seconds=current_app.config['JOB_TIMEOUT']))
+    lost = "worker lost (timed out)"
+    (Job.query.filter(stale, Job.attempts >= current_app.config['JOB_MAX_ATTEMPTS'])
+        .update({Job.status: 'failed', Job.error: lost, Job.finished_at: now}, synchronize_session=False))
+    Job.query.filter(stale).update({Job.status: 'queued'}, synchronize_session=False)
+    db.session.commit()
+
+
+def claim():
+    # Returns the oldest queued job, now marked running, or None
+    while True:
+        job_id = (db.session.query(Job.id)
+                  .filter(Job.status == 'queued')
+                  .order_by(Job.id)
+                  .limit(1)
+                  .scalar())
+        if job_id is None:
+            db.session.commit()
+            return None
+        claimed = (Job.query
+                   .filter(Job.id == job_id, Job.status == 'queued')
+                   .update({Job.status: 'running', Job.started_at: datetime.utcnow(),
+                            Job.attempts: Job.attempts + 1}, synchronize_session=False))
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, job_id)
+        # Another worker got there first; try the next one
+
+
+def run(job):
+    try:
+        result = HANDLERS[job.kind](**json.loads(job.payload))
+        job.status, job.result = 'done', json.dumps(result)
+    except Exception:
+        db.session.rollback()
+        job = db.session.get(Job, job.id)
+        job.status, job.error = 'failed', traceback.format_exc()
+        current_app.logger.exception("job %s (%s) failed", job.id, job.kind)
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+
+def work(burst=False):
+    # Runs jobs until stopped, or until the queue is empty with burst=True
+    poll_interval = current_app.config['JOB_POLL_INTERVAL']
+    last_requeue, last_compaction = 0, time.monotonic()
+    while True:
+        if time.monotonic() - last_requeue > poll_interval * 10:
+            requeue_stale()
+            last_requeue = time.monotonic()
+        if time.monotonic() - last_compaction > current_app.config['STOCK_COMPACT_INTERVAL']:
+            stock.compact()
+            last_compaction = time.monotonic()
+        job = claim()
+        if job is not None:
+            run(job)
+        db.session.remove()
+        if job is None:
+            if burst:
+                return
+            time.sleep(poll_interval)
+
+
+def as_dict(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error.strip().splitlines()[-1] if job.error else None,
+    }
+
+
+# ---------- Handlers ----------
+@handler('receive_orders')
+def receive_orders(order_ids):
+    # Approved supplier orders become receipts in the stock ledger. Runs in
+    # the same transaction as the job's "done" status, and skips orders
+    # already received, so a retry cannot receive an order twice.
+    return stock.receive(order_ids)
+
+
+@handler('receive_order')
+def receive_order(order_id):
+    # Jobs queued before approvals were batched
+    return receive_orders([order_id])
+
+
+@handler('delete_user')
+def delete_user(user_id):
+    # Deletes a seller with their products and everything that references
+    # them. Sales go in chunks, each with its rollup deltas and its own
+    # commit, so a large history never holds the write lock for long.
+    user = db.session.get(User, user_id)
+    if user is None:
+        return {'deleted': False}
+
+    product_ids = db.session.query(Product.id).filter(Product.user_id == user_id)
+    supplier_ids = db.session.query(Supplier.id).filter(Supplier.product_id.in_(product_ids))
+    sales = db.or_(Sale.user_id == user_id, Sale.product_id.in_(product_ids))
+    sale_columns = (Sale.id, Sale.product_id, Sale.quantity, Sale.total_price, Sale.sale_date, Sale.user_id)
+
+    deleted_sales = 0
+    while True:
+        chunk = db.session.query(*sale_columns).filter(sales).limit(DELETE_CHUNK_SIZE).all()
+        if not chunk:
+            break
+        rollups.apply_deltas(db.session.connection(), chunk, sign=-1)
+        Sale.query.filter(Sale.id.in_([sale.id for sale in chunk])).delete(synchronize_session=False)
+        db.session.commit()
+        deleted_sales += len(chunk)
+
+    orders = db.or_(Order.user_id == user_id, Order.product_id.in_(product_ids), Order.supplier_id.in_(supplier_ids))
+    # Stock movements of other sellers' products stay in the ledger, without the references
+    (StockMovement.query.filter(StockMovement.order_id.in_(db.session.query(Order.id).filter(orders)))
+        .update({StockMovement.order_id: None}, synchronize_session=False))
+    StockMovement.query.filter(StockMovement.user_id == user_id).update({StockMovement.user_id: None},
+                                                                       synchronize_session=False)
+    deleted_orders = Order.query.filter(orders).delete(synchronize_session=False)
+    search.remove('product', [product_id for (product_id,) in product_ids])
+    search.remove('supplier', [supplier_id for (supplier_id,) in supplier_ids])
+    search.remove('user', [user_id])
+    # Zeroed by the deltas above, but they still reference the rows going away
+    ReorderPoint.query.filter(ReorderPoint.product_id.in_(product_ids)).delete(synchronize_session=False)
+    ProductDemand.query.filter(ProductDemand.product_id.in_(product_ids)).delete(synchronize_session=False)
+    DailyProductSales.query.filter(DailyProductSales.product_id.in_(product_ids)).delete(synchronize_session=False)
+    DailyUserSales.query.filter(DailyUserSales.user_id == user_id).delete(synchronize_session=False)
+    StockSnapshot.query.filter(StockSnapshot.product_id.in_(product_ids)).delete(synchronize_session=False)
+    StockMovement.query.filter(StockMovement.product_id.in_(product_ids)).delete(synchronize_session=False)
+    deleted_suppliers = Supplier.query.filter(Supplier.product_id.in_(product_ids)).delete(synchronize_session=False)
+    deleted_products = Product.query.filter(Product.user_id == user_id).delete(synchronize_session=False)
+    User.query.filter(User.id == user_id).delete(synchronize_session=False)
+    current_app.extensions['principals'].invalidate(user_id)
+    return {'deleted': True, 'sales': deleted_sales, 'orders': deleted_orders,
+            'suppliers': deleted_suppliers, 'products': deleted_products}
+
+
+@handler('sales_report')
+def sales_report(fmt, start_date=None, end_date=None):
+    # Writes the sales export for a date range to REPORTS_DIR
+    start = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+    end = datetime.strptime(end_date, '%Y-%m-%d') if end_date else None
+    directory = current_app.config['REPORTS_DIR']
+    os.makedirs(directory, exist_ok=True)
+    filename = f"sales-{start_date or 'start'}-{end_date or 'end'}-{time.time_ns()}.{fmt}"
+    rows = export.write(queries.sales_export(start_date=start, end_date=end), export.SALES_HEADER, fmt,
+                        os.path.join(directory, filename), sheet_name='sales')
+    return {'filename': filename, 'rows': rows}
+
+
+@handler('plan_reorders')
+def plan_reorders(strategy=None):
+    return reorder.plan(strategy)
+
+
+# ---------- Workers ----------
+def _start_threads(app):
+    def loop():
+        with app.app_context():
+            while True:
+                try:
+                    work()
+                except Exception:
+                    app.logger.exception("job worker crashed, restarting")
+                    db.session.remove()
+                    time.sleep(app.config['JOB_POLL_INTERVAL'])
+
+    for number in range(app.config['JOB_WORKER_THREADS']):
+        threading.Thread(target=loop, name=f'job-worker-{number}', daemon=True).start()
+
+
+def init_app(app):
+    started = []
+    lock = threading.Lock()
+
+    @app.before_request
+    def start_workers():
+        if started:
+            return
+        with lock:
+            if not started:
+                started.append(True)
+                _start_threads(app)
+
+    @app.cli.command('run-jobs')
+    @click.option('--burst', is_flag=True, help="Exit once the queue is empty.")
+    def run_jobs_command(burst):
+        """Run background jobs from the job table."""
+        work(burst=burst)
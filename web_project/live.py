@@ -0,0 +1,266 @@
+# live.py
+# Server-Sent Events for the manager pages that stay open all day
+# (manager_dashboard, confirm_orders). A page is rendered once with a
+# cursor() and then listens on GET /live?feeds=...&after=<cursor>, which
+# pushes what changed after it:
+#
+#   sale    a new sale, as the dashboard's table row (feed 'sales')
+#   stock   {product_id: units} for the products whose stock moved ('stock')
+#   order   an order that changed: its row while pending, else its status
+#           ('orders')
+#   reload  more changed at once than LIVE_BATCH_SIZE; the page reloads
+#   cursor  nothing to show, but the cursor moved past rows it skips
+#
+# A stream does not poll the tables. It watches the data versions that
+# pagecache.py bumps when a commit writes a table, and only after a commit
+# to a table one of its feeds follows does it run that feed's keyset query
+# for the rows after its cursor. Without SHARED_CACHE_PATH the versions only
+# see the commits of the stream's own process, so streams also look every
+# LIVE_RESYNC_INTERVAL seconds regardless. Streams in one process are woken
+# by the same commits and mostly stand at the same cursor, so the sales and
+# stock results are shared between them for LIVE_POLL_INTERVAL: a process
+# runs those queries about once per commit, however many pages are open.
+#
+# Every batch of events ends with the cursor after it as the event id. A
+# stream ends after LIVE_STREAM_SECONDS, to give its server thread back, and
+# the browser reconnects with that id (Last-Event-ID) and resumes. A row may
+# arrive twice around a reconnect; the page ignores one it already shows.
+#
+# An open stream holds a gunicorn thread, so a process serves at most
+# LIVE_MAX_STREAMS of them and answers 503 (Retry-After) beyond that; the
+# threads left over keep serving every other request. A refused page falls
+# back to GET /live?once=1 every LIVE_FALLBACK_POLL seconds, which answers
+# with the events of a single check and closes.
+#
+# Sales and stock movements are followed by id. On Postgres a transaction
+# can commit after another that took a higher id; a row it wrote is only
+# shown on the next page load. Orders change in place, so they are followed
+# by updated_at, looking LIVE_SYNC_OVERLAP seconds back for transactions
+# that were still open.
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import Response, abort, current_app, get_template_attribute, request, stream_with_context
+
+from web_project.cache import MemoryCache
+from web_project.models import db, Product, Sale, StockMovement
+from web_project import queries
+from web_project.pagecache import table_versions
+
+# Feed -> the tables whose commits it follows
+FEEDS = {
+    'sales': ('sale',),
+    'stock': ('stock_movement',),
+    'orders': ('order',),
+}
+KEEPALIVE_SECONDS = 15
+
+_shared = MemoryCache(max_size=100)
+_shared_lock = threading.Lock()
+_slots_lock = threading.Lock()
+
+
+class Reload(Exception):
+    pass
+
+
+# ---------- Cursors ----------
+def cursor():
+    # Where a page's updates start. Take it before the page's own queries:
+    # a change committed in between is then sent again rather than missed.
+    sale_id, movement_id = db.session.query(
+        db.select(db.func.coalesce(db.func.max(Sale.id), 0)).scalar_subquery(),
+        db.select(db.func.coalesce(db.func.max(StockMovement.id), 0)).scalar_subquery(),
+    ).one()
+    orders_since = datetime.utcnow() - timedelta(seconds=current_app.config['LIVE_SYNC_OVERLAP'])
+    return _format(sale_id, movement_id, orders_since)
+
+
+def _format(sale_id, movement_id, orders_since):
+    return f'{sale_id}:{movement_id}:{orders_since.isoformat()}'
+
+
+def _parse(text):
+    try:
+        sale_id, movement_id, orders_since = text.split(':', 2)
+        return int(sale_id), int(movement_id), datetime.fromisoformat(orders_since)
+    except (AttributeError, ValueError):
+        abort(400)
+
+
+def _event(kind, data):
+    return f'event: {kind}\ndata: {json.dumps(data, separators=(",", ":"))}\n'
+
+
+def _shared_result(key, compute):
+    # compute() once for the streams of this process asking for the same key
+    # within LIVE_POLL_INTERVAL; the others wait for it rather than query too.
+    # Keys include the table's data version, so a stream woken by a newer
+    # commit does not get a result from before it.
+    with _shared_lock:
+        result = _shared.get(key)
+        if result is None:
+            result = compute()
+            _shared.set(key, result, current_app.config['LIVE_POLL_INTERVAL'])
+        return result
+
+
+# ---------- Feeds ----------
+class Stream:
+    def __init__(self, feeds, after):
+        self.feeds = feeds
+        self.sale_id, self.movement_id, self.orders_since = after
+        self.sent_orders = {}  # order id -> updated_at, within the overlap
+        self.versions = {}  # table -> data version at the current check
+        self.batch_size = current_app.config['LIVE_BATCH_SIZE']
+
+    @property
+    def cursor(self):
+        return _format(self.sale_id, self.movement_id, self.orders_since)
+
+    def _limited(self, rows):
+        if len(rows) > self.batch_size:
+            raise Reload()
+        return rows
+
+    def sales(self):
+        def compute():
+            sale_row = get_template_attribute('_rows.html', 'sale_row')
+            sales = (queries.dashboard_sales().filter(Sale.id > self.sale_id)
+                     .order_by(Sale.id).limit(self.batch_size + 1).all())
+            return [(sale.id, str(sale_row(sale))) for sale in sales]
+
+        key = ('sales', self.versions['sale'], self.sale_id, self.batch_size)
+        for sale_id, html in self._limited(_shared_result(key, compute)):
+            self.sale_id = sale_id
+            yield _event('sale', {'id': sale_id, 'html': html})
+
+    def stock(self):
+        def compute():
+            # The products moved after the cursor with their last movement,
+            # and their levels, in one statement. Products deleted since have
+            # no level but still move the cursor.
+            moved = (db.session.query(StockMovement.product_id, db.func.max(StockMovement.id).label('last'))
+                     .filter(StockMovement.id > self.movement_id)
+                     .group_by(StockMovement.product_id)
+                     .limit(self.batch_size + 1)
+                     .subquery())
+            return [tuple(row) for row in db.session.query(moved.c.product_id, moved.c.last, Product.on_hand)
+                    .outerjoin(Product, Product.id == moved.c.product_id)]
+
+        key = ('stock', self.versions['stock_movement'], self.movement_id, self.batch_size)
+        moved = self._limited(_shared_result(key, compute))
+        if moved:
+            self.movement_id = max(last for _, last, _ in moved)
+            levels = {product_id: on_hand for product_id, _, on_hand in moved if on_hand is not None}
+            if levels:
+                yield _event('stock', levels)
+
+    def orders(self):
+        since = datetime.utcnow() - timedelta(seconds=current_app.config['LIVE_SYNC_OVERLAP'])
+        order_row = get_template_attribute('_rows.html', 'order_row')
+        for order in self._limited(queries.orders_changed_since(self.orders_since)
+                                   .limit(self.batch_size + 1).all()):
+            if self.sent_orders.get(order.id) == order.updated_at:
+                continue  # sent already, seen again within the overlap
+            self.sent_orders[order.id] = order.updated_at
+            data = {'id': order.id, 'status': order.status}
+            if order.status == 'pending':
+                data['html'] = str(order_row(order))
+            yield _event('order', data)
+        self.orders_since = since
+        self.sent_orders = {order_id: updated_at for order_id, updated_at in self.sent_orders.items()
+                            if updated_at >= since}
+
+    def changes(self):
+        # One check of every feed. Yields the events, then the new cursor.
+        before = self.cursor
+        events = []
+        try:
+            for feed in self.feeds:
+                events.extend(getattr(self, feed)())
+        except Reload:
+            yield 'event: reload\ndata: {}\n\n'
+            raise
+        finally:
+            db.session.remove()  # no connection held between checks
+        for event in events[:-1]:
+            yield event + '\n'
+        if events or self.cursor != before:
+            # The id of the last event becomes the browser's Last-Event-ID;
+            # with nothing else to send a cursor event still moves it forward
+            yield (events[-1] if events else _event('cursor', {})) + f'id: {self.cursor}\n\n'
+
+    @property
+    def tables(self):
+        return [table for feed in self.feeds for table in FEEDS[feed]]
+
+    def once(self):
+        # A single check, for a page polling instead of streaming
+        self.versions = dict(zip(self.tables, table_versions(self.tables)))
+        try:
+            yield from self.changes()
+        except Reload:
+            pass
+
+    def __iter__(self):
+        config = current_app.config
+        tables = self.tables
+        deadline = time.monotonic() + config['LIVE_STREAM_SECONDS']
+        versions, checked, sent = None, 0, time.monotonic()
+        # Sends the headers now rather than with the first event
+        yield ': open\n\n'
+        try:
+            while time.monotonic() < deadline:
+                current = table_versions(tables)
+                if current != versions or time.monotonic() - checked > config['LIVE_RESYNC_INTERVAL']:
+                    versions, checked = current, time.monotonic()
+                    self.versions = dict(zip(tables, current))
+                    for chunk in self.changes():
+                        sent = time.monotonic()
+                        yield chunk
+                elif time.monotonic() - sent > KEEPALIVE_SECONDS:
+                    # Also how a closed connection is noticed
+                    sent = time.monotonic()
+                    yield ': keepalive\n\n'
+                time.sleep(config['LIVE_POLL_INTERVAL'])
+        except Reload:
+            return
+
+
+# ---------- Endpoint ----------
+def _slots():
+    # Streams this process may still open
+    app = current_app._get_current_object()
+    with _slots_lock:
+        if 'live_streams' not in app.extensions:
+            app.extensions['live_streams'] = threading.BoundedSemaphore(app.config['LIVE_MAX_STREAMS'])
+        return app.extensions['live_streams']
+
+
+def response():
+    feeds = [feed for feed in request.args.get('feeds', '').split(',') if feed]
+    if not feeds or any(feed not in FEEDS for feed in feeds):
+        abort(400)
+    after = _parse(request.headers.get('Last-Event-ID') or request.args.get('after'))
+    stream = Stream(feeds, after)
+    poll = current_app.config['LIVE_FALLBACK_POLL']
+
+    if request.args.get('once'):
+        # retry: tells the page when to check again
+        body = f'retry: {poll * 1000}\n\n' + ''.join(stream.once())
+        return Response(body, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+    slots = _slots()
+    if not slots.acquire(blocking=False):
+        return Response('', 503, headers={'Cache-Control': 'no-cache', 'Retry-After': str(poll)})
+    response = Response(stream_with_context(iter(stream)), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # proxies must pass events on as they come
+    })
+    # Called when the server is done with the response, whether the stream
+    # ran out or the browser went away
+    response.call_on_close(slots.release)
+    return response
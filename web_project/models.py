@@ -1,9 +1,20 @@
 # models.py
-from app import db
-from flask_login import UserMixin
+# The database handle and every model. Modules that need a model import it
+# from here; the app itself is built by web_project.app.create_app().
 from datetime import datetime
 
+from flask_login import UserMixin
+
+from web_project.database import Database
+
+db = Database()
+
+
 class User(UserMixin, db.Model):
+    __table_args__ = (
+        db.Index('ix_user_role_is_active', 'role', 'is_active', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
@@ -19,41 +30,196 @@ class User(UserMixin, db.Model):
     def get_id(self):
         return str(self.id)
 
+
 class Product(db.Model):
+    __table_args__ = (
+        db.Index('ix_product_user_id', 'user_id', 'id'),
+        db.Index('ix_product_stock', 'stock'),
+        db.Index('ix_product_updated_at', 'updated_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     price = db.Column(db.Float, nullable=False)
-    stock = db.Column(db.Integer, nullable=False)
+    stock = db.Column(db.Integer, nullable=False)  # all locations, as of the last compaction; see stock.py
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     suppliers = db.relationship('Supplier', backref='product', lazy=True)
     sales = db.relationship('Sale', backref='product', lazy=True)
     orders = db.relationship('Order', backref='product_ordered', lazy=True)
 
+
 class Supplier(db.Model):
+    __table_args__ = (
+        db.Index('ix_supplier_product_id', 'product_id'),
+        db.Index('ix_supplier_updated_at', 'updated_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     price = db.Column(db.Float, nullable=False)
     delivery_time = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     orders = db.relationship('Order', backref='supplier', lazy=True)
 
+
 class Sale(db.Model):
+    __table_args__ = (
+        db.Index('ix_sale_sale_date', 'sale_date', 'id'),
+        db.Index('ix_sale_user_id_sale_date', 'user_id', 'sale_date', 'id'),
+        db.Index('ix_sale_product_id_sale_date', 'product_id', 'sale_date', 'id'),
+        db.Index('ix_sale_updated_at', 'updated_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     total_price = db.Column(db.Float, nullable=False)
     sale_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 
 class Order(db.Model):
+    __table_args__ = (
+        db.Index('ix_order_status', 'status', 'id'),
+        db.Index('ix_order_updated_at', 'updated_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     supplier_id = db.Column(db.Integer, db.ForeignKey('supplier.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     status = db.Column(db.String(20), nullable=False)  # 'pending', 'approved', 'rejected'
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# ---------- Stock Ledger ----------
+# Stock is recorded as movements and summed into snapshots, see web_project/stock.py
+class Location(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+
+
+# Every schema, migrated or created with create_all(), starts with the default location
+db.event.listen(Location.__table__, 'after_create',
+                db.DDL("INSERT INTO location (id, name) VALUES (1, 'Main warehouse')"))
+
+
+class StockMovement(db.Model):
+    __table_args__ = (
+        db.Index('ix_stock_movement_product_id', 'product_id', 'id'),
+        db.Index('ix_stock_movement_order_id', 'order_id', unique=True),  # an order is received once
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    location_id = db.Column(db.Integer, db.ForeignKey('location.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)  # negative when stock leaves
+    kind = db.Column(db.String(20), nullable=False)  # 'sale', 'receipt', 'adjustment'
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'))  # the supplier order of a receipt
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    note = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class StockSnapshot(db.Model):
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    location_id = db.Column(db.Integer, db.ForeignKey('location.id'), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+# One row per compaction; the latest one's movement_id is the watermark
+class StockCompaction(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    movement_id = db.Column(db.Integer, nullable=False)  # the last movement summed into the snapshots
+    movements = db.Column(db.Integer, nullable=False)
+    compacted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+def stock_watermark():
+    return db.func.coalesce(
+        db.select(StockCompaction.movement_id).order_by(StockCompaction.id.desc()).limit(1).scalar_subquery(), 0
+    )
+
+
+# Product.stock plus the movements after the watermark: the current total.
+# Deferred, so only the queries that show stock pay for it.
+Product.on_hand = db.column_property(
+    Product.stock + db.select(db.func.coalesce(db.func.sum(StockMovement.quantity), 0))
+    .where(StockMovement.product_id == Product.id, StockMovement.id > stock_watermark())
+    .scalar_subquery(),
+    deferred=True,
+)
+
+
+# ---------- Sales Rollups ----------
+# Pre-aggregated copies of the Sale table, kept up to date by web_project/rollups.py
+class DailySales(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    total_price = db.Column(db.Float, nullable=False, default=0)
+    sale_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DailyProductSales(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    total_price = db.Column(db.Float, nullable=False, default=0)
+    sale_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DailyUserSales(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    total_price = db.Column(db.Float, nullable=False, default=0)
+    sale_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Exponentially weighted sales per product, the demand signal reorder.py
+# turns into a velocity; kept up to date with the daily rollups
+class ProductDemand(db.Model):
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    weighted_quantity = db.Column(db.Float, nullable=False, default=0)
+
+
+# ---------- Reordering ----------
+# Output of the last reorder run (reorder.py), one row per product
+class ReorderPoint(db.Model):
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    velocity = db.Column(db.Float, nullable=False)  # units sold per day
+    supplier_id = db.Column(db.Integer, db.ForeignKey('supplier.id'))  # None when no supplier can deliver
+    lead_time = db.Column(db.Integer, nullable=False)  # days
+    reorder_point = db.Column(db.Integer, nullable=False)
+    target_stock = db.Column(db.Integer, nullable=False)
+    on_order = db.Column(db.Integer, nullable=False)  # pending order quantity when planned
+    planned_at = db.Column(db.DateTime, nullable=False)
+
+
+# Background jobs, see jobs.py
+class Job(db.Model):
+    __table_args__ = (
+        db.Index('ix_job_status', 'status', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    status = db.Column(db.String(20), nullable=False, default='queued')  # 'queued', 'running', 'done', 'failed'
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    user_id = db.Column(db.Integer)  # who enqueued it; no foreign key so jobs outlive deleted users
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
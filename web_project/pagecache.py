@@ -0,0 +1,134 @@
+# pagecache.py
+# Whole-response caching for the read-heavy pages, with ETags.
+#
+# Every table has a data version. A statement that writes a table marks it
+# on its connection, and when the session owning that connection commits,
+# the versions of the tables it wrote are bumped. A cached page is keyed by its route, query
+# string, viewer and the versions of the tables it reads, so a commit that
+# touches any of them makes the old entry unreachable. No write path has to
+# know which pages depend on it.
+#
+# Versions live in the shared cache (SHARED_CACHE_PATH) when one is
+# configured so that every worker sees every commit; otherwise they are per
+# process and miss the commits of the other gunicorn workers and of
+# `flask run-jobs`. Pages are therefore only cached with SHARED_CACHE_PATH
+# set. live.py also reads the versions and copes with per-process ones.
+import hashlib
+import re
+import time
+from functools import wraps
+
+from flask import current_app, g, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from web_project.cache import MemoryCache, shared_cache
+
+WRITE_STATEMENT = re.compile(
+    r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+["`\[]?(\w+)',
+    re.IGNORECASE,
+)
+VERSION_TTL = 7 * 24 * 3600
+
+_local_versions = MemoryCache(max_size=1000)
+
+
+def _versions():
+    return shared_cache(current_app) or _local_versions
+
+
+# ---------- Write Tracking ----------
+@event.listens_for(Engine, 'before_cursor_execute')
+def _track_writes(conn, cursor, statement, parameters, context, executemany):
+    match = WRITE_STATEMENT.match(statement)
+    if match:
+        conn.info.setdefault('written_tables', set()).add(match.group(1).lower())
+
+
+@event.listens_for(Session, 'after_begin')
+def _remember_connection(session, transaction, connection):
+    session.info.setdefault('connections', set()).add(connection)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_versions(session):
+    # Runs once the data is committed, so a reader that sees the new version
+    # also sees the new rows
+    tables = set()
+    for connection in session.info.pop('connections', ()):
+        tables |= connection.info.pop('written_tables', set())
+    if tables:
+        versions = _versions()
+        version = time.time_ns()
+        for table in tables:
+            versions.set(f'version:{table}', version, VERSION_TTL)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_writes(session):
+    for connection in session.info.pop('connections', ()):
+        connection.info.pop('written_tables', None)
+
+
+def table_versions(tables):
+    versions = _versions()
+    return [versions.get(f'version:{table}') or 0 for table in tables]
+
+
+# ---------- Cached Views ----------
+def enabled(app):
+    return app.config['PAGE_CACHE_ENABLED'] and shared_cache(app) is not None
+
+
+def _bodies():
+    app = current_app._get_current_object()
+    if 'page_cache' not in app.extensions:
+        app.extensions['page_cache'] = MemoryCache(app.config['PAGE_CACHE_SIZE'])
+    return app.extensions['page_cache']
+
+
+def cached_page(*tables):
+    # Caches successful GET responses of a view that reads `tables`. Pages
+    # are cached per session: they show the viewer's role-specific navigation
+    # and may embed the session's CSRF token. Requests with pending flash
+    # messages are never served from or stored in the cache.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or '_flashes' in session or not enabled(current_app):
+                return view(*args, **kwargs)
+
+            key = repr((
+                request.endpoint,
+                sorted(kwargs.items()),
+                sorted(request.args.items(multi=True)),
+                current_user.get_id(),
+                current_user.role,
+                session.get('csrf_token'),
+                table_versions(tables),
+            ))
+            etag = hashlib.sha1(key.encode()).hexdigest()
+
+            # A 304 only for a page this process still holds: the ETag alone
+            # does not prove the client's copy was rendered from these versions
+            body = _bodies().get(etag)
+            if body is not None and request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            elif body is not None:
+                response = make_response(body)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                ttl = current_app.config['PAGE_CACHE_TTL']
+                if g.get('read_from_replica'):
+                    ttl = min(ttl, current_app.config['REPLICA_PAGE_CACHE_TTL'])
+                _bodies().set(etag, response.get_data(), ttl)
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
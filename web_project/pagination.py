@@ -0,0 +1,140 @@
+# pagination.py
+# Keyset (cursor) pagination for the list views. A page is fetched with
+# "WHERE (sort key) after (last row seen) ORDER BY sort key LIMIT n", so the
+# cost of a page does not depend on how deep into the table it is, unlike
+# OFFSET which has to walk every skipped row.
+import base64
+import binascii
+import json
+import operator
+from datetime import datetime
+
+from flask import abort, current_app, request
+from sqlalchemy import and_, or_
+from sqlalchemy.types import DateTime
+
+
+class KeysetPage:
+    def __init__(self, items, prefix, sort, direction, per_page, sort_options, next_cursor):
+        self.items = items
+        self.prefix = prefix
+        self.sort = sort
+        self.direction = direction
+        self.per_page = per_page
+        self.sort_options = sort_options
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self):
+        return (self.prefix + 'after') not in request.args
+
+    def url_args(self, **changes):
+        # Query string for a link to another page of this listing. Arguments
+        # that belong to other listings on the same page are kept as they are.
+        args = request.args.to_dict()
+        for key, value in changes.items():
+            key = self.prefix + key
+            if value is None:
+                args.pop(key, None)
+            else:
+                args[key] = value
+        return args
+
+    def next_args(self):
+        return self.url_args(after=self.next_cursor)
+
+    def first_args(self):
+        return self.url_args(after=None)
+
+    def sort_args(self, sort):
+        direction = self.direction
+        if sort == self.sort:
+            direction = 'asc' if self.direction == 'desc' else 'desc'
+        return self.url_args(sort=sort, dir=direction, after=None)
+
+
+# ---------- Cursors ----------
+def encode_cursor(values):
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _cursor_value(column, value):
+    # A cursor comes from the client: each value must fit its sort column
+    # before it goes anywhere near the database
+    if isinstance(column.type, DateTime):
+        if not isinstance(value, str):
+            raise ValueError
+        return datetime.fromisoformat(value)
+    expected = column.type.python_type
+    if expected is float:
+        expected = (int, float)
+    if isinstance(value, bool) or not isinstance(value, expected):
+        raise ValueError
+    if isinstance(value, int) and not -2 ** 63 <= value < 2 ** 63:
+        raise ValueError  # past what the database can bind
+    return value
+
+
+def decode_cursor(cursor, columns):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [_cursor_value(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError, binascii.Error):
+        abort(400)
+
+
+def _after(columns, values, direction):
+    # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+    compare = operator.lt if direction == 'desc' else operator.gt
+    clauses = []
+    for i, column in enumerate(columns):
+        equal = [columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal, compare(column, values[i])))
+    return or_(*clauses)
+
+
+# ---------- Paginate ----------
+def paginate(query, sorts, default_sort, default_direction='desc', prefix=''):
+    # `sorts` maps the public sort name to the columns of its key. Every key
+    # must end in a unique column (normally the primary key) so the order is
+    # total and no row is skipped or repeated between pages.
+    args = request.args
+    sort = args.get(prefix + 'sort', default_sort)
+    if sort not in sorts:
+        sort = default_sort
+    direction = args.get(prefix + 'dir', default_direction)
+    if direction not in ('asc', 'desc'):
+        direction = default_direction
+
+    per_page = args.get(prefix + 'per_page', type=int) or current_app.config['PAGE_SIZE']
+    per_page = max(1, min(per_page, current_app.config['MAX_PAGE_SIZE']))
+
+    columns = sorts[sort]
+    cursor = args.get(prefix + 'after')
+    if cursor:
+        query = query.filter(_after(columns, decode_cursor(cursor, columns), direction))
+
+    order = [column.desc() if direction == 'desc' else column.asc() for column in columns]
+    items = query.order_by(*order).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_cursor([getattr(items[-1], column.key) for column in columns])
+
+    return KeysetPage(items, prefix, sort, direction, per_page, list(sorts), next_cursor)
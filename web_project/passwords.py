@@ -0,0 +1,77 @@
+# passwords.py
+# Password hashing. PASSWORD_HASHER names the scheme and its cost as a
+# Werkzeug method string ('pbkdf2:sha256:600000', 'scrypt:32768:8:1'), or is
+# any object with hash(password), verify(stored, password) and
+# needs_rehash(stored). A stored hash made with another scheme or cost still
+# verifies; login() then rehashes it with the current one, so raising the
+# cost upgrades accounts as their owners log in.
+#
+# A hash takes a CPU core for the whole of its cost (about 0.2 s at the
+# default), outside the GIL. Only PASSWORD_HASH_CONCURRENCY of them run at
+# once per process, so a burst of logins queues here instead of taking every
+# core from the other requests; one that waits longer than PASSWORD_HASH_WAIT
+# raises HashingBusy. See benchmarks/bench_login.py for the throughput per
+# core at a given cost.
+import threading
+from functools import cached_property
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashingBusy(Exception):
+    pass
+
+
+class WerkzeugHasher:
+    def __init__(self, method):
+        self.method = method
+
+    def hash(self, password):
+        return generate_password_hash(password, method=self.method)
+
+    def verify(self, stored, password):
+        return check_password_hash(stored, password)
+
+    @cached_property
+    def prefix(self):
+        # The method as Werkzeug writes it into a hash, with its defaults
+        # filled in: 'pbkdf2:sha256' is stored as 'pbkdf2:sha256:600000'.
+        # One hash, so worked out on first use rather than in create_app().
+        return generate_password_hash('', method=self.method).split('$', 1)[0]
+
+    def needs_rehash(self, stored):
+        # Stored as "<method>$<salt>$<hash>"
+        return stored.split('$', 1)[0] != self.prefix
+
+
+class Passwords:
+    def __init__(self, hasher, concurrency, wait):
+        self.hasher = hasher
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.wait = wait
+
+    def _run(self, function, *args):
+        if not self.slots.acquire(timeout=self.wait):
+            raise HashingBusy()
+        try:
+            return function(*args)
+        finally:
+            self.slots.release()
+
+    def hash(self, password):
+        return self._run(self.hasher.hash, password)
+
+    def verify(self, stored, password):
+        return self._run(self.hasher.verify, stored, password)
+
+    def needs_rehash(self, stored):
+        return self.hasher.needs_rehash(stored)
+
+
+def init_app(app):
+    hasher = app.config['PASSWORD_HASHER']
+    if isinstance(hasher, str):
+        hasher = WerkzeugHasher(hasher)
+    passwords = Passwords(hasher, app.config['PASSWORD_HASH_CONCURRENCY'], app.config['PASSWORD_HASH_WAIT'])
+    app.extensions['passwords'] = passwords
+    return passwords
@@ -0,0 +1,134 @@
+# principals.py
+# Loading current_user without a database query on every request. The views
+# only need the user's id, role and active flag, so login stores those in the
+# signed session cookie as a "stamp". A stamp younger than
+# SESSION_PRINCIPAL_TTL seconds is trusted as is; an older one is revalidated
+# through a TTL/LRU cache and only then through the database.
+#
+# manage_users() calls invalidate() when it approves or deletes a user. That
+# drops the cached entry and records a revocation time, so stamps issued
+# before it are revalidated on their next request. The cache is only used
+# with SHARED_CACHE_PATH set, which shares it (and the revocations) between
+# all gunicorn workers and job processes on the host, see cache.py. Without
+# it, the other processes would keep a revoked user's entry for up to
+# PRINCIPAL_CACHE_TTL, so an expired stamp is always checked against the
+# database and only revocations are kept, per process.
+import threading
+import time
+
+from flask import current_app, session
+from flask_login import UserMixin
+
+from web_project.models import db, User
+from web_project.cache import MemoryCache, shared_cache
+
+STAMP_KEY = '_principal'
+
+
+class Principal(UserMixin):
+    # Stands in for User as current_user. Anything beyond the stamped fields
+    # loads the real row on first use.
+    is_active = None  # plain attribute, shadows UserMixin's read-only property
+
+    def __init__(self, id, role, is_active, username):
+        self.id = id
+        self.role = role
+        self.is_active = is_active
+        self.username = username
+        self._user = None
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return getattr(self._user, name)
+
+    def get_id(self):
+        return str(self.id)
+
+
+# ---------- Loading ----------
+class PrincipalLoader:
+    def __init__(self, cache, cache_users=True):
+        self.cache = cache
+        self.cache_users = cache_users
+        self.lock = threading.Lock()
+        self.counts = {'session': 0, 'cache': 0, 'database': 0}
+
+    def _count(self, source):
+        with self.lock:
+            self.counts[source] += 1
+
+    def stats(self):
+        with self.lock:
+            counts = dict(self.counts)
+        lookups = sum(counts.values())
+        saved = counts['session'] + counts['cache']
+        return {
+            'lookups': lookups,
+            'from_session': counts['session'],
+            'from_cache': counts['cache'],
+            'from_database': counts['database'],
+            'queries_saved': saved,
+            'queries_saved_per_request': round(saved / lookups, 3) if lookups else 0.0,
+        }
+
+    def _fetch(self, user_id):
+        data = self.cache.get(f'user:{user_id}') if self.cache_users else None
+        if data is not None:
+            self._count('cache')
+            return data
+
+        self._count('database')
+        row = (db.session.query(User.id, User.role, User.is_active, User.username)
+               .filter(User.id == user_id)
+               .first())
+        if row is None:
+            return None
+        data = {'id': row.id, 'role': row.role, 'is_active': bool(row.is_active), 'username': row.username}
+        if self.cache_users:
+            self.cache.set(f'user:{user_id}', data, current_app.config['PRINCIPAL_CACHE_TTL'])
+        return data
+
+    def load(self, user_id):
+        user_id = int(user_id)
+        now = time.time()
+        stamp = session.get(STAMP_KEY)
+        if stamp and stamp.get('id') == user_id and now - stamp['at'] < current_app.config['SESSION_PRINCIPAL_TTL']:
+            revoked_at = self.cache.get(f'revoked:{user_id}')
+            if revoked_at is None or revoked_at < stamp['at']:
+                self._count('session')
+                return Principal(stamp['id'], stamp['role'], stamp['is_active'], stamp['username'])
+
+        data = self._fetch(user_id)
+        if data is None:
+            session.pop(STAMP_KEY, None)
+            return None
+        session[STAMP_KEY] = dict(data, at=now)
+        return Principal(data['id'], data['role'], data['is_active'], data['username'])
+
+    def remember(self, user):
+        # Called right after login_user() so the next request needs no lookup
+        session[STAMP_KEY] = {
+            'id': user.id, 'role': user.role, 'is_active': bool(user.is_active),
+            'username': user.username, 'at': time.time(),
+        }
+
+    def forget(self):
+        session.pop(STAMP_KEY, None)
+
+    def invalidate(self, user_id):
+        self.cache.delete(f'user:{user_id}')
+        # Stamps are trusted for at most SESSION_PRINCIPAL_TTL, so the marker can expire after that
+        self.cache.set(f'revoked:{user_id}', time.time(), current_app.config['SESSION_PRINCIPAL_TTL'])
+
+
+def init_app(app):
+    cache = shared_cache(app)
+    if cache is None:
+        loader = PrincipalLoader(MemoryCache(app.config['PRINCIPAL_CACHE_SIZE']), cache_users=False)
+    else:
+        loader = PrincipalLoader(cache)
+    app.extensions['principals'] = loader
+    return loader
@@ -0,0 +1,153 @@
+# queries.py
+# Read queries for the list views. Every relationship a template walks is
+# loaded up front (joinedload for many-to-one) and only the columns the
+# template renders are selected, so each list costs one statement no matter
+# how many rows it has. List queries are returned unexecuted and without an
+# ORDER BY so the views can hand them to pagination.paginate().
+from datetime import date, timedelta
+
+from sqlalchemy.orm import joinedload, load_only
+
+from web_project.models import db, User, Product, Supplier, Sale, Order, ReorderPoint
+
+
+# ---------- Sort Keys ----------
+SALE_SORTS = {
+    'date': (Sale.sale_date, Sale.id),
+    'total': (Sale.total_price, Sale.id),
+}
+PRODUCT_SORTS = {
+    'id': (Product.id,),
+    'name': (Product.name, Product.id),
+    'stock': (Product.stock, Product.id),
+}
+USER_SORTS = {
+    'id': (User.id,),
+    'username': (User.username, User.id),
+}
+SUPPLIER_SORTS = {
+    'id': (Supplier.id,),
+    'name': (Supplier.name, Supplier.id),
+    'price': (Supplier.price, Supplier.id),
+    'delivery_time': (Supplier.delivery_time, Supplier.id),
+}
+ORDER_SORTS = {
+    'id': (Order.id,),
+}
+
+
+# ---------- Sales ----------
+def _sale_rows():
+    return Sale.query.options(
+        load_only(Sale.sale_date, Sale.quantity, Sale.total_price),
+        joinedload(Sale.product).load_only(Product.name),
+    )
+
+
+def _filter_sales(query, start_date=None, end_date=None, product_id=None, user_id=None):
+    # end_date is inclusive: sales made at any time on that day are included.
+    # Its last possible day (9999-12-31) has no next day and bounds nothing.
+    if start_date is not None:
+        query = query.filter(Sale.sale_date >= start_date)
+    if end_date is not None and end_date.date() < date.max:
+        query = query.filter(Sale.sale_date < end_date + timedelta(days=1))
+    if product_id is not None:
+        query = query.filter(Sale.product_id == product_id)
+    if user_id is not None:
+        query = query.filter(Sale.user_id == user_id)
+    return query
+
+
+def dashboard_sales(**filters):
+    query = _sale_rows().options(joinedload(Sale.buyer).load_only(User.username))
+    return _filter_sales(query, **filters)
+
+
+def user_sales(user_id):
+    return _filter_sales(_sale_rows(), user_id=user_id)
+
+
+def sales_between(start_date=None, end_date=None):
+    return _filter_sales(_sale_rows(), start_date, end_date)
+
+
+def sales_export(**filters):
+    # Flat rows for export.py, oldest first so the export walks ix_sale_sale_date
+    query = (db.session.query(Sale.id, Sale.sale_date, Product.name, User.username,
+                              Sale.quantity, Sale.total_price)
+             .join(Product, Product.id == Sale.product_id)
+             .join(User, User.id == Sale.user_id))
+    return _filter_sales(query, **filters).order_by(Sale.sale_date, Sale.id)
+
+
+# ---------- Products ----------
+# Pages show the exact stock (Product.on_hand); filters and sorts use the
+# compacted Product.stock so they can use its index (see stock.py).
+def products(owner_id=None, max_stock=None):
+    query = Product.query.options(
+        load_only(Product.name, Product.price, Product.on_hand),
+        joinedload(Product.owner).load_only(User.username),
+    )
+    if owner_id is not None:
+        query = query.filter(Product.user_id == owner_id)
+    if max_stock is not None:
+        query = query.filter(Product.stock <= max_stock)
+    return query
+
+
+def products_export(owner_id=None, max_stock=None):
+    query = (db.session.query(Product.id, Product.name, Product.price, Product.on_hand, User.username)
+             .join(User, User.id == Product.user_id))
+    if owner_id is not None:
+        query = query.filter(Product.user_id == owner_id)
+    if max_stock is not None:
+        query = query.filter(Product.stock <= max_stock)
+    return query.order_by(Product.id)
+
+
+def low_stock_products(threshold=10):
+    # At or below the reorder point from the last reorder run; products it has
+    # not planned yet fall back to the fixed threshold
+    return (db.session.query(Product.id, Product.name, Product.on_hand.label('stock'), ReorderPoint.reorder_point,
+                             ReorderPoint.velocity)
+            .outerjoin(ReorderPoint, ReorderPoint.product_id == Product.id)
+            .filter(db.or_(Product.stock <= ReorderPoint.reorder_point,
+                           db.and_(ReorderPoint.product_id.is_(None), Product.stock < threshold)))
+            .order_by(Product.stock, Product.id)
+            .all())
+
+
+# ---------- Users ----------
+def users_with_role(role, **filters):
+    return (User.query
+            .options(load_only(User.username, User.email))
+            .filter_by(role=role, **filters))
+
+
+# ---------- Suppliers & Orders ----------
+def suppliers(product_id=None):
+    query = Supplier.query.options(
+        load_only(Supplier.name, Supplier.quantity, Supplier.price, Supplier.delivery_time),
+        joinedload(Supplier.product).load_only(Product.name),
+    )
+    if product_id is not None:
+        query = query.filter(Supplier.product_id == product_id)
+    return query
+
+
+def _order_rows():
+    return Order.query.options(
+        load_only(Order.quantity, Order.status, Order.updated_at),
+        joinedload(Order.customer).load_only(User.username),
+        joinedload(Order.product_ordered).load_only(Product.name),
+        joinedload(Order.supplier).load_only(Supplier.name),
+    )
+
+
+def pending_orders():
+    return _order_rows().filter(Order.status == 'pending')
+
+
+def orders_changed_since(since):
+    # Orders in any status, in the order they changed (live.py)
+    return _order_rows().filter(Order.updated_at >= since).order_by(Order.updated_at, Order.id)
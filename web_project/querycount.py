@@ -0,0 +1,53 @@
+# querycount.py
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+# ---------- Statement Counter ----------
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.sql_statements = g.get('sql_statements', 0) + 1
+
+
+def statements_issued():
+    return g.get('sql_statements', 0)
+
+
+# ---------- Per-View Budgets ----------
+def query_budget(limit):
+    # Caps the number of SQL statements a view may issue, including the
+    # Flask-Login user lookup. The budget is a constant, so any view that
+    # starts walking lazy relationships row by row trips it as soon as the
+    # table has more than a handful of rows.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.sql_query_budget = limit
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def check_query_budget(response):
+    limit = g.get('sql_query_budget')
+    issued = statements_issued()
+    if limit is None or issued <= limit:
+        return response
+
+    message = f"{request.endpoint} issued {issued} SQL statements (budget {limit})"
+    if current_app.testing or current_app.config.get('SQL_QUERY_BUDGET_ENFORCE'):
+        raise QueryBudgetExceeded(message)
+    current_app.logger.warning(message)
+    return response
+
+
+def init_app(app):
+    app.after_request(check_query_budget)
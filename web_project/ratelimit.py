@@ -0,0 +1,120 @@
+# ratelimit.py
+# Token buckets for the login and registration forms. Each limit in
+# LOGIN_LIMITS is (burst, period): a client may make `burst` attempts at
+# once, and gets them back at a steady rate over `period` seconds. Login
+# attempts are limited per client address and per account, so neither one
+# address trying many accounts nor many addresses trying one account gets
+# more than its share of password hashes (passwords.py).
+#
+# The buckets live in process memory by default, so each gunicorn worker
+# counts separately. With SHARED_CACHE_PATH set, they are kept in a table of
+# that SQLite file and shared by all workers on the host, see cache.py.
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def _take(tokens, updated, now, burst, period):
+    # Refills the bucket for the time since `updated` and takes a token.
+    # Returns the tokens left and 0, or, with none to take, the seconds until
+    # there is one.
+    tokens = min(burst, tokens + (now - updated) * burst / period)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) * period / burst
+
+
+class MemoryBuckets:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.buckets = OrderedDict()  # key -> (tokens, updated)
+        self.lock = threading.Lock()
+
+    def take(self, key, burst, period):
+        now = time.time()
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (burst, now))
+            tokens, wait = _take(tokens, updated, now, burst, period)
+            self.buckets[key] = (tokens, now)
+            self.buckets.move_to_end(key)
+            while len(self.buckets) > self.max_size:
+                self.buckets.popitem(last=False)
+        return wait
+
+
+class SQLiteBuckets:
+    # Shared between processes on one host. Each thread keeps its own connection.
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS rate_bucket '
+                '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)'
+            )
+        finally:
+            connection.close()
+
+    def _connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+        return connection
+
+    def take(self, key, burst, period):
+        connection = self._connection()
+        # Takes the write lock up front, so two workers cannot both take the last token
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            row = connection.execute('SELECT tokens, updated FROM rate_bucket WHERE key = ?', (key,)).fetchone()
+            tokens, wait = _take(*(row or (burst, now)), now, burst, period)
+            connection.execute(
+                'INSERT OR REPLACE INTO rate_bucket (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)',
+                (key, tokens, now, now + (burst - tokens) * period / burst),
+            )
+            if random.random() < 0.01:
+                # A bucket that has refilled is the same as no bucket
+                connection.execute('DELETE FROM rate_bucket WHERE full_at < ?', (now,))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return wait
+
+
+class RateLimiter:
+    def __init__(self, buckets, limits):
+        self.buckets = buckets
+        self.limits = limits
+        self.lock = threading.Lock()
+        self.counts = {'allowed': 0, 'limited': 0}
+
+    def hit(self, **keys):
+        # Takes a token from each named bucket, e.g. hit(ip=..., account=...).
+        # Returns 0 if the attempt may go ahead, otherwise the seconds to wait.
+        wait = 0.0
+        for name, key in keys.items():
+            burst, period = self.limits[name]
+            wait = max(wait, self.buckets.take(f'{name}:{key}', burst, period))
+        with self.lock:
+            self.counts['limited' if wait else 'allowed'] += 1
+        return wait
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts)
+
+
+def init_app(app):
+    path = app.config.get('SHARED_CACHE_PATH')
+    buckets = SQLiteBuckets(path) if path else MemoryBuckets(app.config['RATE_LIMIT_BUCKETS'])
+    limiter = RateLimiter(buckets, app.config['LOGIN_LIMITS'])
+    app.extensions['ratelimit'] = limiter
+    return limiter
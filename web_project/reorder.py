@@ -0,0 +1,120 @@
+# reorder.py
+# Reorder points and automatic supplier orders from sales velocity. A run
+# (nightly from cron, or a plan_reorders job) works on whole tables with a
+# handful of set-based statements, so its cost does not grow with per-row
+# Python work:
+#
+#   1. velocity: ProductDemand (rollups.py) scaled down to today, in units/day
+#   2. supplier: the best Supplier per product with stock to sell, by
+#      REORDER_SUPPLIER_STRATEGY ('cheapest' = price then delivery time,
+#      'fastest' = delivery time then price); its delivery_time is the lead time
+#   3. reorder point = velocity * (lead time + REORDER_SAFETY_DAYS),
+#      target stock  = reorder point + velocity * REORDER_COVER_DAYS
+#   4. every product at or below its reorder point that sells at least
+#      REORDER_MIN_VELOCITY a day and has no pending order yet gets a pending
+#      Order for the difference to its target, capped at the supplier's
+#      quantity. Managers approve them in confirm_orders.
+#
+# Products with a pending order are skipped until it is decided, so running
+# it twice does not order twice. On SQLite the CEIL() it uses needs the math
+# functions (3.35+, enabled in the CPython and distribution builds).
+#
+#   flask --app web_project.app plan-reorders
+from datetime import datetime
+
+import click
+from flask import current_app
+
+from web_project.models import db, Product, Supplier, Order, ProductDemand, ReorderPoint
+from web_project import rollups, stock
+
+STRATEGIES = {
+    'cheapest': (Supplier.price, Supplier.delivery_time, Supplier.id),
+    'fastest': (Supplier.delivery_time, Supplier.price, Supplier.id),
+}
+
+
+def velocity_scale(day):
+    # ProductDemand.weighted_quantity times this is the exponentially
+    # weighted average of units sold per day, as of `day`
+    decay = 2 ** (-1 / current_app.config['DEMAND_HALF_LIFE_DAYS'])
+    return (1 - decay) / rollups.demand_weight(day)
+
+
+def _plan_select(strategy, now):
+    config = current_app.config
+    best = (db.session.query(
+                Supplier.id, Supplier.product_id, Supplier.delivery_time,
+                db.func.row_number().over(partition_by=Supplier.product_id,
+                                          order_by=STRATEGIES[strategy]).label('rank'))
+            .filter(Supplier.quantity > 0)
+            .subquery())
+    pending = (db.session.query(Order.product_id, db.func.sum(Order.quantity).label('quantity'))
+               .filter(Order.status == 'pending')
+               .group_by(Order.product_id)
+               .subquery())
+
+    velocity = db.func.coalesce(ProductDemand.weighted_quantity, 0.0) * velocity_scale(now.date())
+    lead_time = db.func.coalesce(best.c.delivery_time, 0)
+    reorder_point = db.func.ceil(velocity * (lead_time + config['REORDER_SAFETY_DAYS']))
+    target_stock = db.func.ceil(velocity * (lead_time + config['REORDER_SAFETY_DAYS'] + config['REORDER_COVER_DAYS']))
+    return (db.select(Product.id, velocity, best.c.id, lead_time, reorder_point, target_stock,
+                      db.func.coalesce(pending.c.quantity, 0), db.literal(now))
+            .select_from(Product)
+            .outerjoin(ProductDemand, ProductDemand.product_id == Product.id)
+            .outerjoin(best, db.and_(best.c.product_id == Product.id, best.c.rank == 1))
+            .outerjoin(pending, pending.c.product_id == Product.id))
+
+
+def _orders_select(now):
+    needed = ReorderPoint.target_stock - Product.stock
+    quantity = db.case((needed < Supplier.quantity, needed), else_=Supplier.quantity)
+    return (db.select(Product.user_id, Product.id, Supplier.id, quantity, db.literal('pending'), db.literal(now))
+            .select_from(ReorderPoint)
+            .join(Product, Product.id == ReorderPoint.product_id)
+            .join(Supplier, Supplier.id == ReorderPoint.supplier_id)
+            .where(Product.stock <= ReorderPoint.reorder_point,
+                   ReorderPoint.on_order == 0,
+                   ReorderPoint.velocity >= current_app.config['REORDER_MIN_VELOCITY'],
+                   needed > 0))
+
+
+def plan(strategy=None, place_orders=True):
+    # Recomputes every reorder point and, with place_orders, creates the
+    # pending orders, all in one transaction
+    strategy = strategy or current_app.config['REORDER_SUPPLIER_STRATEGY']
+    if strategy not in STRATEGIES:
+        raise ValueError(f"unknown supplier strategy {strategy!r}")
+
+    # Product.stock, which the plan compares against, as of now
+    stock.compact()
+
+    now = datetime.utcnow()
+    table = ReorderPoint.__table__
+    db.session.execute(table.delete())
+    planned = db.session.execute(table.insert().from_select(
+        ['product_id', 'velocity', 'supplier_id', 'lead_time', 'reorder_point', 'target_stock', 'on_order',
+         'planned_at'],
+        _plan_select(strategy, now),
+    )).rowcount
+
+    ordered = 0
+    if place_orders:
+        # INSERT ... SELECT skips the Python-side column defaults
+        ordered = db.session.execute(Order.__table__.insert().from_select(
+            ['user_id', 'product_id', 'supplier_id', 'quantity', 'status', 'updated_at'], _orders_select(now),
+        )).rowcount
+    db.session.commit()
+    return {'products': planned, 'orders': ordered, 'strategy': strategy}
+
+
+def init_app(app):
+    @app.cli.command('plan-reorders')
+    @click.option('--strategy', type=click.Choice(sorted(STRATEGIES)), default=None,
+                  help="Supplier choice. Default: REORDER_SUPPLIER_STRATEGY.")
+    @click.option('--no-orders', is_flag=True, help="Only recompute reorder points.")
+    def plan_reorders_command(strategy, no_orders):
+        """Recompute reorder points from sales velocity and create pending supplier orders."""
+        result = plan(strategy, place_orders=not no_orders)
+        click.echo(f"Planned {result['products']} products ({result['strategy']} suppliers), "
+                   f"created {result['orders']} pending orders.")
@@ -0,0 +1,176 @@
+# rollups.py
+# Daily sales aggregates, overall and per product / per seller. They are
+# updated inside the same flush that writes a Sale, so they commit or roll
+# back together with it, and analytics can answer date-range questions by
+# scanning one row per day instead of every sale.
+#
+# ProductDemand keeps one exponentially weighted sales total per product: a
+# sale on `day` adds quantity * demand_weight(day), where the weight doubles
+# every DEMAND_HALF_LIFE_DAYS. Because the weights grow instead of the old
+# totals decaying, a sale is a plain addition like the daily rollups, and
+# reorder.py turns the total into a velocity by scaling it down to today.
+# Weights stay within float range for ~1000 half-lives after DEMAND_EPOCH.
+from collections import defaultdict
+from datetime import date
+from types import SimpleNamespace
+
+import click
+from flask import current_app
+from sqlalchemy import event, inspect
+
+from web_project.database import upsert
+from web_project.models import db, User, Product, Sale, DailySales, DailyProductSales, DailyUserSales, ProductDemand
+
+MEASURES = ('quantity', 'total_price', 'sale_count')
+DEMAND_EPOCH = date(2020, 1, 1)
+
+# Rollup model -> the Sale column it is keyed by besides the day
+ROLLUPS = (
+    (DailySales, None),
+    (DailyProductSales, 'product_id'),
+    (DailyUserSales, 'user_id'),
+)
+# The Sale columns the rollups and ProductDemand are computed from
+SALE_COLUMNS = ('sale_date', 'product_id', 'user_id', 'quantity', 'total_price')
+
+
+def demand_weight(day):
+    return 2 ** ((day - DEMAND_EPOCH).days / current_app.config['DEMAND_HALF_LIFE_DAYS'])
+
+
+# ---------- Incremental Updates ----------
+def apply_deltas(connection, sales, sign=1):
+    # `sales` is any iterable of objects or rows with sale_date, product_id,
+    # user_id, quantity and total_price. Deltas are merged per key first so a
+    # batch of sales costs one statement per rollup table.
+    for model, column in ROLLUPS:
+        deltas = defaultdict(lambda: [0, 0.0, 0])
+        for sale in sales:
+            key = (sale.sale_date.date(),) + ((getattr(sale, column),) if column else ())
+            delta = deltas[key]
+            delta[0] += sign * sale.quantity
+            delta[1] += sign * sale.total_price
+            delta[2] += sign
+        if not deltas:
+            continue
+
+        keys = ['day'] + ([column] if column else [])
+        rows = [dict(zip(keys, key), **dict(zip(MEASURES, delta))) for key, delta in deltas.items()]
+        upsert(connection, model.__table__, keys, rows, add=MEASURES)
+
+    weights, demand = {}, defaultdict(float)
+    for sale in sales:
+        day = sale.sale_date.date()
+        if day not in weights:
+            weights[day] = demand_weight(day)
+        demand[sale.product_id] += sign * sale.quantity * weights[day]
+    if demand:
+        rows = [dict(product_id=product_id, weighted_quantity=weighted) for product_id, weighted in demand.items()]
+        upsert(connection, ProductDemand.__table__, ['product_id'], rows, add=('weighted_quantity',))
+
+
+@event.listens_for(Sale, 'after_insert')
+def _sale_inserted(mapper, connection, sale):
+    apply_deltas(connection, [sale])
+
+
+@event.listens_for(Sale, 'after_delete')
+def _sale_deleted(mapper, connection, sale):
+    apply_deltas(connection, [sale], sign=-1)
+
+
+@event.listens_for(Sale, 'before_update')
+def _sale_updated(mapper, connection, sale):
+    # An edited sale moves out of its old rollup rows and into the new ones.
+    # The old values are read from the row, since a sale loaded with
+    # load_only() has no history for the columns it did not load.
+    state = inspect(sale)
+    changed = {name: state.attrs[name].history.added for name in SALE_COLUMNS}
+    changed = {name: added[0] for name, added in changed.items() if added}
+    if not changed:
+        return
+    old = connection.execute(
+        db.select(*(getattr(Sale, name) for name in SALE_COLUMNS)).where(Sale.id == sale.id)
+    ).one()
+    apply_deltas(connection, [old], sign=-1)
+    apply_deltas(connection, [SimpleNamespace(**dict(old._asdict(), **changed))])
+
+
+# ---------- Backfill ----------
+def rebuild():
+    # Recompute every rollup from the Sale table in one INSERT ... SELECT each
+    day = db.func.date(Sale.sale_date)
+    for model, column in ROLLUPS:
+        table = model.__table__
+        group = [day] + ([getattr(Sale, column)] if column else [])
+        select = db.select(
+            *group,
+            db.func.sum(Sale.quantity),
+            db.func.sum(Sale.total_price),
+            db.func.count(Sale.id),
+        ).group_by(*group)
+        names = ['day'] + ([column] if column else []) + list(MEASURES)
+        db.session.execute(table.delete())
+        db.session.execute(table.insert().from_select(names, select))
+
+    # Same weights as apply_deltas(), one per day, so the totals match exactly
+    db.session.execute(ProductDemand.__table__.delete())
+    days = [day for (day,) in db.session.query(DailySales.day)]
+    if days:
+        weighted = db.func.sum(DailyProductSales.quantity * db.case(
+            {day: demand_weight(day) for day in days}, value=DailyProductSales.day, else_=0.0,
+        ))
+        select = db.select(DailyProductSales.product_id, weighted).group_by(DailyProductSales.product_id)
+        db.session.execute(ProductDemand.__table__.insert().from_select(['product_id', 'weighted_quantity'], select))
+    db.session.commit()
+
+
+# ---------- Queries ----------
+def _in_range(query, model, start_date=None, end_date=None):
+    if start_date is not None:
+        query = query.filter(model.day >= start_date)
+    if end_date is not None:
+        query = query.filter(model.day <= end_date)
+    return query
+
+
+def totals(start_date=None, end_date=None):
+    query = db.session.query(
+        db.func.coalesce(db.func.sum(DailySales.total_price), 0),
+        db.func.coalesce(db.func.sum(DailySales.quantity), 0),
+    )
+    return _in_range(query, DailySales, start_date, end_date).one()
+
+
+def by_day(start_date=None, end_date=None):
+    query = DailySales.query.order_by(DailySales.day)
+    return _in_range(query, DailySales, start_date, end_date).all()
+
+
+def _ranked(model, entity, columns, start_date, end_date, limit):
+    revenue = db.func.sum(model.total_price).label('total_price')
+    query = (db.session.query(*columns, db.func.sum(model.quantity).label('quantity'), revenue)
+             .select_from(model)
+             .join(entity))
+    return (_in_range(query, model, start_date, end_date)
+            .group_by(*columns)
+            .order_by(revenue.desc())
+            .limit(limit)
+            .all())
+
+
+def by_product(start_date=None, end_date=None, limit=20):
+    return _ranked(DailyProductSales, Product, (Product.id, Product.name), start_date, end_date, limit)
+
+
+def by_seller(start_date=None, end_date=None, limit=20):
+    return _ranked(DailyUserSales, User, (User.id, User.username), start_date, end_date, limit)
+
+
+# ---------- CLI ----------
+def init_app(app):
+    @app.cli.command('backfill-rollups')
+    def backfill_rollups_command():
+        """Rebuild the daily sales rollup and product demand tables from the Sale table."""
+        rebuild()
+        click.echo(f"Rebuilt sales rollups: {DailySales.query.count()} days.")
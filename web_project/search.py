@@ -0,0 +1,260 @@
+# search.py
+# Prefix search over product and supplier names and user names/emails. On
+# SQLite the names are kept in an FTS5 table, search_index, with prefix
+# indexes for 1-8 characters, so a typeahead query is an index lookup no
+# matter how many rows match. Each row's rowid encodes (kind, id), so keeping
+# it in sync is a delete and an insert by primary key.
+#
+# The table is created by db.create_all() and, with its rows, by the
+# migration adding it; if FTS5 was missing then, `rebuild-search` adds it
+# later. It is kept in sync on write: mapper events cover ORM writes, and
+# code that writes these tables with bulk statements (seed.generate,
+# jobs.delete_user) calls rebuild() or remove(). Without FTS5 (another
+# database, or an SQLite built without it) search falls back to LIKE
+# queries over the tables themselves, which are correct but scan.
+#
+#   flask --app web_project.app rebuild-search
+import re
+import weakref
+
+import click
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import OperationalError
+
+from web_project.models import db, User, Product, Supplier
+
+KINDS = {'product': (1, Product), 'supplier': (2, Supplier), 'user': (3, User)}
+TOKEN = re.compile(r'\w+', re.UNICODE)
+# Columns whose changes need the row reindexed
+INDEXED = {'product': ('name', 'user_id'), 'supplier': ('name',), 'user': ('username', 'email')}
+
+CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "text, kind, owner, label UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3 4 5 6 7 8')"
+)
+
+# Engines known to have search_index; absence is looked up again each time,
+# because create_all() or rebuild() may add it later
+_indexed_engines = weakref.WeakSet()
+
+
+# ---------- Index Table ----------
+def has_index(connection):
+    if connection.dialect.name != 'sqlite':
+        return False
+    if connection.engine in _indexed_engines:
+        return True
+    found = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'"
+    ).first() is not None
+    if found:
+        _indexed_engines.add(connection.engine)
+    return found
+
+
+def create_index(connection):
+    # Returns False where FTS5 is not available
+    if connection.dialect.name != 'sqlite':
+        return False
+    try:
+        connection.exec_driver_sql(CREATE_INDEX)
+    except OperationalError:  # no such module: fts5
+        return False
+    return True
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _created(metadata, connection, **kw):
+    create_index(connection)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _dropping(metadata, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql("DROP TABLE IF EXISTS search_index")
+        _indexed_engines.discard(connection.engine)
+
+
+def _include_name(name, type_, parent_names):
+    # Keeps Alembic autogenerate from dropping the index and its shadow tables
+    return not (type_ == 'table' and name.startswith('search_index'))
+
+
+# ---------- Sync on Write ----------
+def _fold(text):
+    # remove_diacritics only covers Latin letters; people type е for ё
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def _fold_sql(column):
+    return db.func.replace(db.func.replace(column, 'ё', 'е'), 'Ё', 'Е')
+
+
+def _entry(kind, target):
+    code, _ = KINDS[kind]
+    if kind == 'user':
+        text, owner, label = f'{target.username} {target.email}', '', target.username
+    else:
+        text, owner, label = target.name, str(getattr(target, 'user_id', '') or ''), target.name
+    return {'rowid': target.id * 4 + code, 'text': _fold(text), 'kind': kind, 'owner': owner, 'label': label}
+
+
+def _delete(connection, rowids):
+    connection.exec_driver_sql(
+        "DELETE FROM search_index WHERE rowid = ?", [(rowid,) for rowid in rowids]
+    )
+
+
+def _insert(connection, entries):
+    connection.execute(
+        db.text("INSERT INTO search_index (rowid, text, kind, owner, label) "
+                "VALUES (:rowid, :text, :kind, :owner, :label)"),
+        entries,
+    )
+
+
+def _listen(kind, model):
+    def inserted(mapper, connection, target):
+        if has_index(connection):
+            _insert(connection, [_entry(kind, target)])
+
+    def updated(mapper, connection, target):
+        state = inspect(target)
+        if any(state.attrs[name].history.has_changes() for name in INDEXED[kind]) and has_index(connection):
+            _delete(connection, [target.id * 4 + KINDS[kind][0]])
+            _insert(connection, [_entry(kind, target)])
+
+    def deleted(mapper, connection, target):
+        if has_index(connection):
+            _delete(connection, [target.id * 4 + KINDS[kind][0]])
+
+    event.listen(model, 'after_insert', inserted)
+    event.listen(model, 'after_update', updated)
+    event.listen(model, 'after_delete', deleted)
+
+
+for _kind, (_, _model) in KINDS.items():
+    _listen(_kind, _model)
+
+
+def remove(kind, ids):
+    # For rows deleted with bulk statements, which skip the mapper events
+    connection = db.session.connection()
+    if has_index(connection) and ids:
+        _delete(connection, [item_id * 4 + KINDS[kind][0] for item_id in ids])
+
+
+def rebuild():
+    # Refills the index from the tables with one INSERT ... SELECT per kind
+    connection = db.session.connection()
+    if not create_index(connection):
+        return False
+    connection.exec_driver_sql("DELETE FROM search_index")
+    columns = ['rowid', 'text', 'kind', 'owner', 'label']
+    for kind, (code, model) in KINDS.items():
+        if kind == 'user':
+            text, owner, label = User.username + ' ' + User.email, db.literal(''), User.username
+        else:
+            text, label = model.name, model.name
+            owner = db.cast(Product.user_id, db.String) if kind == 'product' else db.literal('')
+        select = db.select(model.id * 4 + code, _fold_sql(text), db.literal(kind), owner, label)
+        index = db.table('search_index', *[db.column(name) for name in columns])
+        connection.execute(index.insert().from_select(columns, select))
+    connection.exec_driver_sql("INSERT INTO search_index (search_index) VALUES ('optimize')")
+    db.session.commit()
+    return True
+
+
+# ---------- Queries ----------
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _match_expression(text, kinds, owner_id):
+    expression = f'text : {text}'
+    if set(kinds) != set(KINDS):
+        # Each kind is a long posting list; leave them out when all are wanted
+        expression += ' AND kind : ({})'.format(' OR '.join(kinds))
+    if owner_id is not None:
+        expression += f' AND owner : "{owner_id}"'
+    return expression
+
+
+def _fts_search(text, tokens, kinds, owner_id, limit):
+    # Candidates come from three FTS queries, then are ranked by whether the
+    # label starts with the query, then by length:
+    #   exact    text starting with the query's words, ranked inside the
+    #            query so the shortest (an exact label) is always kept
+    #   leading  text starting with the query, last word as a prefix
+    #   match    every word anywhere, as a prefix
+    # The last two stop after SEARCH_CANDIDATES matches, which FTS5 reads
+    # lazily however common the prefix is. Ranking the exact ones reads all
+    # of them, but whole leading words match far fewer rows than a typed
+    # prefix. bm25() is not used: it reads every match of a term.
+    phrase = '"{}"'.format(' '.join(tokens))
+    words = '({})'.format(' '.join(f'"{token}"*' for token in tokens))
+    candidates = "SELECT kind, rowid, label FROM search_index WHERE search_index MATCH :{} {}LIMIT :candidates"
+    rows = db.session.execute(db.text(
+        "SELECT kind, rowid / 4 AS id, label FROM ("
+        f"  SELECT * FROM ({candidates.format('exact', 'ORDER BY length(label), rowid ')})"
+        f"  UNION SELECT * FROM ({candidates.format('leading', '')})"
+        f"  UNION SELECT * FROM ({candidates.format('match', '')})"
+        ") ORDER BY label NOT LIKE :starts ESCAPE '\\', length(label), rowid LIMIT :limit"
+    ), {
+        'exact': _match_expression(f'^{phrase}', kinds, owner_id),
+        'leading': _match_expression(f'^{phrase}*', kinds, owner_id),
+        'match': _match_expression(words, kinds, owner_id),
+        'candidates': max(current_app.config['SEARCH_CANDIDATES'], limit),
+        'starts': _escape_like(text.strip()) + '%',
+        'limit': limit,
+    })
+    return [{'kind': row.kind, 'id': row.id, 'label': row.label} for row in rows]
+
+
+def _like_search(tokens, kinds, owner_id, limit):
+    def contains(column, token):
+        return column.ilike(f'%{_escape_like(token)}%', escape='\\')
+
+    results = []
+    for kind in kinds:
+        _, model = KINDS[kind]
+        if kind == 'user':
+            label, columns = User.username, (User.username, User.email)
+        else:
+            label, columns = model.name, (model.name,)
+        query = db.session.query(model.id, label.label('label'))
+        for token in tokens:
+            query = query.filter(db.or_(*[contains(column, token) for column in columns]))
+        if owner_id is not None:
+            if kind != 'product':
+                continue
+            query = query.filter(Product.user_id == owner_id)
+        for row in query.order_by(db.func.length(label), model.id).limit(limit):
+            results.append({'kind': kind, 'id': row.id, 'label': row.label})
+    results.sort(key=lambda result: len(result['label']))
+    return results[:limit]
+
+
+def search(text, kinds=tuple(KINDS), owner_id=None, limit=10):
+    # Rows whose words start with every word of `text`, best matches first.
+    # owner_id restricts the results to that seller's products.
+    tokens = TOKEN.findall(_fold(text.lower()))[:current_app.config['SEARCH_MAX_TERMS']]
+    if not tokens or not kinds:
+        return []
+    if has_index(db.session.connection()):
+        return _fts_search(text, tokens, kinds, owner_id, limit)
+    return _like_search(tokens, kinds, owner_id, limit)
+
+
+def init_app(app):
+    app.extensions['migrate'].configure_args.setdefault('include_name', _include_name)
+
+    @app.cli.command('rebuild-search')
+    def rebuild_search_command():
+        """Rebuild the full-text search index from the products, suppliers and users tables."""
+        if rebuild():
+            click.echo("Rebuilt the search index.")
+        else:
+            click.echo("FTS5 is not available; search uses LIKE queries instead.")
@@ -0,0 +1,131 @@
+# seed.py
+# Synthetic ERP data for load tests and benchmarks: sellers, products,
+# suppliers, orders and sales at a configurable scale. Product popularity
+# follows a Zipf-like curve, so a few products get most of the sales the way
+# real catalogues do, and sale dates increase with the row id over a span of
+# days ending today. Everything else is derived from one seed, so the same
+# arguments always produce the same rows.
+#
+#   flask --app web_project.app seed-data --sales 1000000 --reset
+import itertools
+import random
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+
+from web_project.models import db, User, Product, Supplier, Sale, Order
+from web_project import rollups, search, stock
+
+CHUNK_SIZE = 50000
+MANAGER_EMAIL = 'manager@example.com'
+PASSWORD = 'password'
+
+
+def seller_email(number):
+    return f'seller{number}@example.com'
+
+
+def _insert(table, rows):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.session.execute(table.insert(), rows[start:start + CHUNK_SIZE])
+    db.session.commit()
+
+
+def generate(sales, products=None, sellers=None, suppliers_per_product=2, orders=None,
+             skew=1.1, days=365, seed=1, echo=None):
+    # Defaults scale with the number of sales: 10M sales -> 10k products,
+    # 500 sellers and 100k orders
+    products = products or max(100, sales // 1000)
+    sellers = sellers or max(10, products // 20)
+    orders = orders if orders is not None else max(100, sales // 100)
+    echo = echo or (lambda message: None)
+    rng = random.Random(seed)
+    password = current_app.extensions['passwords'].hash(PASSWORD)
+
+    _insert(User.__table__, [dict(username='manager', email=MANAGER_EMAIL, password=password,
+                                  role='manager', is_active=True)] + [
+        dict(username=f'seller {number}', email=seller_email(number), password=password,
+             role='user', is_active=True)
+        for number in range(1, sellers + 1)
+    ])
+    seller_ids = [user_id for (user_id,) in db.session.query(User.id).filter(User.role == 'user').order_by(User.id)]
+    echo(f"{len(seller_ids)} sellers")
+
+    _insert(Product.__table__, [
+        dict(name=f'product {number}', price=round(rng.lognormvariate(3, 1), 2) + 0.01,
+             stock=rng.randint(0, 500), user_id=rng.choice(seller_ids))
+        for number in range(1, products + 1)
+    ])
+    catalogue = db.session.query(Product.id, Product.price, Product.user_id).order_by(Product.id).all()
+    echo(f"{len(catalogue)} products")
+    echo(f"{stock.open_balances()} opening stock balances")
+
+    _insert(Supplier.__table__, [
+        dict(name=f'supplier {product.id}-{number}', product_id=product.id, quantity=rng.randint(10, 1000),
+             price=round(product.price * rng.uniform(0.5, 0.9), 2), delivery_time=rng.randint(1, 30))
+        for product in catalogue
+        for number in range(1, suppliers_per_product + 1)
+    ])
+    suppliers = {}
+    for supplier_id, product_id in db.session.query(Supplier.id, Supplier.product_id):
+        suppliers.setdefault(product_id, []).append(supplier_id)
+    echo(f"{sum(map(len, suppliers.values()))} suppliers")
+
+    # Rank products by popularity in a random order, so popular ones are not
+    # simply the lowest ids
+    ranked = list(catalogue)
+    rng.shuffle(ranked)
+    cum_weights = list(itertools.accumulate(1 / rank ** skew for rank in range(1, len(ranked) + 1)))
+
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(days=days)
+    step = days * 86400 / max(sales, 1)
+    for chunk_start in range(0, sales, CHUNK_SIZE):
+        count = min(CHUNK_SIZE, sales - chunk_start)
+        rows = []
+        for offset, product in enumerate(rng.choices(ranked, cum_weights=cum_weights, k=count)):
+            quantity = rng.randint(1, 5)
+            rows.append(dict(
+                product_id=product.id, quantity=quantity, total_price=round(product.price * quantity, 2),
+                sale_date=start + timedelta(seconds=(chunk_start + offset) * step), user_id=product.user_id,
+            ))
+        db.session.execute(Sale.__table__.insert(), rows)
+        db.session.commit()
+        echo(f"{chunk_start + count} sales")
+
+    order_rows = []
+    for product in rng.choices(ranked, cum_weights=cum_weights, k=orders):
+        order_rows.append(dict(
+            user_id=rng.choice(seller_ids), product_id=product.id, supplier_id=rng.choice(suppliers[product.id]),
+            quantity=rng.randint(10, 200), status=rng.choices(('pending', 'approved', 'rejected'), (2, 7, 1))[0],
+        ))
+    _insert(Order.__table__, order_rows)
+    echo(f"{len(order_rows)} orders")
+
+    # Everything was inserted with Core, past the mapper events that keep the
+    # rollups and the search index current
+    rollups.rebuild()
+    echo("rollups rebuilt")
+    if search.rebuild():
+        echo("search index rebuilt")
+
+
+def init_app(app):
+    @app.cli.command('seed-data')
+    @click.option('--sales', type=int, default=100000, show_default=True)
+    @click.option('--products', type=int, default=None, help="Default: sales / 1000, at least 100.")
+    @click.option('--sellers', type=int, default=None, help="Default: products / 20, at least 10.")
+    @click.option('--orders', type=int, default=None, help="Default: sales / 100, at least 100.")
+    @click.option('--skew', type=float, default=1.1, show_default=True, help="Zipf exponent of product popularity.")
+    @click.option('--days', type=int, default=365, show_default=True, help="Span of sale dates, ending today.")
+    @click.option('--seed', type=int, default=1, show_default=True)
+    @click.option('--reset', is_flag=True, help="Drop and recreate all tables first.")
+    def seed_data_command(sales, products, sellers, orders, skew, days, seed, reset):
+        """Fill the database with synthetic users, products, suppliers, orders and sales."""
+        if reset:
+            db.drop_all()
+        db.create_all()
+        if db.session.query(User.id).first() is not None:
+            raise click.ClickException("The database already has data; pass --reset to replace it.")
+        generate(sales, products, sellers, orders=orders, skew=skew, days=days, seed=seed, echo=click.echo)
+        click.echo(f"Seeded. Log in as {MANAGER_EMAIL} or {seller_email(1)} with password '{PASSWORD}'.")
@@ -12,3 +12,177 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 });
+
+// Header checkbox of a bulk table: (un)checks every row bound to its form
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('.select-all').forEach(function(toggle) {
+        toggle.addEventListener('change', function() {
+            const rows = document.querySelectorAll('input[type="checkbox"][form="' + toggle.dataset.form + '"]');
+            rows.forEach(function(row) {
+                row.checked = toggle.checked;
+            });
+        });
+    });
+});
+
+// Typeahead: fills the input's datalist from a search endpoint as the user
+// types, and puts the picked match's id into the hidden field data-target
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('input[data-typeahead]').forEach(function(input) {
+        const list = document.getElementById(input.getAttribute('list'));
+        const target = document.getElementById(input.dataset.target);
+        let timer = null;
+        let latest = 0;
+
+        input.addEventListener('input', function() {
+            const picked = Array.from(list.options).find(function(option) {
+                return option.value === input.value;
+            });
+            target.value = picked ? picked.dataset.id : '';
+            if (picked) {
+                return;
+            }
+            clearTimeout(timer);
+            timer = setTimeout(function() {
+                const request = ++latest;
+                fetch(input.dataset.typeahead + '&q=' + encodeURIComponent(input.value))
+                    .then(function(response) { return response.json(); })
+                    .then(function(data) {
+                        if (request !== latest) {
+                            return;  // a newer query is on its way
+                        }
+                        list.innerHTML = '';
+                        data.results.forEach(function(result) {
+                            const option = document.createElement('option');
+                            option.value = result.label + ' (#' + result.id + ')';
+                            option.dataset.id = result.id;
+                            list.appendChild(option);
+                        });
+                    });
+            }, 150);
+        });
+    });
+});
+
+// Live updates (live.py): applies the changes /live pushes to the tables
+// of the page, so it does not have to be reloaded. When the server has no
+// stream free (503), the page asks for the changes once every few seconds
+// instead and tries to stream again after each check.
+document.addEventListener('DOMContentLoaded', function() {
+    const live = document.querySelector('[data-live]');
+    if (!live || !window.EventSource || !window.fetch) {
+        return;
+    }
+    const url = new URL(live.dataset.live, window.location.href);
+    let cursor = url.searchParams.get('after');
+
+    function parseRow(html) {
+        const body = document.createElement('tbody');
+        body.innerHTML = html.trim();
+        return body.firstElementChild;
+    }
+
+    const handlers = {
+        sale: function(sale) {
+            const table = document.querySelector('tbody[data-live-sales]');
+            if (!table || table.querySelector('tr[data-sale-id="' + sale.id + '"]')) {
+                return;
+            }
+            table.insertBefore(parseRow(sale.html), table.firstElementChild);
+            while (table.rows.length > Number(table.dataset.liveSales)) {
+                table.deleteRow(-1);
+            }
+        },
+        stock: function(levels) {
+            Object.keys(levels).forEach(function(productId) {
+                document.querySelectorAll('[data-stock-product="' + productId + '"]').forEach(function(cell) {
+                    cell.textContent = levels[productId];
+                });
+            });
+        },
+        order: function(order) {
+            const table = document.querySelector('tbody[data-live-orders]');
+            if (!table) {
+                return;
+            }
+            const row = table.querySelector('tr[data-order-id="' + order.id + '"]');
+            if (!order.html) {
+                // Approved or rejected: no longer waiting for a decision
+                if (row) {
+                    row.remove();
+                }
+            } else if (row) {
+                row.replaceWith(parseRow(order.html));
+            } else if (table.dataset.liveOrders === 'append') {
+                table.appendChild(parseRow(order.html));
+            }
+        },
+        reload: function() {
+            window.location.reload();
+        },
+        cursor: function() {},
+    };
+
+    function withCursor(once) {
+        url.searchParams.set('after', cursor);
+        url.searchParams.delete('once');
+        if (once) {
+            url.searchParams.set('once', '1');
+        }
+        return url.toString();
+    }
+
+    function stream() {
+        const source = new EventSource(withCursor(false));
+        Object.keys(handlers).forEach(function(kind) {
+            source.addEventListener(kind, function(event) {
+                if (event.lastEventId) {
+                    cursor = event.lastEventId;
+                }
+                if (kind === 'reload') {
+                    source.close();
+                }
+                handlers[kind](JSON.parse(event.data));
+            });
+        });
+        source.addEventListener('error', function() {
+            // The browser reconnects by itself unless the server refused
+            if (source.readyState === EventSource.CLOSED) {
+                setTimeout(poll, 1000);
+            }
+        });
+    }
+
+    function poll() {
+        // The same events as the stream, as text/event-stream, then a retry delay
+        fetch(withCursor(true))
+            .then(function(response) { return response.ok ? response.text() : ''; })
+            .then(function(text) {
+                let retry = 15000;
+                text.split('\n\n').forEach(function(block) {
+                    let kind = 'message';
+                    let data = null;
+                    block.split('\n').forEach(function(line) {
+                        const colon = line.indexOf(':');
+                        if (colon <= 0) {
+                            return;  // blank or a comment
+                        }
+                        const value = line.slice(colon + 1).replace(/^ /, '');
+                        switch (line.slice(0, colon)) {
+                            case 'event': kind = value; break;
+                            case 'data': data = value; break;
+                            case 'id': cursor = value; break;
+                            case 'retry': retry = Number(value); break;
+                        }
+                    });
+                    if (data !== null && handlers[kind]) {
+                        handlers[kind](JSON.parse(data));
+                    }
+                });
+                setTimeout(stream, retry);
+            })
+            .catch(function() { setTimeout(poll, 15000); });
+    }
+
+    stream();
+});
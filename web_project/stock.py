@@ -0,0 +1,390 @@
+# stock.py
+# Stock as an append-only ledger. Every change is a StockMovement: a sale
+# (negative), the receipt of an approved supplier Order, or an adjustment
+# (opening balances, new products, counts). Writers only insert movements,
+# so concurrent sales no longer rewrite one hot Product row each.
+#
+# compact() sums the movements recorded since the last compaction into the
+# per-location StockSnapshot rows and into Product.stock, the total over all
+# locations, and records the last movement it summed as the watermark. Every
+# worker's job thread compacts, so runs overlap: each claims its movements by
+# writing the new watermark first, only if the watermark is still the one it
+# read, and gives up if another run got there before it. The
+# current stock is the stored balance plus the movements after the
+# watermark, which is one index range over (product_id, id) holding at most
+# STOCK_COMPACT_INTERVAL seconds of movements; Product.on_hand is that sum
+# for the total. Filters and sorts use Product.stock, which lags by the same
+# interval. Movements are never updated or deleted (except with their
+# product), so `flask reconcile-stock` can check every balance against them.
+#
+# A sale must not take units that are not there: its movement goes in, and
+# if the balance is then negative the transaction rolls back. Sales of one
+# product at one location take turns between the two. On SQLite the INSERT
+# takes the database write lock before anything is read, so nothing needs
+# locking; on Postgres an advisory lock per product and location does it
+# without writing any row. Lock timeouts are retried with jittered
+# exponential backoff, a bounded number of times.
+import random
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import click
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+
+from web_project.database import upsert
+from web_project.models import (db, Product, Sale, Order, Location, StockMovement, StockSnapshot, StockCompaction,
+                                stock_watermark)
+
+# Postgres serialization_failure, deadlock_detected, lock_not_available
+PG_LOCK_ERRORS = {'40001', '40P01', '55P03'}
+
+
+class StockError(Exception):
+    pass
+
+
+class ProductNotFound(StockError):
+    pass
+
+
+class LocationNotFound(StockError):
+    pass
+
+
+class OutOfStock(StockError):
+    pass
+
+
+class StockBusy(StockError):
+    pass
+
+
+def is_lock_error(error):
+    pgcode = getattr(error.orig, 'pgcode', None)
+    if pgcode is not None:
+        return pgcode in PG_LOCK_ERRORS
+    return 'locked' in str(error.orig).lower()
+
+
+def with_retry(operation):
+    # Runs `operation` as a whole transaction, rolling back and retrying it
+    # when the database reports lock contention.
+    attempts = current_app.config['STOCK_RETRY_ATTEMPTS']
+    backoff = current_app.config['STOCK_RETRY_BACKOFF']
+    for attempt in range(attempts):
+        try:
+            return operation()
+        except OperationalError as error:
+            db.session.rollback()
+            if not is_lock_error(error):
+                raise
+            if attempt == attempts - 1:
+                raise StockBusy() from error
+            time.sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+def default_location():
+    return current_app.config['STOCK_DEFAULT_LOCATION']
+
+
+# ---------- Reading ----------
+def _pending(*where):
+    return (db.select(db.func.coalesce(db.func.sum(StockMovement.quantity), 0))
+            .where(StockMovement.id > stock_watermark(), *where)
+            .scalar_subquery())
+
+
+def on_hand(product_id, location_id):
+    # Units of one product at one location, including this transaction's movements
+    snapshot = (db.select(StockSnapshot.quantity)
+                .where(StockSnapshot.product_id == product_id, StockSnapshot.location_id == location_id)
+                .scalar_subquery())
+    pending = _pending(StockMovement.product_id == product_id, StockMovement.location_id == location_id)
+    return db.session.query(db.func.coalesce(snapshot, 0) + pending).scalar()
+
+
+def levels(product_ids):
+    # {product_id: {location_id: units}} for the locations each product has
+    # been stocked at
+    product_ids = list(product_ids)
+    result = defaultdict(lambda: defaultdict(int))
+    for product_id, location_id, quantity in (
+            db.session.query(StockSnapshot.product_id, StockSnapshot.location_id, StockSnapshot.quantity)
+            .filter(StockSnapshot.product_id.in_(product_ids))):
+        result[product_id][location_id] += quantity
+    for product_id, location_id, quantity in (
+            db.session.query(StockMovement.product_id, StockMovement.location_id, db.func.sum(StockMovement.quantity))
+            .filter(StockMovement.product_id.in_(product_ids), StockMovement.id > stock_watermark())
+            .group_by(StockMovement.product_id, StockMovement.location_id)):
+        result[product_id][location_id] += quantity
+    return {product_id: dict(locations) for product_id, locations in result.items()}
+
+
+# ---------- Writing ----------
+def lock(keys):
+    # Makes other transactions that lock any of these (product_id,
+    # location_id) keys wait until this one ends. Sorted, so two batches
+    # cannot each hold a key the other is waiting for.
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        for product_id, location_id in sorted(keys):
+            connection.execute(db.text('SELECT pg_advisory_xact_lock(:product_id, :location_id)'),
+                               {'product_id': product_id, 'location_id': location_id})
+    elif connection.dialect.name != 'sqlite':
+        for product_id, location_id in sorted(keys):
+            (db.session.query(StockSnapshot.product_id)
+             .filter(StockSnapshot.product_id == product_id, StockSnapshot.location_id == location_id)
+             .with_for_update()
+             .all())
+
+
+def record(movements):
+    # Adds movements (dicts of StockMovement columns) to the current transaction
+    now = datetime.utcnow()
+    db.session.execute(StockMovement.__table__.insert(), [dict(created_at=now, **movement) for movement in movements])
+
+
+def reserve(product_id, quantity, location_id, user_id):
+    # Records the sale's movement in the current transaction and returns the
+    # unit price. The movement is inserted from a SELECT of the product and
+    # location, so it is the first statement (SQLite's write lock is taken
+    # before anything is read) and inserts nothing if either does not exist.
+    lock([(product_id, location_id)])
+    movement = db.select(
+        Product.id, Location.id, db.literal(-quantity), db.literal('sale'), db.literal(user_id),
+        db.literal(datetime.utcnow()),
+    ).select_from(
+        # One row of each by primary key, so the cross join is one row or none
+        Product.__table__.join(Location.__table__, db.true())
+    ).where(Product.id == product_id, Location.id == location_id)
+    inserted = db.session.execute(StockMovement.__table__.insert().from_select(
+        ['product_id', 'location_id', 'quantity', 'kind', 'user_id', 'created_at'], movement,
+    ))
+    if not inserted.rowcount:
+        if db.session.get(Location, location_id) is None:
+            raise LocationNotFound()
+        raise ProductNotFound()
+    if on_hand(product_id, location_id) < 0:
+        raise OutOfStock()
+    return db.session.query(Product.price).filter(Product.id == product_id).scalar()
+
+
+def sell(product_id, quantity, user_id, location_id=None):
+    try:
+        product_id = int(product_id)
+        location_id = int(location_id) if location_id is not None else default_location()
+    except (TypeError, ValueError):
+        raise ProductNotFound()
+
+    def operation():
+        try:
+            price = reserve(product_id, quantity, location_id, user_id)
+        except StockError:
+            db.session.rollback()
+            raise
+        sale = Sale(product_id=product_id, quantity=quantity, total_price=price * quantity, user_id=user_id)
+        db.session.add(sale)
+        db.session.commit()
+        return sale
+
+    return with_retry(operation)
+
+
+def adjust(product_id, quantity, location_id=None, user_id=None, note=None):
+    # Adds (or, when negative, removes) units in the current transaction;
+    # the caller commits. Refuses to leave a negative balance.
+    location_id = location_id or default_location()
+    lock([(product_id, location_id)])
+    record([dict(product_id=product_id, location_id=location_id, quantity=quantity, kind='adjustment',
+                 user_id=user_id, note=note)])
+    if quantity < 0 and on_hand(product_id, location_id) < 0:
+        raise OutOfStock()
+
+
+def receive(order_ids, location_id=None):
+    # Receipts for the approved orders among `order_ids`, at one location,
+    # in the current transaction. An order already received is skipped (and
+    # the unique index on order_id would refuse it anyway), so running this
+    # again after a partial run is safe.
+    location_id = location_id or default_location()
+    orders = (db.session.query(Order.id, Order.product_id, Order.quantity)
+              .filter(Order.id.in_(order_ids), Order.status == 'approved',
+                      ~db.exists().where(StockMovement.order_id == Order.id))
+              .all())
+    if orders:
+        record([dict(product_id=product_id, location_id=location_id, quantity=quantity, kind='receipt',
+                     order_id=order_id) for order_id, product_id, quantity in orders])
+    return {'orders': len(orders), 'products': len({product_id for _, product_id, _ in orders})}
+
+
+# ---------- Compaction ----------
+def compact():
+    # Sums the movements after the watermark into the snapshots and
+    # Product.stock and moves the watermark past them. Returns how many
+    # movements it summed.
+    def operation():
+        connection = db.session.connection()
+        if connection.dialect.name == 'postgresql':
+            # Waits for the transactions still inserting movements (their ids
+            # may be below the ones already committed) and holds off new ones
+            # until this commits
+            connection.execute(db.text('LOCK TABLE stock_movement IN SHARE ROW EXCLUSIVE MODE'))
+        watermark = db.session.query(stock_watermark()).scalar()
+        latest = db.session.query(db.func.max(StockMovement.id)).scalar()
+        if latest is None or latest <= watermark:
+            db.session.commit()
+            return 0
+
+        deltas = (db.session.query(StockMovement.product_id, StockMovement.location_id,
+                                   db.func.sum(StockMovement.quantity), db.func.count(StockMovement.id))
+                  .filter(StockMovement.id > watermark, StockMovement.id <= latest)
+                  .group_by(StockMovement.product_id, StockMovement.location_id)
+                  .all())
+        movements = sum(count for *_, count in deltas)
+        now = datetime.utcnow()
+
+        # The first write, so on SQLite it takes the write lock, and the
+        # watermark it compares is the committed one
+        claimed = connection.execute(StockCompaction.__table__.insert().from_select(
+            ['movement_id', 'movements', 'compacted_at'],
+            db.select(db.literal(latest), db.literal(movements), db.literal(now))
+            .where(stock_watermark() == watermark),
+        )).rowcount
+        if not claimed:
+            # Another compaction summed these movements since we read the watermark
+            db.session.rollback()
+            return 0
+
+        upsert(connection, StockSnapshot.__table__, ['product_id', 'location_id'], [
+            dict(product_id=product_id, location_id=location_id, quantity=quantity, updated_at=now)
+            for product_id, location_id, quantity, _ in deltas
+        ], add=('quantity',), replace=('updated_at',))
+
+        totals = defaultdict(int)
+        for product_id, _, quantity, _ in deltas:
+            totals[product_id] += quantity
+        changed = [{'b_product_id': product_id, 'b_quantity': quantity}
+                   for product_id, quantity in totals.items() if quantity]
+        if changed:
+            # Also bumps updated_at, so API delta syncs pick up the new stock
+            product = Product.__table__
+            connection.execute(
+                product.update()
+                .where(product.c.id == db.bindparam('b_product_id'))
+                .values(stock=product.c.stock + db.bindparam('b_quantity')),
+                changed,
+            )
+        db.session.commit()
+        return movements
+
+    return with_retry(operation)
+
+
+def open_balances(location_id=None):
+    # Opening adjustments and snapshots for products whose stock is not in
+    # the ledger yet because their rows were inserted directly (seed.py),
+    # then a watermark past them so they are not summed twice
+    location_id = location_id or default_location()
+    compact()
+    product = Product.__table__
+    untracked = (db.select(product.c.id, db.literal(location_id), product.c.stock, db.literal('adjustment'),
+                           db.literal('opening balance'), db.literal(datetime.utcnow()))
+                 .where(product.c.stock != 0,
+                        ~db.exists().where(StockMovement.product_id == product.c.id),
+                        ~db.exists().where(StockSnapshot.product_id == product.c.id)))
+    movement = StockMovement.__table__
+    opened = db.session.execute(movement.insert().from_select(
+        ['product_id', 'location_id', 'quantity', 'kind', 'note', 'created_at'], untracked,
+    )).rowcount
+    if opened:
+        watermark = db.session.query(stock_watermark()).scalar()
+        db.session.execute(StockSnapshot.__table__.insert().from_select(
+            ['product_id', 'location_id', 'quantity', 'updated_at'],
+            db.select(movement.c.product_id, movement.c.location_id, movement.c.quantity, movement.c.created_at)
+            .where(movement.c.id > watermark),
+        ))
+        latest = db.session.query(db.func.max(StockMovement.id)).scalar()
+        db.session.add(StockCompaction(movement_id=latest, movements=opened))
+    db.session.commit()
+    return opened
+
+
+def reconcile():
+    # Every stored balance checked against the ledger: each snapshot against
+    # the sum of its movements up to the watermark, each Product.stock
+    # against its snapshots. Returns the differences.
+    watermark = db.session.query(stock_watermark()).scalar()
+    ledger = defaultdict(int)
+    for product_id, location_id, quantity in (
+            db.session.query(StockMovement.product_id, StockMovement.location_id, db.func.sum(StockMovement.quantity))
+            .filter(StockMovement.id <= watermark)
+            .group_by(StockMovement.product_id, StockMovement.location_id)):
+        ledger[product_id, location_id] = quantity
+    snapshots = {(product_id, location_id): quantity for product_id, location_id, quantity in
+                 db.session.query(StockSnapshot.product_id, StockSnapshot.location_id, StockSnapshot.quantity)}
+
+    problems = []
+    for key in sorted(set(ledger) | set(snapshots)):
+        if ledger.get(key, 0) != snapshots.get(key, 0):
+            problems.append({'product_id': key[0], 'location_id': key[1],
+                             'snapshot': snapshots.get(key, 0), 'ledger': ledger.get(key, 0)})
+
+    totals = defaultdict(int)
+    for (product_id, _), quantity in snapshots.items():
+        totals[product_id] += quantity
+    for product_id, stock in db.session.query(Product.id, Product.stock):
+        if stock != totals.get(product_id, 0):
+            problems.append({'product_id': product_id, 'location_id': None,
+                             'snapshot': totals.get(product_id, 0), 'product_stock': stock})
+    return problems
+
+
+# ---------- CLI ----------
+def init_app(app):
+    @app.cli.command('compact-stock')
+    def compact_stock_command():
+        """Sum new stock movements into the stock snapshots."""
+        click.echo(f"Compacted {compact()} stock movements.")
+
+    @app.cli.command('reconcile-stock')
+    def reconcile_stock_command():
+        """Check every stock balance against the movement ledger."""
+        compact()
+        problems = reconcile()
+        for problem in problems:
+            click.echo(' '.join(f"{name}={value}" for name, value in problem.items()), err=True)
+        if problems:
+            raise click.ClickException(f"{len(problems)} balances differ from the ledger.")
+        click.echo("All stock balances match the ledger.")
+
+    # ignore_unknown_options lets QUANTITY be negative instead of an option
+    @app.cli.command('adjust-stock', context_settings={'ignore_unknown_options': True})
+    @click.argument('product_id', type=int)
+    @click.argument('quantity', type=int)
+    @click.option('--location', 'location_id', type=int, help="Default: STOCK_DEFAULT_LOCATION.")
+    @click.option('--note', help="Why, e.g. 'count 2026-10-01' or 'damaged'.")
+    def adjust_stock_command(product_id, quantity, location_id, note):
+        """Add (or with a negative QUANTITY, remove) units of a product."""
+        if db.session.get(Product, product_id) is None:
+            raise click.ClickException(f"No product {product_id}")
+        location_id = location_id or default_location()
+        if db.session.get(Location, location_id) is None:
+            raise click.ClickException(f"No location {location_id}")
+        try:
+            adjust(product_id, quantity, location_id, note=note)
+        except OutOfStock:
+            raise click.ClickException("Not enough stock to remove that many.")
+        db.session.commit()
+        click.echo(f"Product {product_id} at location {location_id}: {quantity:+d}, "
+                   f"now {on_hand(product_id, location_id)}.")
+
+    @app.cli.command('add-location')
+    @click.argument('name')
+    def add_location_command(name):
+        """Add a stock location (warehouse, store)."""
+        location = Location(name=name)
+        db.session.add(location)
+        db.session.commit()
+        click.echo(f"Added location {location.id}: {name}.")
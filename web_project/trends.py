@@ -0,0 +1,217 @@
+# trends.py
+# Sales trends for the analytics page: daily and weekly revenue with
+# trailing moving averages, a weekday seasonality profile per product and a
+# TREND_FORECAST_DAYS demand forecast, all for one date range of at most
+# TREND_MAX_DAYS days.
+#
+# The inputs are the daily rollups (rollups.py), read as columns: one row per
+# day from daily_sales and one per product per day sold from
+# daily_product_sales. The rows are read straight off the DBAPI cursor into
+# NumPy arrays, since building a Row object per row costs more than all of
+# the maths, and every per-product figure is a bincount over those arrays
+# rather than a Python loop.
+#
+# Forecast, per product:
+#   1. seasonality: units sold per Monday, Tuesday, ... relative to the
+#      product's average day, shrunk towards the profile of all products by
+#      TREND_SEASONALITY_PRIOR units so a product with a handful of sales
+#      does not get a seven-day cycle out of noise
+#   2. a least-squares line through the deseasonalized daily units, days
+#      without sales counting as zero, weighted by recency with a half-life
+#      of DEMAND_HALF_LIFE_DAYS
+#   3. the line continued past the end of the range, times the weekday
+#      factors, floored at zero
+#
+# With SHARED_CACHE_PATH, results are cached per range and data version of
+# the rollups they read, so a sale makes the next request recompute them.
+# Without it they are computed on every request: the data versions of one
+# process do not move on another worker's sales.
+import itertools
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from flask import current_app
+
+from web_project.models import db, Product, DailySales, DailyProductSales
+from web_project.cache import shared_cache
+from web_project.pagecache import table_versions
+
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+TABLES = ('daily_sales', 'daily_product_sales', 'product')
+
+
+class RangeTooLong(ValueError):
+    pass
+
+
+# ---------- Extract ----------
+def _day_number(connection, column, start):
+    # Days since `start`, computed by the database so only integers travel
+    if connection.dialect.name == 'sqlite':
+        return db.cast(db.func.julianday(column) - db.func.julianday(start), db.Integer)
+    return column - start  # date - date is an integer number of days on PostgreSQL
+
+
+def _columns(connection, statement, dtypes):
+    # One array per selected column. The values are numbers, which a float64
+    # holds exactly up to 2**53.
+    result = connection.execute(statement)
+    try:
+        rows = result.cursor.fetchall()
+    finally:
+        result.close()
+    flat = np.fromiter(itertools.chain.from_iterable(rows), np.float64, len(rows) * len(dtypes))
+    table = flat.reshape(len(rows), len(dtypes))
+    return [table[:, i].astype(dtype) for i, dtype in enumerate(dtypes)]
+
+
+def _extract(start, end):
+    connection = db.session.connection()
+    days = _columns(connection, db.select(
+        _day_number(connection, DailySales.day, start), DailySales.quantity, DailySales.total_price,
+    ).where(DailySales.day.between(start, end)), (np.int64, np.float64, np.float64))
+    products = _columns(connection, db.select(
+        _day_number(connection, DailyProductSales.day, start), DailyProductSales.product_id,
+        DailyProductSales.quantity,
+    ).where(DailyProductSales.day.between(start, end)), (np.int64, np.int64, np.float64))
+    return days, products
+
+
+# ---------- Series ----------
+def moving_average(series, window):
+    # Trailing mean; the first window - 1 days average the days so far
+    cumulative = np.concatenate(([0.0], np.cumsum(series)))
+    ends = np.arange(1, len(series) + 1)
+    starts = np.maximum(ends - window, 0)
+    return (cumulative[ends] - cumulative[starts]) / (ends - starts)
+
+
+def _weekly(start, n_days, quantity, revenue):
+    # Calendar weeks from Monday; the first and last may be partial
+    week = (np.arange(n_days) + start.weekday()) // 7
+    day_counts = np.bincount(week)
+    quantities = np.bincount(week, weights=quantity)
+    revenues = np.bincount(week, weights=revenue)
+    monday = start - timedelta(days=start.weekday())
+    weeks = []
+    for number, (days, units, total) in enumerate(zip(day_counts, quantities, revenues)):
+        change = None
+        if number and day_counts[number - 1] == 7 and days == 7 and revenues[number - 1] > 0:
+            change = float(total / revenues[number - 1] - 1)
+        weeks.append({'week': (monday + timedelta(weeks=number)).isoformat(), 'days': int(days),
+                      'quantity': int(units), 'revenue': float(total), 'change': change})
+    return weeks
+
+
+# ---------- Seasonality & Forecast ----------
+def seasonality(start, n_days, day, index, quantity, groups):
+    # (groups, 7) weekday factors averaging 1; all ones under two weeks of data
+    if n_days < 14:
+        return np.ones((groups, 7))
+    weekday = (day + start.weekday()) % 7
+    sold = np.bincount(index * 7 + weekday, weights=quantity, minlength=groups * 7).reshape(groups, 7)
+    occurrences = np.bincount((np.arange(n_days) + start.weekday()) % 7, minlength=7)
+    rate = sold / occurrences
+    overall = rate.sum(axis=0)
+    overall = overall / overall.mean() if overall.any() else np.ones(7)
+    means = rate.mean(axis=1, keepdims=True)
+    own = np.divide(rate, means, out=np.ones_like(rate), where=means > 0)
+    totals = sold.sum(axis=1, keepdims=True)
+    prior = current_app.config['TREND_SEASONALITY_PRIOR']
+    return (totals * own + prior * overall) / (totals + prior)
+
+
+def trend_lines(n_days, day, index, quantity, groups, half_life):
+    # Intercept and slope per group of a recency-weighted least-squares line
+    # through its daily series. Days without rows are zeros, which only add
+    # to the weight sums, and those are the same for every group.
+    t = np.arange(n_days)
+    w = 0.5 ** ((n_days - 1 - t) / half_life)
+    sw, swt, swtt = w.sum(), w @ t, w @ (t * t)
+    weighted = w[day] * quantity
+    swq = np.bincount(index, weights=weighted, minlength=groups)
+    swtq = np.bincount(index, weights=weighted * day, minlength=groups)
+    det = sw * swtt - swt * swt
+    slope = (sw * swtq - swt * swq) / det if det > 0 else np.zeros(groups)
+    return (swq - slope * swt) / sw, slope
+
+
+def forecast(start, n_days, day, product_ids, quantity, horizon):
+    # Per product: ids, weekday factors, current daily level, slope and a
+    # (products, horizon) array of forecast units
+    config = current_app.config
+    ids, index = np.unique(product_ids, return_inverse=True)
+    factors = seasonality(start, n_days, day, index, quantity, len(ids))
+    deseasonalized = quantity / factors[index, (day + start.weekday()) % 7]
+    intercept, slope = trend_lines(n_days, day, index, deseasonalized, len(ids), config['DEMAND_HALF_LIFE_DAYS'])
+
+    future = n_days + np.arange(horizon)
+    line = np.maximum(intercept[:, None] + slope[:, None] * future, 0)
+    units = line * factors[:, (future + start.weekday()) % 7]
+    level = np.maximum(intercept + slope * (n_days - 1), 0)
+    return ids, factors, level, slope, units
+
+
+# ---------- Trends ----------
+def compute(start, end):
+    config = current_app.config
+    n_days = (end - start).days + 1
+    (day, day_quantity, day_revenue), (sale_day, product_ids, quantity) = _extract(start, end)
+    quantity_series = np.bincount(day, weights=day_quantity, minlength=n_days)
+    revenue_series = np.bincount(day, weights=day_revenue, minlength=n_days)
+
+    windows = config['TREND_MOVING_AVERAGES']
+    averages = [moving_average(revenue_series, window) for window in windows]
+    days = [{'day': (start + timedelta(days=number)).isoformat(), 'quantity': int(quantity_series[number]),
+             'revenue': float(revenue_series[number]), 'averages': [float(a[number]) for a in averages]}
+            for number in range(n_days)]
+
+    # No forecast past the last day a date can hold
+    horizon = min(config['TREND_FORECAST_DAYS'], (date.max - end).days)
+    ids, factors, level, slope, units = forecast(start, n_days, sale_day, product_ids, quantity, horizon)
+    totals = units.sum(axis=1)
+    top = min(config['TREND_TOP_PRODUCTS'], len(ids))
+    best = np.argpartition(-totals, top - 1)[:top] if top else np.array([], dtype=np.int64)
+    best = best[np.lexsort((ids[best], -totals[best]))]
+    best = best[totals[best] > 0]
+    names = dict(db.session.query(Product.id, Product.name).filter(Product.id.in_(ids[best].tolist())))
+    products = [{
+        'id': int(ids[i]), 'name': names.get(int(ids[i])), 'forecast': float(totals[i]),
+        'velocity': float(level[i]), 'trend': float(slope[i]),
+        'seasonality': factors[i].round(3).tolist(), 'peak_weekday': WEEKDAYS[int(factors[i].argmax())],
+    } for i in best]
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'windows': list(windows),
+        'days': days,
+        'weeks': _weekly(start, n_days, quantity_series, revenue_series),
+        'forecast': [{'day': (end + timedelta(days=number + 1)).isoformat(), 'quantity': float(value)}
+                     for number, value in enumerate(units.sum(axis=0))],
+        'products': products,
+    }
+
+
+def trends(start=None, end=None):
+    # Trends for start..end inclusive (dates); the range defaults to the
+    # TREND_DAYS days up to yesterday, as today's sales are still coming in
+    # and would pull every trend down. None for an empty range, RangeTooLong
+    # for one of more than TREND_MAX_DAYS days.
+    config = current_app.config
+    end = end or datetime.utcnow().date() - timedelta(days=1)
+    start = start or end - timedelta(days=min(config['TREND_DAYS'] - 1, (end - date.min).days))
+    if start > end:
+        return None
+    if (end - start).days >= config['TREND_MAX_DAYS']:
+        raise RangeTooLong()
+
+    cache = shared_cache(current_app._get_current_object())
+    if cache is None:
+        return compute(start, end)
+    key = f'trends:{start}:{end}:{table_versions(TABLES)}'
+    result = cache.get(key)
+    if result is None:
+        result = compute(start, end)
+        cache.set(key, result, config['TREND_CACHE_TTL'])
+    return result
@@ -0,0 +1,693 @@
+# views.py
+# The routes, in one blueprint ("main") that create_app() registers.
+import json
+import math
+from datetime import datetime
+
+from flask import (Blueprint, Response, abort, current_app, flash, jsonify, make_response, redirect, render_template,
+                   request, send_from_directory, url_for)
+from flask_login import current_user, login_required, login_user, logout_user
+
+from web_project import api, bulk, export, ingest, instrumentation, jobs, live, queries, rollups, search, stock, trends
+from web_project.database import read_replica
+from web_project.forms import RegistrationForm, LoginForm, AddProductForm, AddSupplierForm, FilterSalesForm
+from web_project.models import db, User, Product, Supplier, Job
+from web_project.pagecache import cached_page
+from web_project.pagination import paginate
+from web_project.passwords import HashingBusy
+from web_project.querycount import query_budget
+
+bp = Blueprint('main', __name__)
+
+
+# ---------- Request Helpers ----------
+def date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        abort(400)
+
+
+BULK_MESSAGES = {
+    'approved': ("Одобрено: {}.", 'success'),
+    'rejected': ("Отклонено: {}.", 'info'),
+    'deletion_queued': ("Будут удалены в фоновом режиме: {}.", 'info'),
+    'not_found': ("Не найдено: {}.", 'danger'),
+    'not_pending': ("Уже обработаны ранее: {}.", 'warning'),
+    'already_active': ("Уже активны: {}.", 'warning'),
+    'invalid': ("Неверный идентификатор: {}.", 'danger'),
+    'conflict': ("Изменены другим менеджером, повторите: {}.", 'warning'),
+}
+
+
+def bulk_response(decide, endpoint):
+    # Runs a bulk.py batch and reports the outcome of every item: as JSON to
+    # API clients, as one flash message per outcome to browsers
+    try:
+        summary = decide()
+    except bulk.TooManyItems:
+        message = f"Не более {current_app.config['BULK_MAX_ITEMS']} элементов за раз."
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'error': message}), 400
+        flash(message, 'warning')
+        return redirect(url_for(endpoint))
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(summary)
+    if not summary['results']:
+        flash("Ничего не выбрано.", 'warning')
+    for outcome, count in summary['counts'].items():
+        text, category = BULK_MESSAGES[outcome]
+        if category in ('warning', 'danger'):
+            ids = [item_id for item_id, result in summary['results'].items() if result == outcome]
+            count = f"{count} ({', '.join(ids[:10])}{', ...' if len(ids) > 10 else ''})"
+        flash(text.format(count), category)
+    return redirect(url_for(endpoint))
+
+
+def try_later(wait, template, **context):
+    # The form again with 429 when the client is over its limit
+    # (ratelimit.py), 503 when no hashing slot came free (passwords.py)
+    if wait:
+        message, status = f"Слишком много попыток. Повторите через {math.ceil(wait)} с.", 429
+    else:
+        message, status = "Сервер перегружен, повторите попытку позже.", 503
+    flash(message, 'danger')
+    response = make_response(render_template(template, **context), status)
+    response.headers['Retry-After'] = str(math.ceil(wait) or 1)
+    return response
+
+
+# ---------- Routes ----------
+
+# Home Route
+@bp.route('/')
+def home():
+    logged_in = current_user.is_authenticated
+    role = current_user.role if logged_in else None
+    return render_template('home.html', logged_in=logged_in, role=role)
+
+
+# Registration Route
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if current_user.is_authenticated:
+        flash("Вы уже вошли в систему.", 'info')
+        return redirect(url_for('.home'))
+
+    form = RegistrationForm()
+    if form.validate_on_submit():
+        username = form.username.data
+        email = form.email.data
+        role = 'user'  # Default role
+
+        wait = current_app.extensions['ratelimit'].hit(ip=request.remote_addr)
+        if wait:
+            return try_later(wait, 'register.html', form=form)
+
+        if User.query.filter_by(email=email).first():
+            flash("Email уже зарегистрирован.", 'danger')
+            return render_template('register.html', form=form)
+
+        try:
+            password = current_app.extensions['passwords'].hash(form.password.data)
+        except HashingBusy:
+            return try_later(0, 'register.html', form=form)
+
+        new_user = User(username=username, email=email, password=password, role=role, is_active=False)
+        db.session.add(new_user)
+        db.session.commit()
+        flash("Регистрация прошла успешно! Ожидайте подтверждения менеджера.", 'success')
+        return redirect(url_for('.login', role=role))
+
+    return render_template('register.html', form=form)
+
+
+# Login Route
+@bp.route('/login/<role>', methods=['GET', 'POST'])
+def login(role):
+    if current_user.is_authenticated:
+        flash("Вы уже вошли в систему.", 'info')
+        return redirect(url_for('.home'))
+
+    form = LoginForm()
+    if form.validate_on_submit():
+        email = form.email.data
+        password = form.password.data
+        wait = current_app.extensions['ratelimit'].hit(ip=request.remote_addr, account=email.lower())
+        if wait:
+            return try_later(wait, 'login.html', form=form, role=role)
+
+        user = User.query.filter_by(email=email, role=role).first()
+        passwords = current_app.extensions['passwords']
+        try:
+            valid = user is not None and passwords.verify(user.password, password)
+        except HashingBusy:
+            return try_later(0, 'login.html', form=form, role=role)
+
+        if valid:
+            if not user.is_active and role == 'user':
+                flash("Ваш аккаунт еще не активирован менеджером.", 'warning')
+                return render_template('login.html', form=form, role=role)
+            if passwords.needs_rehash(user.password):
+                # Hashed with an older scheme or cost; the password is at hand to upgrade it
+                try:
+                    user.password = passwords.hash(password)
+                    db.session.commit()
+                except HashingBusy:
+                    pass  # next login
+            login_user(user)
+            current_app.extensions['principals'].remember(user)
+            flash("Вы успешно вошли в систему.", 'success')
+            if role == 'manager':
+                return redirect(url_for('.manager_dashboard'))
+            elif role == 'user':
+                return redirect(url_for('.user_dashboard'))
+        else:
+            flash("Неверные учетные данные.", 'danger')
+
+    return render_template('login.html', form=form, role=role)
+
+
+# Logout Route
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    current_app.extensions['principals'].forget()
+    flash("Вы вышли из системы.", 'info')
+    return redirect(url_for('.home'))
+
+
+# Manager Dashboard
+@bp.route('/manager_dashboard')
+@login_required
+@cached_page('user', 'sale', 'product', 'stock_movement')
+@query_budget(5)
+@read_replica
+def manager_dashboard():
+    if current_user.role != 'manager':
+        flash("Доступ запрещен.", 'danger')
+        return redirect(url_for('.home'))
+
+    live_cursor = live.cursor()
+    users = paginate(queries.users_with_role('user'), queries.USER_SORTS, 'id', prefix='users_')
+    sales = paginate(
+        queries.dashboard_sales(
+            start_date=date_arg('sales_start'),
+            end_date=date_arg('sales_end'),
+            product_id=request.args.get('sales_product', type=int),
+            user_id=request.args.get('sales_user', type=int),
+        ),
+        queries.SALE_SORTS, 'date', prefix='sales_'
+    )
+    inventory = paginate(
+        queries.products(max_stock=request.args.get('inventory_max_stock', type=int)),
+        queries.PRODUCT_SORTS, 'id', 'asc', prefix='inventory_'
+    )
+    # New sales are only added to the newest-first, unfiltered first page
+    live_feeds = ['stock']
+    if (sales.is_first and sales.sort == 'date' and sales.direction == 'desc'
+            and not any(request.args.get(f'sales_{name}') for name in ('start', 'end', 'product', 'user'))):
+        live_feeds.append('sales')
+    return render_template('manager_dashboard.html', users=users, sales=sales, inventory=inventory,
+                           live_cursor=live_cursor, live_feeds=live_feeds)
+
+
+# Manager Dashboard Export
+@bp.route('/manager_dashboard/export/<fmt>')
+@login_required
+@read_replica
+def export_dashboard(fmt):
+    if current_user.role != 'manager':
+        flash("Доступ запрещен.", 'danger')
+        return redirect(url_for('.home'))
+    if fmt not in export.FORMATS:
+        abort(404)
+
+    if request.args.get('table') == 'inventory':
+        query = queries.products_export(max_stock=request.args.get('inventory_max_stock', type=int))
+        header = ['ID', 'Product Name', 'Price', 'Stock', 'Owner']
+        return export.response(query, header, fmt, 'inventory')
+
+    query = queries.sales_export(
+        start_date=date_arg('sales_start'),
+        end_date=date_arg('sales_end'),
+        product_id=request.args.get('sales_product', type=int),
+        user_id=request.args.get('sales_user', type=int),
+    )
+    return export.response(query, export.SALES_HEADER, fmt, 'sales')
+
+
+# User Dashboard
+@bp.route('/user_dashboard')
+@login_required
+@cached_page('sale', 'product', 'stock_movement')
+@query_budget(3)
+def user_dashboard():
+    if current_user.role != 'user':
+        flash("Доступ запрещен.", 'danger')
+        return redirect(url_for('.home'))
+
+    sales = paginate(queries.user_sales(current_user.id), queries.SALE_SORTS, 'date', prefix='sales_')
+    products = queries.products(owner_id=current_user.id).order_by(Product.name).all()
+    return render_template('user_dashboard.html', sales=sales, products=products)
+
+
+# Add Sale
+@bp.route('/add_sale', methods=['POST'])
+@login_required
+def add_sale():
+    if current_user.role != 'user':
+        flash("Доступ запрещен.", 'danger')
+        return redirect(url_for('.home'))
+
+    product_id = request.form.get('product_id')
+    quantity = request.form.get('quantity')
+
+    # Input Validation
+    if not product_id or not quantity:
+        flash("Все поля обязательны для заполнения.", 'danger')
+        return redirect(url_for('.user_dashboard'))
+
+    try:
+        quantity = int(quantity)
+        if quantity < 1:
+            raise ValueError
+    except ValueError:
+        flash("Количество должно быть положительным целым числом.", 'danger')
+        return redirect(url_for('.user_dashboard'))
+
+    # The sale is one more movement in the stock ledger, see stock.py
+    try:
+        stock.sell(product_id, quantity, current_user.id, location_id=request.form.get('location_id', type=int))
+    except stock.ProductNotFound:
+        flash("Продукт не найден.", 'danger')
+        return redirect(url_for('.user_dashboard'))
+    except stock.LocationNotFound:
+        flash("Склад не найден.", 'danger')
+        return redirect(url_for('.user_dashboard'))
+    except stock.OutOfStock:
+        flash("Недостаточно товара на складе.", 'warning')
+        return redirect(url_for('.user_dashboard'))
+    except stock.StockBusy:
+        flash("Сервер занят, попробуйте еще раз.", 'warning')
+        return redirect(url_for('.user_dashboard'))
+
+    flash("Продажа успешно добавлена.", 'success')
+    return redirect(url_for('.user_dashboard'))
+
+
+# Batch Sales Import (POS uploads)
+@bp.route('/api/sales/batch', methods=['POST'])
+@login_required
+def import_sales_batch():
+    if current_user.role not in ['manager', 'user']:
+        return jsonify(error='forbidden'), 403
+
+    try:
+        records = ingest.request_records()
+    except (ValueError, UnicodeDecodeError) as error:
+        return jsonify(error=f'could not parse upload: {error}'), 400
+
+    # Sellers upload their own sales; managers may attribute rows to any seller
+    is_manager = current_user.role == 'manager'
+    report = ingest.ingest(records, None if is_manager else current_user.id, allow_user_id=is_manager)
+    return jsonify(report)
+
+
+# Manage Users (Manager Only)
+@bp.route('/manage_users', methods=['GET', 'POST'])
+@login_required
+def manage_users():
+    if current_user.role != 'manager':
+        flash("Доступ запрещен.", 'danger')
+        return redirect(url_for('.home'))
+
+    if request.method == 'POST':
+        # One user_id from a row's buttons, or any number of checked user_ids
+        user_ids = request.form.getlist('user_ids') or request.form.getlist('user_id')
+        action = request.form.get('action')
+        if action not in bulk.USER_ACTIONS:
+            flash("Неверное действие.", 'warning')
+            return redirect(url_for('.manage_users'))
+        return bulk_response(lambda: bulk.decide_users(user_ids, action, current_user.id), '.manage_users')
+
+    inactive_users = paginate(
+        queries.users_with_role('user', is_active=False), queries.USER_SORTS, 'id', 'asc', prefix='inactive_'
+    )
+    active_users = paginate(
+        queries.users_with_role('user', is_active=True), queries.USER_SORTS, 'id', 'asc', prefix='active_'
+    )
+    return render_template('manage_users.html', inactive_users=inactive_users, active_users=active_users)
+
+
+# Inventory Management
+@bp.route('/inventory', methods=['GET', 'POST'])
+@login_required
+@cached_page('product', 'user', 'stock_movement')
+@query_budget(3)
+def inventory():
+    if current_user.role not in ['manager', 'user']:
+        flash("Доступ запрещен.", 'danger')
+        return redirect(url_for('.home'))
+
+    form = AddProductForm()
+    if form.validate_on_submit():
+        name = form.name.data
+        price = form.price.data
+        initial_stock = form.stock.data
+        user_id = current_user.id if current_user.role == 'user' else None  # Assign ownership if user
+
+        new_product = Product(name=name, price=price, stock=0, user_id=user_id)
+        db.session.add(new_product)
+        db.session.flush()
+        # Opening stock goes through the ledger like any other movement
+        if initial_stock:
+            stock.adjust(new_product.id, initial_stock, user_id=current_user.id, note='initial stock')
+        db.session.commit()
+        flash("Продукт успешно добавлен в инвентарь.", 'success')
+        return redirect(url_for('.inventory'))
+
+    owner_id = current_user.id if current_user.role == 'user' else request.args.get('owner', type=int)
+    products = paginate(
+        queries.products(owner_id=owner_id, max_stock=request.args.get('max_stock', type=int)),
+        queries.PRODUCT_SORTS, 'id', 'asc'
+    )
+
+    return render_template('inventory.html', products=products, form=form)
+
+
+# Suppliers Management
+@bp.route('/suppliers', methods=['GET', 'POST'])
+@login_required
+@cached_page('supplier', 'product')
+@query_budget(4)
+def suppliers():
+    if current_user.role != 'manager':
+        flash("Доступ запрещен.", 'danger')
+        return redirect(url_for('.home'))
+
+    form = AddSupplierForm()
+    if form.validate_on_submit():
+        product_id = form.product_id.data
+        name = form.name.data
+        quantity = form.quantity.data
+        price = form.price.data
+        delivery_time = form.delivery_time.data
+
+        # Picked with the typeahead (/api/search) rather than from a list of every product
+        if db.session.get(Product, product_id) is None:
+            flash("Продукт не найден.", 'danger')
+            return redirect(url_for('.suppliers'))
+
+        new_supplier = Supplier(
+            product_id=product_id,
+            name=name,
+            quantity=quantity,
+            price=price,
+            delivery_time=delivery_time
+        )
+        db.session.add(new_supplier)
+        db.session.commit()
+        flash("Поставщик успешно добавлен.", 'success')
+        return redirect(url_for('.suppliers'))
+
+    suppliers = paginate(
+        queries.suppliers(product_id=request.args.get('product', type=int)),
+        queries.SUPPLIER_SORTS, 'id', 'asc'
+    )
+    return render_template('suppliers.html', suppliers=suppliers, form=form)
+
+
+# Confirm Orders (Manager Only)
+@bp.route('/confirm_orders', methods=['GET', 'POST'])
+@login_required
+@cached_page('order', 'user', 'product', 'supplier')
+@query_budget(4)
+def confirm_orders():
+    if current_user.role != 'manager':
+        flash("Доступ запрещен.", 'danger')
+        return redirect(url_for('.home'))
+
+    if request.method == 'POST':
+        # One order_id from a row's buttons, or any number of checked order_ids
+        order_ids = request.form.getlist('order_ids') or request.form.getlist('order_id')
+        action = request.form.get('action')
+        if action not in bulk.ORDER_ACTIONS:
+            flash("Неверное действие.", 'warning')
+            return redirect(url_for('.confirm_orders'))
+        return bulk_response(lambda: bulk.decide_orders(order_ids, action, current_user.id), '.confirm_orders')
+
+    live_cursor = live.cursor()
+    orders = paginate(queries.pending_orders(), queries.ORDER_SORTS, 'id', 'asc')
+    return render_template('confirm_orders.html', orders=orders, live_cursor=live_cursor)
+
+
+# Analytics (Manager Only)
+@bp.route('/analytics', methods=['GET', 'POST'])
+@login_required
+@cached_page('sale', 'product', 'user', 'daily_sales', 'daily_product_sales', 'daily_user_sales', 'reorder_point',
+             'stock_movement')
+@query_budget(10)
+@read_replica
+def analytics():
+    if current_user.role != 'manager':
+        flash("Доступ запрещен.", 'danger')
+        return redirect(url_for('.home'))
+
+    form = FilterSalesForm()
+    low_stock_products = queries.low_stock_products()
+
+    if form.validate_on_submit():
+        # Redirect to a GET so the filtered history can be paged with plain links
+        return redirect(url_for('.analytics', start_date=form.start_date.data, end_date=form.end_date.data))
+
+    start_date = end_date = None
+    if request.args.get('start_date') or request.args.get('end_date'):
+        try:
+            start_date = datetime.strptime(request.args.get('start_date', ''), '%Y-%m-%d')
+            end_date = datetime.strptime(request.args.get('end_date', ''), '%Y-%m-%d')
+        except ValueError:
+            flash("Неверный формат даты.", 'danger')
+            return redirect(url_for('.analytics'))
+        form.start_date.data = request.args['start_date']
+        form.end_date.data = request.args['end_date']
+
+    start_day = start_date.date() if start_date else None
+    end_day = end_date.date() if end_date else None
+    try:
+        sales_trends = trends.trends(start_day, end_day)
+    except trends.RangeTooLong:
+        abort(400)
+    # Totals and breakdowns come from the daily rollups; without a range they cover all sales
+    total_sales, total_products_sold = rollups.totals(start_day, end_day)
+    sales_by_day = rollups.by_day(start_day, end_day)
+    sales_by_product = rollups.by_product(start_day, end_day)
+    sales_by_seller = rollups.by_seller(start_day, end_day)
+    sales_history = paginate(queries.sales_between(start_date, end_date), queries.SALE_SORTS, 'date')
+
+    return render_template(
+        'analytics.html',
+        form=form,
+        total_sales=total_sales,
+        total_products_sold=total_products_sold,
+        low_stock_products=low_stock_products,
+        sales_by_day=sales_by_day,
+        sales_by_product=sales_by_product,
+        sales_by_seller=sales_by_seller,
+        sales_trends=sales_trends,
+        weekdays=trends.WEEKDAYS,
+        sales_history=sales_history
+    )
+
+
+# Analytics Export (Manager Only)
+@bp.route('/analytics/export/<fmt>')
+@login_required
+@read_replica
+def export_analytics(fmt):
+    if current_user.role != 'manager':
+        flash("Доступ запрещен.", 'danger')
+        return redirect(url_for('.home'))
+    if fmt not in export.FORMATS:
+        abort(404)
+
+    query = queries.sales_export(start_date=date_arg('start_date'), end_date=date_arg('end_date'))
+    return export.response(query, export.SALES_HEADER, fmt, 'sales')
+
+
+# Analytics Trends as JSON (Manager Only): daily series with moving averages,
+# weekly totals, and the demand forecast, for charts and other tools
+@bp.route('/api/trends')
+@login_required
+@query_budget(3)
+@read_replica
+def trends_api():
+    if current_user.role != 'manager':
+        abort(403)
+    start_date, end_date = date_arg('start_date'), date_arg('end_date')
+    try:
+        result = trends.trends(start_date and start_date.date(), end_date and end_date.date())
+    except trends.RangeTooLong:
+        abort(400)
+    if result is None:
+        abort(400)
+    return jsonify(result)
+
+
+# Analytics Report in the Background (Manager Only)
+@bp.route('/analytics/report/<fmt>', methods=['POST'])
+@login_required
+def analytics_report(fmt):
+    if current_user.role != 'manager':
+        flash("Доступ запрещен.", 'danger')
+        return redirect(url_for('.home'))
+    if fmt not in export.FORMATS:
+        abort(404)
+
+    # Parsed only to reject bad dates before they reach the job
+    date_arg('start_date'), date_arg('end_date')
+    job = jobs.enqueue('sales_report', {
+        'fmt': fmt,
+        'start_date': request.args.get('start_date') or None,
+        'end_date': request.args.get('end_date') or None,
+    }, user_id=current_user.id)
+    db.session.commit()
+    return redirect(url_for('.job_status', job_id=job.id))
+
+
+# Reorder Run in the Background (Manager Only)
+@bp.route('/analytics/reorder', methods=['POST'])
+@login_required
+def plan_reorders():
+    if current_user.role != 'manager':
+        flash("Доступ запрещен.", 'danger')
+        return redirect(url_for('.home'))
+
+    job = jobs.enqueue('plan_reorders', user_id=current_user.id)
+    db.session.commit()
+    return redirect(url_for('.job_status', job_id=job.id))
+
+
+# ---------- Search ----------
+# Typeahead: ranked prefix matches, see search.py. Sellers only see their own products.
+@bp.route('/api/search')
+@login_required
+@query_budget(2)
+def search_api():
+    kinds = request.args.getlist('kind') or list(search.KINDS)
+    if any(kind not in search.KINDS for kind in kinds):
+        abort(400)
+    owner_id = None
+    if current_user.role != 'manager':
+        kinds, owner_id = [kind for kind in kinds if kind == 'product'], current_user.id
+    limit = min(request.args.get('limit', 10, type=int), current_app.config['SEARCH_MAX_RESULTS'])
+
+    results = search.search(request.args.get('q', ''), kinds, owner_id=owner_id, limit=max(limit, 1))
+    return jsonify(results=results)
+
+
+# ---------- JSON API ----------
+# Versioned read API for integrations: field selection, keyset pages,
+# updated_since delta sync, ETags and compression, see api.py.
+@bp.route('/api/v1/<name>')
+@login_required
+@query_budget(2)
+@read_replica
+def api_collection(name):
+    return api.collection(name)
+
+
+@bp.route('/api/v1/<name>/<int:item_id>')
+@login_required
+@query_budget(2)
+@read_replica
+def api_item(name, item_id):
+    return api.item(name, item_id)
+
+
+# ---------- Live Updates ----------
+# Server-Sent Events with the sales, stock levels and orders that changed
+# after a page was rendered, see live.py. Reads the primary: a replica could
+# lag behind the commits that wake the stream up.
+@bp.route('/live')
+@login_required
+def live_updates():
+    if current_user.role != 'manager':
+        abort(403)
+    return live.response()
+
+
+# ---------- Background Jobs ----------
+def visible_job(job_id):
+    job = db.session.get(Job, job_id)
+    if job is None:
+        abort(404)
+    if current_user.role != 'manager' and job.user_id != current_user.id:
+        abort(403)
+    return job
+
+
+@bp.route('/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    job = visible_job(job_id)
+    return render_template('job.html', job=job, details=jobs.as_dict(job))
+
+
+@bp.route('/api/jobs/<int:job_id>')
+@login_required
+def job_status_api(job_id):
+    return jsonify(jobs.as_dict(visible_job(job_id)))
+
+
+@bp.route('/jobs/<int:job_id>/download')
+@login_required
+def download_job_result(job_id):
+    job = visible_job(job_id)
+    if job.kind != 'sales_report' or job.status != 'done':
+        abort(404)
+    filename = json.loads(job.result)['filename']
+    return send_from_directory(current_app.config["REPORTS_DIR"], filename, as_attachment=True)
+
+
+# Session Principal Cache Metrics (Manager Only)
+@bp.route('/metrics/principals')
+@login_required
+def principal_metrics():
+    if current_user.role != 'manager':
+        abort(403)
+    return jsonify(current_app.extensions['principals'].stats())
+
+
+# Prometheus Metrics
+@bp.route('/metrics')
+def metrics():
+    token = current_app.config["METRICS_TOKEN"]
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        abort(403)
+    body = instrumentation.render_metrics(current_app.extensions['instrumentation'],
+                                          current_app.extensions['principals'].stats(),
+                                          current_app.extensions['ratelimit'].stats())
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+
+# ---------- Error Handlers ----------
+@bp.app_errorhandler(404)
+def page_not_found(e):
+    return render_template('404.html'), 404
+
+
+@bp.app_errorhandler(403)
+def forbidden(e):
+    return render_template('403.html'), 403
+
+
+@bp.app_errorhandler(500)
+def internal_server_error(e):
+    return render_template('500.html'), 500
+